@@ -1,13 +1,13 @@
 import logging
 import sys
-import os
-import ast
+from argparse import ONE_OR_MORE
 from argparse import ZERO_OR_MORE
 from argparse import ArgumentParser
 from argparse import Namespace
 from pathlib import Path
 from typing import Any
 from typing import List
+from typing import Optional
 from typing import Sequence
 from typing import Union
 
@@ -15,7 +15,6 @@ import stubgen
 from stubgen.defaults import ASSEMBLIES
 from stubgen.defaults import BUILT_INS
 from stubgen.defaults import CORE
-from stubgen.extract_stubs import extract_assemblies
 from stubgen.log import console_handler
 from stubgen.log import get_logger
 
@@ -83,6 +82,63 @@ def main(*args: Any) -> Union[int, str]:
         action="store_true",
         help="process core assemblies",
     )
+    extract_command.add_argument(
+        "-d",
+        "--metadata",
+        action="store_true",
+        help="read the assembly metadata directly instead of loading assemblies into the CLR",
+    )
+    extract_command.add_argument(
+        "-e",
+        "--declared-only",
+        dest="declared_only",
+        action="store_true",
+        help="reflect only the members each type declares and rebuild the inherited ones",
+    )
+    extract_command.add_argument(
+        "-f",
+        "--references-file",
+        dest="references_file",
+        action="append",
+        type=Path,
+        help="file with an assembly name or path per line, such as the one written by scan",
+    )
+    extract_command.add_argument(
+        "-j",
+        "--processes",
+        type=int,
+        help="extract assemblies in this many worker processes, each with its own CLR",
+    )
+    extract_command.add_argument(
+        "-r",
+        "--recycle-after",
+        dest="recycle_after",
+        type=int,
+        help="replace a worker process after it extracted this many assemblies",
+    )
+    extract_command.add_argument(
+        "--closure",
+        action="store_true",
+        help="also extract every assembly the given ones reference, dependencies first",
+    )
+    extract_command.add_argument(
+        "--record-dir",
+        dest="record_dir",
+        type=Path,
+        help="save a snapshot of the reflection answers for each assembly to this directory",
+    )
+    extract_command.add_argument(
+        "--replay",
+        action="store_true",
+        help="extract from reflection snapshot files instead of assemblies, needs no CLR",
+    )
+    extract_command.add_argument(
+        "-t",
+        "--type-workers",
+        dest="type_workers",
+        type=int,
+        help="split the types of each assembly across this many worker processes",
+    )
     extract_command.add_argument(
         "-w",
         "--overwrite",
@@ -95,6 +151,37 @@ def main(*args: Any) -> Union[int, str]:
         help="names of dll assemblies to process",
     )
 
+    scan_command = commands.add_parser(
+        "scan", help="find the assemblies scripts add with AddReference"
+    )
+    scan_command.add_argument(
+        "-d",
+        "--dll-dir",
+        dest="dll_dir",
+        action="append",
+        type=Path,
+        help="directory to find the referenced dll files in",
+    )
+    scan_command.add_argument(
+        "-j",
+        "--processes",
+        type=int,
+        help="parse scripts in this many worker processes",
+    )
+    scan_command.add_argument(
+        "-f",
+        "--references-file",
+        dest="references_file",
+        type=Path,
+        help="file to write the references to [default: OUTPUT_DIR/references.txt]",
+    )
+    scan_command.add_argument(
+        "script_roots",
+        nargs=ONE_OR_MORE,
+        type=Path,
+        help="scripts or directories to search for scripts recursively",
+    )
+
     build_command = commands.add_parser("build", help="build stub file tree")
     build_command.add_argument(
         "-l",
@@ -109,6 +196,12 @@ def main(*args: Any) -> Union[int, str]:
         action="store_true",
         help="format generated stub files",
     )
+    build_command.add_argument(
+        "-j",
+        "--processes",
+        type=int,
+        help="load and merge the skeleton files in this many worker processes",
+    )
     build_command.add_argument(
         "skeletons",
         help="glob to the skeleton files",
@@ -119,6 +212,20 @@ def main(*args: Any) -> Union[int, str]:
     )
 
     parsed_args: Namespace = parser.parse_args(args)
+    if parsed_args.command == "extract" and parsed_args.metadata:
+        # The metadata reader has no CLR, so the options of the reflection extraction do not apply
+        clr_options: Sequence[str] = tuple(
+            option
+            for option, used in (
+                ("--multi-threaded", parsed_args.multi_threaded),
+                ("--declared-only", parsed_args.declared_only),
+                ("--record-dir", parsed_args.record_dir is not None),
+                ("--replay", parsed_args.replay),
+            )
+            if used
+        )
+        if clr_options:
+            parser.error(f"--metadata cannot be combined with {', '.join(clr_options)}")
 
     verbose: bool = parsed_args.verbose
     if verbose:
@@ -137,8 +244,6 @@ def main(*args: Any) -> Union[int, str]:
         command: str = parsed_args.command
         logger.debug("Using command: %s", command)
         if command == "extract":
-            from stubgen.extract_stubs import extract_assembly
-
             use_all: bool = parsed_args.all
             use_built_in: bool = parsed_args.built_in
             use_core: bool = parsed_args.core
@@ -146,8 +251,26 @@ def main(*args: Any) -> Union[int, str]:
             skip_failed: bool = parsed_args.skip_failed
             logger.debug("Using skip failed flag: %s", skip_failed)
 
-            paths: Sequence[Path] = parsed_args.path
-            if paths is not None:
+            use_metadata: bool = parsed_args.metadata
+            logger.debug("Using metadata flag: %s", use_metadata)
+
+            declared_only: bool = parsed_args.declared_only
+            logger.debug("Using declared only flag: %s", declared_only)
+
+            closure: bool = parsed_args.closure
+            logger.debug("Using closure flag: %s", closure)
+
+            record_dir: Optional[Path] = parsed_args.record_dir
+            if record_dir is not None:
+                record_dir = record_dir.resolve()
+                record_dir.mkdir(parents=True, exist_ok=True)
+            logger.debug("Using record directory: %s", record_dir)
+
+            replay: bool = parsed_args.replay
+            logger.debug("Using replay flag: %s", replay)
+
+            paths: Sequence[Path] = parsed_args.path or ()
+            if paths:
                 path: Path
                 for path in paths:
                     path_str: str = str(path.resolve())
@@ -157,6 +280,15 @@ def main(*args: Any) -> Union[int, str]:
             overwrite: bool = parsed_args.overwrite
             logger.debug("Using overwrite flag: %s", skip_failed)
 
+            process_count: Optional[int] = parsed_args.processes
+            logger.debug("Using process count: %s", process_count)
+
+            recycle_after: Optional[int] = parsed_args.recycle_after
+            logger.debug("Using recycle after: %s", recycle_after)
+
+            type_workers: Optional[int] = parsed_args.type_workers
+            logger.debug("Using type workers: %s", type_workers)
+
             assembly_names: List[str] = list()
             if use_all:
                 logger.debug("Adding all assemblies")
@@ -169,21 +301,73 @@ def main(*args: Any) -> Union[int, str]:
             elif use_core:
                 logger.debug("Adding core assemblies")
                 assembly_names.extend(CORE)
-            ##assemblies: Sequence[str] = parsed_args.assemblies
-            assemblies: Sequence[str] = find_dll_references(
-                r"C:\repos\CommonDev\Lotus\Cougar\Net\Scripts\DiagnosticsWrappers",
-                r"C:\repos\CommonDev\BuildOutputs\Output\Run\Exec\Bin",
-            )
+            references_files: Sequence[Path] = parsed_args.references_file or ()
+            if references_files:
+                from stubgen.scan import read_references
+
+                for references_file in references_files:
+                    logger.debug("Adding assemblies from: %r", str(references_file))
+                    assembly_names.extend(read_references(references_file))
+            assemblies: Sequence[str] = parsed_args.assemblies
             assembly_names.extend(assemblies)
             assembly_names = list(dict.fromkeys(assembly_names).keys())
 
-            exit_code = extract_assemblies(
-                assembly_names=assembly_names,
-                output_dir=output_dir,
-                overwrite=overwrite,
-                skip_failed=skip_failed,
-                multi_threaded=multi_threaded,
+            if use_metadata:
+                from stubgen.extract_metadata import extract_assemblies
+
+                exit_code = extract_assemblies(
+                    assembly_names=assembly_names,
+                    output_dir=output_dir,
+                    overwrite=overwrite,
+                    skip_failed=skip_failed,
+                    process_count=process_count,
+                    max_assemblies_per_process=recycle_after,
+                    search_paths=tuple(path.resolve() for path in paths),
+                    type_workers=type_workers,
+                    closure=closure,
+                )
+            else:
+                from stubgen.extract_stubs import extract_assemblies
+
+                exit_code = extract_assemblies(
+                    assembly_names=assembly_names,
+                    output_dir=output_dir,
+                    overwrite=overwrite,
+                    skip_failed=skip_failed,
+                    multi_threaded=multi_threaded,
+                    process_count=process_count,
+                    max_assemblies_per_process=recycle_after,
+                    declared_only=declared_only,
+                    record_dir=record_dir,
+                    replay=replay,
+                    type_workers=type_workers,
+                    closure=closure,
+                )
+        elif command == "scan":
+            from stubgen.scan import ScanCache
+            from stubgen.scan import find_dll_references
+            from stubgen.scan import write_references
+
+            script_roots: Sequence[Path] = parsed_args.script_roots
+            logger.debug("Using script roots: %s", script_roots)
+
+            dll_dirs: Sequence[Path] = parsed_args.dll_dir or ()
+            logger.debug("Using DLL directories: %s", dll_dirs)
+
+            process_count: Optional[int] = parsed_args.processes
+            logger.debug("Using process count: %s", process_count)
+
+            output_dir.mkdir(parents=True, exist_ok=True)
+            references_file: Path = parsed_args.references_file or output_dir / "references.txt"
+            logger.debug("Using references file: %r", str(references_file))
+
+            references: Sequence[str] = find_dll_references(
+                script_roots=script_roots,
+                dll_dirs=dll_dirs,
+                cache_file=output_dir / ScanCache.file_name,
+                process_count=process_count,
             )
+            write_references(references_file, references)
         elif command == "build":
             from stubgen.build_stubs import build_stubs
 
@@ -193,6 +377,9 @@ def main(*args: Any) -> Union[int, str]:
             format_files: bool = parsed_args.format_files
             logger.debug("Using format files flag: %s", format_files)
 
+            process_count: Optional[int] = parsed_args.processes
+            logger.debug("Using process count: %s", process_count)
+
             skeleton_glob: str = parsed_args.skeletons
             skeleton_files: List[Path] = []
             for file_path in Path().glob(skeleton_glob):
@@ -212,6 +399,7 @@ def main(*args: Any) -> Union[int, str]:
                 line_length=line_length,
                 multi_threaded=multi_threaded,
                 format_files=format_files,
+                process_count=process_count,
             )
 
     except Exception as e:
@@ -221,42 +409,6 @@ def main(*args: Any) -> Union[int, str]:
     return exit_code
 
 
-import os
-import glob
-
-
-def find_dll_references(script_folder_path: str, dll_folder_path: str) -> Sequence[str]:
-    script_paths = glob.glob(os.path.join(script_folder_path, "*.py"))
-
-    dll_names: List[str] = []
-
-    for script_path in script_paths:
-        try:
-            with open(script_path, "r") as file:
-                tree = ast.parse(file.read())
-        except Exception as e:
-            logger.error(f"Unable to read script: {script_path}: {str(e)}")
-
-        for node in ast.walk(tree):
-            if (
-                isinstance(node, ast.Call)
-                and isinstance(node.func, ast.Attribute)
-                and node.func.attr == "AddReference"
-            ):
-                dll_name = node.args[0].s
-                logger.debug(f"Found DLL reference: {dll_name}")
-                dll_names.append(dll_name)
-
-    dll_paths = []
-    for dll_name in dll_names:
-        dll_path = os.path.join(dll_folder_path, dll_name + ".dll")
-        if os.path.exists(dll_path):
-            logger.debug(f"Found DLL path: {dll_path}")
-            dll_paths.append(dll_path)
-
-    return dll_paths
-
-
 if __name__ == "__main__":
     args: Sequence[str] = sys.argv[1:]
 
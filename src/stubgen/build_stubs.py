@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 import functools
+import io
 import itertools
+import operator
 import json
+import pickle
 import re
 from concurrent.futures import Executor
 from concurrent.futures import ThreadPoolExecutor
@@ -11,9 +14,11 @@ from dataclasses import field
 from pathlib import Path
 from typing import Any
 from typing import AnyStr
+from typing import BinaryIO
 from typing import Callable
 from typing import Dict
 from typing import Final
+from typing import Iterator
 from typing import List
 from typing import Mapping
 from typing import Optional
@@ -31,6 +36,9 @@ from black import TargetVersion
 from black import WriteBack
 from isort import Config
 
+from stubgen.extract_common import gil_disabled
+from stubgen.extract_common import init_worker
+from stubgen.log import console_handler
 from stubgen.log import get_logger
 from stubgen.model import CClass
 from stubgen.model import CConstructor
@@ -39,6 +47,7 @@ from stubgen.model import CEnum
 from stubgen.model import CEvent
 from stubgen.model import CField
 from stubgen.model import CInterface
+from stubgen.model import CMember
 from stubgen.model import CMethod
 from stubgen.model import CNamespace
 from stubgen.model import CParameter
@@ -46,6 +55,9 @@ from stubgen.model import CProperty
 from stubgen.model import CStruct
 from stubgen.model import CType
 from stubgen.model import CTypeDefinition
+from stubgen.model import by_sort_key
+from stubgen.pool import WorkerError
+from stubgen.pool import WorkerPool
 from stubgen.util import make_python_name
 
 T = TypeVar("T")
@@ -73,238 +85,33 @@ def merge_mapping(
     merge_func: Callable[[T, T, bool], T],
     should_raise: bool = True,
 ) -> Mapping[str, T]:
-    key_list: Set[str] = set(mapping1.keys())
-    key_list.update(mapping2.keys())
-
-    obj: T
-    merged: Dict[str, T] = {}
-    for key in sorted(key_list):
-        if key in mapping1:
-            obj = mapping1[key]
-            if key in mapping2:
-                obj = merge_func(obj, mapping2[key], should_raise)
-            merged[key] = obj
-        elif key in mapping2:
-            obj = mapping2[key]
-            merged[key] = obj
-
-    return merged
+    return merge_member_mappings((mapping1, mapping2), merge_func, should_raise)
 
 
 def merge_namespace(
     namespace1: CNamespace, namespace2: CNamespace, should_raise: bool = True
 ) -> CNamespace:
-    logger.debug("Merging Namespaces: %s", namespace1)
-
-    verify_attribute(namespace1, namespace2, "Namespaces", "name", should_raise)
-
-    type_map: Mapping[str, CTypeDefinition] = merge_mapping(
-        mapping1=namespace1.types,
-        mapping2=namespace2.types,
-        merge_func=merge_type_def,
-        should_raise=should_raise,
-    )
-
-    return CNamespace(name=namespace1.name, types=type_map)
+    return merge_namespaces((namespace1, namespace2), should_raise)
 
 
 def merge_type_def(
     type_def1: CTypeDefinition, type_def2: CTypeDefinition, should_raise: bool = True
 ) -> CTypeDefinition:
-    logger.debug("Merging Type Definitions: %s", type_def1)
-    class1: str = type_def1.__class__.__name__
-    class2: str = type_def2.__class__.__name__
-
-    if class1 != class2:
-        raise TypeError(f"Type definitions are not the same: {class1} != {class2}")
-
-    verify_attribute(type_def1, type_def2, "Type Definitions", "name", True)
-    verify_attribute(type_def1, type_def2, "Type Definitions", "namespace", True)
-    verify_attribute(type_def1, type_def2, "Type Definitions", "nested", True)
-
-    if class1 == "CClass":
-        return merge_class(cast(CClass, type_def1), cast(CClass, type_def2), should_raise)
-    if class1 == "CStruct":
-        return merge_struct(cast(CStruct, type_def1), cast(CStruct, type_def2), should_raise)
-    if class1 == "CInterface":
-        return merge_interface(
-            cast(CInterface, type_def1), cast(CInterface, type_def2), should_raise
-        )
-    if class1 == "CEnum":
-        return merge_enum(cast(CEnum, type_def1), cast(CEnum, type_def2), should_raise)
-    if class1 == "CDelegate":
-        return merge_delegate(cast(CDelegate, type_def1), cast(CDelegate, type_def2), should_raise)
+    return merge_type_defs((type_def1, type_def2), should_raise)
 
 
 def merge_class(class1: CClass, class2: CClass, should_raise: bool = True) -> CClass:
-    verify_attribute(class1, class2, "Classes", "abstract", should_raise)
-    verify_attribute(class1, class2, "Classes", "generic_args", should_raise)
-    verify_attribute(class1, class2, "Classes", "super_class", should_raise)
-
-    interfaces: Sequence[CType] = tuple(sorted({*class1.interfaces, *class2.interfaces}))
-    fields: Mapping[str, CField] = merge_mapping(
-        mapping1=class1.fields,
-        mapping2=class2.fields,
-        merge_func=merge_field,
-        should_raise=should_raise,
-    )
-    constructors: Mapping[str, CConstructor] = merge_mapping(
-        mapping1=class1.constructors,
-        mapping2=class2.constructors,
-        merge_func=merge_constructor,
-        should_raise=should_raise,
-    )
-    properties: Mapping[str, CProperty] = merge_mapping(
-        mapping1=class1.properties,
-        mapping2=class2.properties,
-        merge_func=merge_property,
-        should_raise=should_raise,
-    )
-    methods: Mapping[str, CMethod] = merge_mapping(
-        mapping1=class1.methods,
-        mapping2=class2.methods,
-        merge_func=merge_method,
-        should_raise=should_raise,
-    )
-    events: Mapping[str, CEvent] = merge_mapping(
-        mapping1=class1.events,
-        mapping2=class2.events,
-        merge_func=merge_event,
-        should_raise=should_raise,
-    )
-    nested_types: Mapping[str, CTypeDefinition] = merge_mapping(
-        mapping1=class1.nested_types,
-        mapping2=class2.nested_types,
-        merge_func=merge_type_def,
-        should_raise=should_raise,
-    )
-
-    return CClass(
-        name=class1.name,
-        namespace=class1.namespace,
-        nested=class1.nested,
-        abstract=class1.abstract,
-        generic_args=class1.generic_args,
-        super_class=class1.super_class,
-        interfaces=interfaces,
-        fields=fields,
-        constructors=constructors,
-        properties=properties,
-        methods=methods,
-        events=events,
-        nested_types=nested_types,
-    )
+    return merge_classes((class1, class2), should_raise)
 
 
 def merge_struct(struct1: CStruct, struct2: CStruct, should_raise: bool = True) -> CStruct:
-    verify_attribute(struct1, struct2, "Structs", "abstract", should_raise)
-    verify_attribute(struct1, struct2, "Structs", "generic_args", should_raise)
-    verify_attribute(struct1, struct2, "Structs", "super_class", should_raise)
-
-    interfaces: Sequence[CType] = tuple(sorted({*struct1.interfaces, *struct2.interfaces}))
-    fields: Mapping[str, CField] = merge_mapping(
-        mapping1=struct1.fields,
-        mapping2=struct2.fields,
-        merge_func=merge_field,
-        should_raise=should_raise,
-    )
-    constructors: Mapping[str, CConstructor] = merge_mapping(
-        mapping1=struct1.constructors,
-        mapping2=struct2.constructors,
-        merge_func=merge_constructor,
-        should_raise=should_raise,
-    )
-    properties: Mapping[str, CProperty] = merge_mapping(
-        mapping1=struct1.properties,
-        mapping2=struct2.properties,
-        merge_func=merge_property,
-        should_raise=should_raise,
-    )
-    methods: Mapping[str, CMethod] = merge_mapping(
-        mapping1=struct1.methods,
-        mapping2=struct2.methods,
-        merge_func=merge_method,
-        should_raise=should_raise,
-    )
-    events: Mapping[str, CEvent] = merge_mapping(
-        mapping1=struct1.events,
-        mapping2=struct2.events,
-        merge_func=merge_event,
-        should_raise=should_raise,
-    )
-    nested_types: Mapping[str, CTypeDefinition] = merge_mapping(
-        mapping1=struct1.nested_types,
-        mapping2=struct2.nested_types,
-        merge_func=merge_type_def,
-        should_raise=should_raise,
-    )
-
-    return CStruct(
-        name=struct1.name,
-        namespace=struct1.namespace,
-        nested=struct1.nested,
-        abstract=struct1.abstract,
-        generic_args=struct1.generic_args,
-        super_class=struct1.super_class,
-        interfaces=interfaces,
-        fields=fields,
-        constructors=constructors,
-        properties=properties,
-        methods=methods,
-        events=events,
-        nested_types=nested_types,
-    )
+    return merge_structs((struct1, struct2), should_raise)
 
 
 def merge_interface(
     interface1: CInterface, interface2: CInterface, should_raise: bool = True
 ) -> CInterface:
-    verify_attribute(interface1, interface2, "Interfaces", "generic_args", should_raise)
-
-    interfaces: Sequence[CType] = tuple(sorted({*interface1.interfaces, *interface2.interfaces}))
-    fields: Mapping[str, CField] = merge_mapping(
-        mapping1=interface1.fields,
-        mapping2=interface2.fields,
-        merge_func=merge_field,
-        should_raise=should_raise,
-    )
-    properties: Mapping[str, CProperty] = merge_mapping(
-        mapping1=interface1.properties,
-        mapping2=interface2.properties,
-        merge_func=merge_property,
-        should_raise=should_raise,
-    )
-    methods: Mapping[str, CMethod] = merge_mapping(
-        mapping1=interface1.methods,
-        mapping2=interface2.methods,
-        merge_func=merge_method,
-        should_raise=should_raise,
-    )
-    events: Mapping[str, CEvent] = merge_mapping(
-        mapping1=interface1.events,
-        mapping2=interface2.events,
-        merge_func=merge_event,
-        should_raise=should_raise,
-    )
-    nested_types: Mapping[str, CTypeDefinition] = merge_mapping(
-        mapping1=interface1.nested_types,
-        mapping2=interface2.nested_types,
-        merge_func=merge_type_def,
-        should_raise=should_raise,
-    )
-
-    return CInterface(
-        name=interface1.name,
-        namespace=interface1.namespace,
-        nested=interface1.nested,
-        generic_args=interface1.generic_args,
-        interfaces=interfaces,
-        fields=fields,
-        properties=properties,
-        methods=methods,
-        events=events,
-        nested_types=nested_types,
-    )
+    return merge_interfaces((interface1, interface2), should_raise)
 
 
 def merge_enum(enum1: CEnum, enum2: CEnum, should_raise: bool = True) -> CEnum:
@@ -439,6 +246,259 @@ def merge_event(event1: CEvent, event2: CEvent, should_raise: bool = True) -> CE
     )
 
 
+# The merges below take every version of an entity at once, so each namespace, type and member
+# mapping is built a single time however many skeleton files contain it. Attributes are taken
+# from the first version and verified against each of the others. The pairwise merges of
+# namespaces and type definitions above are their two version case.
+
+
+def merge_all(items: Sequence[T], should_raise: bool, merge_func: Callable[[T, T, bool], T]) -> T:
+    # For members, which are small enough to fold with their pairwise merge
+    merged: T = items[0]
+    for item in items[1:]:
+        merged = merge_func(merged, item, should_raise)
+    return merged
+
+
+def ordered_keys(mapping: Mapping[str, T]) -> List[str]:
+    # Skeleton files and earlier merges mostly give sorted keys, only the others are sorted here
+    keys: List[str] = list(mapping)
+    if not all(map(operator.le, keys, itertools.islice(keys, 1, None))):
+        keys.sort()
+    return keys
+
+
+def merge_two_mappings(
+    mapping1: Mapping[str, T],
+    mapping2: Mapping[str, T],
+    merge_func: Callable[[Sequence[T], bool], T],
+    should_raise: bool = True,
+) -> Mapping[str, T]:
+    # The sorted keys are merged in a single pass, the keys are the same in most merges
+    keys1: List[str] = ordered_keys(mapping1)
+    keys2: List[str] = ordered_keys(mapping2)
+
+    merged: Dict[str, T] = {}
+    if keys1 == keys2:
+        for key in keys1:
+            merged[key] = merge_func((mapping1[key], mapping2[key]), should_raise)
+        return merged
+
+    index1: int = 0
+    index2: int = 0
+    len1: int = len(keys1)
+    len2: int = len(keys2)
+    while index1 < len1 and index2 < len2:
+        key1: str = keys1[index1]
+        key2: str = keys2[index2]
+        if key1 == key2:
+            merged[key1] = merge_func((mapping1[key1], mapping2[key2]), should_raise)
+            index1 += 1
+            index2 += 1
+        elif key1 < key2:
+            merged[key1] = mapping1[key1]
+            index1 += 1
+        else:
+            merged[key2] = mapping2[key2]
+            index2 += 1
+    for key1 in keys1[index1:]:
+        merged[key1] = mapping1[key1]
+    for key2 in keys2[index2:]:
+        merged[key2] = mapping2[key2]
+    return merged
+
+
+def merge_mappings(
+    mappings: Sequence[Mapping[str, T]],
+    merge_func: Callable[[Sequence[T], bool], T],
+    should_raise: bool = True,
+) -> Mapping[str, T]:
+    if len(mappings) == 2:
+        return merge_two_mappings(mappings[0], mappings[1], merge_func, should_raise)
+
+    contributions: Dict[str, List[T]] = {}
+    for mapping in mappings:
+        for key, obj in mapping.items():
+            found: Optional[List[T]] = contributions.get(key)
+            if found is None:
+                contributions[key] = [obj]
+            else:
+                found.append(obj)
+
+    # The keys are in the order the mappings first give them, which is one sorted run per
+    # mapping, so sorting them merges the runs
+    merged: Dict[str, T] = {}
+    for key in sorted(contributions):
+        objs: List[T] = contributions[key]
+        merged[key] = objs[0] if len(objs) == 1 else merge_func(objs, should_raise)
+    return merged
+
+
+def merge_member_mappings(
+    mappings: Sequence[Mapping[str, T]],
+    merge_func: Callable[[T, T, bool], T],
+    should_raise: bool = True,
+) -> Mapping[str, T]:
+    return merge_mappings(
+        mappings, functools.partial(merge_all, merge_func=merge_func), should_raise
+    )
+
+
+def merge_interface_lists(type_defs: Sequence[Union[CClass, CInterface]]) -> Sequence[CType]:
+    return tuple(sorted({i for t in type_defs for i in t.interfaces}, key=by_sort_key))
+
+
+def distinct_versions(items: Sequence[T]) -> Sequence[T]:
+    # The same assembly is often extracted on several machines, which gives identical copies.
+    # Copies have the same content digest, so only the first of them is merged.
+    distinct: Dict[bytes, T] = {}
+    for item in items:
+        distinct.setdefault(item.fingerprint, item)
+    return tuple(distinct.values())
+
+
+def merge_namespaces(namespaces: Sequence[CNamespace], should_raise: bool = True) -> CNamespace:
+    logger.debug("Merging %d Namespaces: %s", len(namespaces), namespaces[0])
+
+    for namespace in namespaces[1:]:
+        verify_attribute(namespaces[0], namespace, "Namespaces", "name", should_raise)
+    namespaces = distinct_versions(namespaces)
+    if len(namespaces) == 1:
+        return namespaces[0]
+
+    type_map: Mapping[str, CTypeDefinition] = merge_mappings(
+        mappings=tuple(n.types for n in namespaces),
+        merge_func=merge_type_defs,
+        should_raise=should_raise,
+    )
+
+    return CNamespace(name=namespaces[0].name, types=type_map)
+
+
+def merge_type_defs(
+    type_defs: Sequence[CTypeDefinition], should_raise: bool = True
+) -> CTypeDefinition:
+    logger.debug("Merging %d Type Definitions: %s", len(type_defs), type_defs[0])
+    first: CTypeDefinition = type_defs[0]
+    class1: str = first.__class__.__name__
+
+    for type_def in type_defs[1:]:
+        class2: str = type_def.__class__.__name__
+        if class1 != class2:
+            raise TypeError(f"Type definitions are not the same: {class1} != {class2}")
+
+        verify_attribute(first, type_def, "Type Definitions", "name", True)
+        verify_attribute(first, type_def, "Type Definitions", "namespace", True)
+        verify_attribute(first, type_def, "Type Definitions", "nested", True)
+    type_defs = distinct_versions(type_defs)
+    if len(type_defs) == 1:
+        return first
+
+    if class1 == "CClass":
+        return merge_classes(cast(Sequence[CClass], type_defs), should_raise)
+    if class1 == "CStruct":
+        return merge_structs(cast(Sequence[CStruct], type_defs), should_raise)
+    if class1 == "CInterface":
+        return merge_interfaces(cast(Sequence[CInterface], type_defs), should_raise)
+    if class1 == "CEnum":
+        return merge_all(cast(Sequence[CEnum], type_defs), should_raise, merge_enum)
+    if class1 == "CDelegate":
+        return merge_all(cast(Sequence[CDelegate], type_defs), should_raise, merge_delegate)
+
+
+def merge_classes(classes: Sequence[CClass], should_raise: bool = True) -> CClass:
+    class1: CClass = classes[0]
+    for class2 in classes[1:]:
+        verify_attribute(class1, class2, "Classes", "abstract", should_raise)
+        verify_attribute(class1, class2, "Classes", "generic_args", should_raise)
+        verify_attribute(class1, class2, "Classes", "super_class", should_raise)
+
+    return CClass(
+        name=class1.name,
+        namespace=class1.namespace,
+        nested=class1.nested,
+        abstract=class1.abstract,
+        generic_args=class1.generic_args,
+        super_class=class1.super_class,
+        interfaces=merge_interface_lists(classes),
+        fields=merge_member_mappings(tuple(c.fields for c in classes), merge_field, should_raise),
+        constructors=merge_member_mappings(
+            tuple(c.constructors for c in classes), merge_constructor, should_raise
+        ),
+        properties=merge_member_mappings(
+            tuple(c.properties for c in classes), merge_property, should_raise
+        ),
+        methods=merge_member_mappings(
+            tuple(c.methods for c in classes), merge_method, should_raise
+        ),
+        events=merge_member_mappings(tuple(c.events for c in classes), merge_event, should_raise),
+        nested_types=merge_mappings(
+            tuple(c.nested_types for c in classes), merge_type_defs, should_raise
+        ),
+    )
+
+
+def merge_structs(structs: Sequence[CStruct], should_raise: bool = True) -> CStruct:
+    struct1: CStruct = structs[0]
+    for struct2 in structs[1:]:
+        verify_attribute(struct1, struct2, "Structs", "abstract", should_raise)
+        verify_attribute(struct1, struct2, "Structs", "generic_args", should_raise)
+        verify_attribute(struct1, struct2, "Structs", "super_class", should_raise)
+
+    return CStruct(
+        name=struct1.name,
+        namespace=struct1.namespace,
+        nested=struct1.nested,
+        abstract=struct1.abstract,
+        generic_args=struct1.generic_args,
+        super_class=struct1.super_class,
+        interfaces=merge_interface_lists(structs),
+        fields=merge_member_mappings(tuple(s.fields for s in structs), merge_field, should_raise),
+        constructors=merge_member_mappings(
+            tuple(s.constructors for s in structs), merge_constructor, should_raise
+        ),
+        properties=merge_member_mappings(
+            tuple(s.properties for s in structs), merge_property, should_raise
+        ),
+        methods=merge_member_mappings(
+            tuple(s.methods for s in structs), merge_method, should_raise
+        ),
+        events=merge_member_mappings(tuple(s.events for s in structs), merge_event, should_raise),
+        nested_types=merge_mappings(
+            tuple(s.nested_types for s in structs), merge_type_defs, should_raise
+        ),
+    )
+
+
+def merge_interfaces(interfaces: Sequence[CInterface], should_raise: bool = True) -> CInterface:
+    interface1: CInterface = interfaces[0]
+    for interface2 in interfaces[1:]:
+        verify_attribute(interface1, interface2, "Interfaces", "generic_args", should_raise)
+
+    return CInterface(
+        name=interface1.name,
+        namespace=interface1.namespace,
+        nested=interface1.nested,
+        generic_args=interface1.generic_args,
+        interfaces=merge_interface_lists(interfaces),
+        fields=merge_member_mappings(
+            tuple(i.fields for i in interfaces), merge_field, should_raise
+        ),
+        properties=merge_member_mappings(
+            tuple(i.properties for i in interfaces), merge_property, should_raise
+        ),
+        methods=merge_member_mappings(
+            tuple(i.methods for i in interfaces), merge_method, should_raise
+        ),
+        events=merge_member_mappings(
+            tuple(i.events for i in interfaces), merge_event, should_raise
+        ),
+        nested_types=merge_mappings(
+            tuple(i.nested_types for i in interfaces), merge_type_defs, should_raise
+        ),
+    )
+
+
 @dataclass
 class Imports:
     types: Final[Set[str]] = field(default_factory=set)
@@ -484,29 +544,151 @@ class Imports:
         return tuple(lines)
 
 
+class DocNodeIndex:
+    exact: Final[Mapping[str, int]]
+    wildcards: Final[Sequence[Tuple[int, str, re.Pattern]]]
+    matches: Final[Dict[str, Optional[str]]]
+
+    def __init__(self, data: Mapping[str, Any]):
+        exact: Dict[str, int] = {}
+        wildcards: List[Tuple[int, str, re.Pattern]] = []
+        position: int
+        key: str
+        for position, key in enumerate(data):
+            if "*" in key or "$" in key:
+                wildcards.append((position, key, re.compile(Doc.translate(key))))
+            else:
+                exact[key] = position
+        self.exact = exact
+        self.wildcards = tuple(wildcards)
+        self.matches = {}
+
+    def match(self, node: str) -> Optional[str]:
+        try:
+            return self.matches[node]
+        except KeyError:
+            pass
+
+        # Keys are tried in insertion order, so a wildcard key only wins over an exact key
+        # when it comes first in the node
+        key: Optional[str] = None
+        exact_position: Optional[int] = self.exact.get(node, None)
+        if exact_position is not None:
+            key = node
+        for position, wildcard_key, pattern in self.wildcards:
+            if exact_position is not None and position > exact_position:
+                break
+            if pattern.match(node) is not None:
+                key = wildcard_key
+                break
+
+        self.matches[node] = key
+        return key
+
+
+class DocIndex:
+    nodes: Final[Dict[int, Tuple[Mapping[str, Any], DocNodeIndex]]]
+    results: Final[Dict[Tuple[int, str], Any]]
+    types: Final[Dict[Tuple[int, Optional[CType]], Any]]
+
+    missing: Final[object] = object()
+
+    def __init__(self):
+        self.nodes = {}
+        self.results = {}
+        self.types = {}
+
+    def node(self, data: Mapping[str, Any]) -> DocNodeIndex:
+        try:
+            return self.nodes[id(data)][1]
+        except KeyError:
+            pass
+        node_index: DocNodeIndex = DocNodeIndex(data)
+        # The node is kept alongside its index so its id cannot be reused while cached
+        self.nodes[id(data)] = data, node_index
+        return node_index
+
+    def get(self, data: Any, node_str: str) -> Any:
+        result_key: Tuple[int, str] = (id(data), node_str)
+        try:
+            return self.results[result_key]
+        except KeyError:
+            pass
+
+        result: Any = self.missing
+        node: str
+        search: Optional[str] = node_str
+        while True:
+            if search in data:
+                result = data[search]
+                break
+            node, search = Doc.split_node_str(search)
+            key: Optional[str]
+            if isinstance(data, Mapping):
+                key = self.node(data).match(node)
+            else:
+                key = Doc.scan(data, node)
+            if key is None:
+                break
+            data = data[key]
+            if search is None:
+                result = data
+                break
+
+        self.results[result_key] = result
+        return result
+
+    def get_type(self, data: Any, type: Optional[CType]) -> Any:
+        type_key: Tuple[int, Optional[CType]] = (id(data), type)
+        try:
+            return self.types[type_key]
+        except KeyError:
+            pass
+        # Like the whole member path, the nodes of the type are matched against the keys in their
+        # order, so a wildcard key that comes before the exact key of the type still wins
+        result: Any = data
+        search: Optional[str] = str(type)
+        while search is not None:
+            node: str
+            node, search = Doc.split_node_str(search)
+            key: Optional[str]
+            if isinstance(result, Mapping):
+                key = self.node(result).match(node)
+            else:
+                key = Doc.scan(result, node)
+            if key is None:
+                result = self.missing
+                break
+            result = result[key]
+
+        self.types[type_key] = result
+        return result
+
+
 class Doc:
     data: Mapping[str, Any]
+    index: DocIndex
 
-    def __init__(self, data: Mapping[str, Any]):
+    def __init__(self, data: Mapping[str, Any], index: Optional[DocIndex] = None):
         self.data = data
+        self.index = DocIndex() if index is None else index
+
+    split_pattern: Final[re.Pattern] = re.compile(r"[.:\[\]()]")
 
     @classmethod
     def split_node_str(cls, node_str: str) -> Tuple[str, Optional[str]]:
-        result: List[str] = []
-        i: int = 0
-        n: int = len(node_str)
         bracket_count: int = 0
-        while i < n:
-            c: str = node_str[i]
-            i = i + 1
-            if c in (".", ":") and bracket_count == 0:
-                return "".join(result), "".join(node_str[i:])
-            if c in ("[", "("):
+        match: re.Match
+        for match in cls.split_pattern.finditer(node_str):
+            c: str = match.group()
+            if c in (".", ":"):
+                if bracket_count == 0:
+                    return node_str[: match.start()], node_str[match.end() :]
+            elif c in ("[", "("):
                 bracket_count += 1
-            elif c in ("]", ")"):
+            else:
                 bracket_count -= 1
-            result.append(c)
-        return "".join(result), None
+        return node_str, None
 
     @classmethod
     def translate(cls, pattern: str) -> str:
@@ -573,23 +755,29 @@ class Doc:
             result = cls.translate(pattern)
         return re.compile(result)
 
+    @classmethod
+    def scan(cls, data: Any, node: str) -> Optional[str]:
+        for key in data:
+            pattern: re.Pattern = cls._compile_pattern(key)
+            if pattern.match(node) is not None:
+                return key
+        return None
+
     def get(self, node_str: str) -> Optional[Doc]:
-        node: str
-        search: str = node_str
-        data: Mapping[str, Any] = self.data
-        while True:
-            if search in data:
-                return Doc(data[search])
-            node, search = self.split_node_str(search)
-            for key in data:
-                pattern: re.Pattern = self._compile_pattern(key)
-                if pattern.match(node) is not None:
-                    data = data[key]
-                    if search is None:
-                        return Doc(data)
-                    break
-            else:
-                return None
+        data: Any = self.index.get(self.data, node_str)
+        if data is DocIndex.missing:
+            return None
+        return Doc(data, self.index)
+
+    def get_member(self, member: CMember) -> Optional[Doc]:
+        # Each declaring type is resolved once, members then only search that type's node
+        data: Any = self.index.get_type(self.data, member.declaring_type)
+        if data is DocIndex.missing:
+            return None
+        data = self.index.get(data, member.doc_key)
+        if data is DocIndex.missing:
+            return None
+        return Doc(data, self.index)
 
     def doc_string(self, indent: int = 0, line_length: int = 100) -> Sequence[str]:
         indent_str: str = "    " * indent
@@ -657,6 +845,50 @@ class Doc:
         return lines
 
 
+class LayeredDocNode(Mapping[str, Any]):
+    # The doc nodes at one path in several doc files, read as the node merge_doc_node would
+    # build from them. Child nodes are merged when they are first looked up and then kept, so
+    # only the parts of the doc files that are used are ever merged.
+    layers: Final[Sequence[Mapping[str, Any]]]
+    merged: Final[Dict[str, Any]]
+    key_list: Optional[Sequence[str]]
+
+    def __init__(self, layers: Sequence[Mapping[str, Any]]):
+        self.layers = tuple(layers)
+        self.merged = {}
+        self.key_list = None
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return self.merged[key]
+        except KeyError:
+            pass
+
+        values: List[Any] = [layer[key] for layer in self.layers if key in layer]
+        if len(values) == 0:
+            raise KeyError(key)
+        value: Any = values[0]
+        if len(values) > 1:
+            if key in DOC_ENTRY_KEYS:
+                value = functools.reduce(functools.partial(merge_doc_entry, key), values)
+            else:
+                value = LayeredDocNode(values)
+        # Threads building stubs must all get the same node, the doc index caches by id
+        return self.merged.setdefault(key, value)
+
+    def __contains__(self, key: object) -> bool:
+        return any(key in layer for layer in self.layers)
+
+    def __iter__(self) -> Iterator[str]:
+        if self.key_list is None:
+            # Same order as merge_doc_node, wildcard keys are matched in this order
+            self.key_list = tuple(dict.fromkeys(k for layer in self.layers for k in layer))
+        return iter(self.key_list)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
 def merge_doc(self, other: Doc) -> Doc:
     return Doc(merge_doc_node(self.data, other.data))
 
@@ -667,32 +899,41 @@ def merge_doc_node(d1: Mapping[str, Any], d2: Mapping[str, Any]) -> Mapping[str,
     for k2, v2 in d2.items():
         if k2 not in new_dict:
             new_dict[k2] = v2
-            continue
-
-        v1: Any = new_dict[k2]
-        if k2 in ("doc", "return"):
-            new_dict[k2] = (v1 + "\n" + v2) if v1 != "" and v2 != "" else (v1 + v2)
-        elif k2 == "doc_formatted":
-            new: Dict[str, Sequence[str]] = dict(**v1)
-            for k, v in v2.items():
-                if k in new:
-                    new[k] += v
-                else:
-                    new[k] = v
-            new_dict[k2] = new
-        elif k2 in ("parameters", "exceptions"):
-            new: Dict[str, str] = dict(**v1)
-            for k, v in v2.items():
-                if k in new:
-                    new[k] = (new[k] + "\n" + v) if new[k] != "" and v != "" else (new[k] + v)
-                else:
-                    new[k] = v
-            new_dict[k2] = new
         else:
-            new_dict[k2] = merge_doc_node(v1, v2)
+            new_dict[k2] = merge_doc_entry(k2, new_dict[k2], v2)
     return new_dict
 
 
+DOC_ENTRY_KEYS: Final[Sequence[str]] = (
+    "doc",
+    "return",
+    "doc_formatted",
+    "parameters",
+    "exceptions",
+)
+
+
+def merge_doc_text(text1: str, text2: str) -> str:
+    return (text1 + "\n" + text2) if text1 != "" and text2 != "" else (text1 + text2)
+
+
+def merge_doc_entry(key: str, v1: Any, v2: Any) -> Any:
+    if key in ("doc", "return"):
+        return merge_doc_text(v1, v2)
+    if key == "doc_formatted":
+        # New sequences, the loaded doc files are left unchanged
+        new: Dict[str, Sequence[str]] = dict(**v1)
+        for k, v in v2.items():
+            new[k] = new[k] + v if k in new else v
+        return new
+    if key in ("parameters", "exceptions"):
+        new: Dict[str, str] = dict(**v1)
+        for k, v in v2.items():
+            new[k] = merge_doc_text(new[k], v) if k in new else v
+        return new
+    return merge_doc_node(v1, v2)
+
+
 type_conversion: Final[Mapping[str, str]] = {}
 
 
@@ -966,9 +1207,9 @@ def build_enum(
 
     indent_str: str = "    " * (indent + 1)
     doc_str: Sequence[str]
-    doc_node: Doc = doc.get(str(type_def))
-    if doc_node is not None:
-        doc_str = doc_node.doc_string(indent=indent + 1, line_length=line_length)
+    type_doc: Optional[Doc] = doc.get(str(type_def))
+    if type_doc is not None:
+        doc_str = type_doc.doc_string(indent=indent + 1, line_length=line_length)
     else:
         doc_str = [f'{indent_str}""""""']
     lines.extend(doc_str)
@@ -976,7 +1217,7 @@ def build_enum(
     for field in type_def.fields:
         lines.append(f"{indent_str}{make_python_name(field)}: {type_def.name} = ...")
 
-        doc_node: Doc = doc.get(f"{type_def.namespace}.{type_def.name}.{field}")
+        doc_node: Optional[Doc] = None if type_doc is None else type_doc.get(field)
         if doc_node is not None:
             doc_str = doc_node.doc_string(indent=indent + 1, line_length=line_length)
         else:
@@ -1090,7 +1331,7 @@ def build_field(
         type_str = f"ClassVar[{type_str}]"
 
     doc_str: Sequence[str]
-    doc_node: Doc = doc.get(str(field))
+    doc_node: Optional[Doc] = doc.get_member(field)
     if doc_node is not None:
         doc_str = doc_node.doc_string(indent=indent, line_length=line_length)
     else:
@@ -1119,7 +1360,7 @@ def build_constructor(
     lines.append(f"{'    ' * indent}def __init__(self{''.join(parameters)}):")
 
     doc_str: Sequence[str]
-    doc_node: Doc = doc.get(str(constructor))
+    doc_node: Optional[Doc] = doc.get_member(constructor)
     if doc_node is not None:
         doc_str = doc_node.doc_string(indent=indent + 1, line_length=line_length)
     else:
@@ -1146,7 +1387,7 @@ def build_property(
             type_str = f"Final[{type_str}]"
 
         doc_str: Sequence[str]
-        doc_node: Doc = doc.get(str(property))
+        doc_node: Optional[Doc] = doc.get_member(property)
         if doc_node is not None:
             doc_str = doc_node.doc_string(indent=indent, line_length=line_length)
         else:
@@ -1160,7 +1401,7 @@ def build_property(
     lines.append(f"{indent_str}def {property.name}(self) -> {property_type}:")
 
     doc_str: Sequence[str]
-    doc_node: Doc = doc.get(str(property))
+    doc_node: Optional[Doc] = doc.get_member(property)
     if doc_node is not None:
         doc_str = doc_node.doc_string(indent=indent + 1, line_length=line_length)
     else:
@@ -1212,7 +1453,7 @@ def build_method(
     )
 
     doc_str: Sequence[str]
-    doc_node: Doc = doc.get(str(method))
+    doc_node: Optional[Doc] = doc.get_member(method)
     if doc_node is not None:
         doc_str = doc_node.doc_string(indent=indent + 1, line_length=line_length)
     else:
@@ -1238,7 +1479,7 @@ def build_event(
     ]
 
     doc_str: Sequence[str]
-    doc_node: Doc = doc.get(str(event))
+    doc_node: Optional[Doc] = doc.get_member(event)
     if doc_node is not None:
         doc_str = doc_node.doc_string(indent=indent, line_length=line_length)
     else:
@@ -1271,6 +1512,105 @@ def build_stub(namespace: CNamespace, doc: Doc, output_dir: Path, line_length: i
     namespace_file.write_text("\n".join(lines))
 
 
+def merge_contributions(
+    contributions: Sequence[Mapping[str, CNamespace]],
+) -> Mapping[str, CNamespace]:
+    versions_by_name: Dict[str, List[CNamespace]] = {}
+    for namespaces in contributions:
+        for name, namespace in namespaces.items():
+            versions_by_name.setdefault(name, []).append(namespace)
+
+    # All versions of a namespace are merged in one pass instead of one pair at a time
+    return {
+        name: versions[0] if len(versions) == 1 else merge_namespaces(versions, False)
+        for name, versions in versions_by_name.items()
+    }
+
+
+def load_skeletons(skeleton_files: Sequence[Path]) -> Mapping[str, CNamespace]:
+    contributions: List[Mapping[str, CNamespace]] = []
+    for skeleton_file in skeleton_files:
+        logger.info("Loading skeletons file: '%s'", skeleton_file)
+        with skeleton_file.open("r") as file:
+            skeleton_dict: Dict[str, Any] = json.load(file)
+
+        contributions.append(
+            {
+                namespace_json["name"]: CNamespace.from_json(namespace_json)
+                for namespace_json in skeleton_dict["namespaces"].values()
+            }
+        )
+    logger.debug("CType cache: %s", CType.from_json.cache_info())
+
+    return merge_contributions(contributions)
+
+
+def split_by_size(files: Sequence[Path], count: int) -> Sequence[Sequence[Path]]:
+    # Contiguous shares of about the same number of bytes, so they take about as long to load.
+    # Each file goes to the share its middle byte falls in.
+    sizes: Sequence[int] = tuple(f.stat().st_size for f in files)
+    total: int = max(1, sum(sizes))
+    shares: List[List[Path]] = [[] for _ in range(count)]
+    loaded: int = 0
+    for file, size in zip(files, sizes):
+        shares[min(count - 1, (2 * loaded + size) * count // (2 * total))].append(file)
+        loaded += size
+    return tuple(s for s in shares if s)
+
+
+def same(value: T) -> T:
+    return value
+
+
+class SharingPickler(pickle.Pickler):
+    # Every type lists the members it inherits, so most members and parameters are loaded many
+    # times. Equal ones are pickled once, which leaves far fewer objects to rebuild in the parent.
+    def __init__(self, file: BinaryIO) -> None:
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.first: Final[Dict[Any, Any]] = {}
+
+    def reducer_override(self, obj: Any) -> Any:
+        if isinstance(obj, (CMember, CParameter)):
+            first: Any = self.first.setdefault(obj, obj)
+            if first is not obj:
+                return same, (first,)
+        return NotImplemented
+
+
+def load_skeleton_share(skeleton_files: Sequence[Path]) -> bytes:
+    buffer: io.BytesIO = io.BytesIO()
+    SharingPickler(buffer).dump(load_skeletons(skeleton_files))
+    return buffer.getvalue()
+
+
+def load_skeletons_in_workers(
+    skeleton_files: Sequence[Path], process_count: int
+) -> Mapping[str, CNamespace]:
+    # Each worker loads a share of the files and merges the namespaces in it, which leaves the
+    # parent far fewer versions to merge. Shares are contiguous and merged in order, so the
+    # versions are merged in file order as when loading in this process.
+    shares: Sequence[Sequence[Path]] = split_by_size(skeleton_files, process_count)
+    if gil_disabled():
+        with ThreadPoolExecutor(process_count, thread_name_prefix="Loader") as executor:
+            return merge_contributions(tuple(executor.map(load_skeletons, shares)))
+
+    pool: WorkerPool = WorkerPool(
+        load_skeleton_share,
+        worker_count=len(shares),
+        initializer=init_worker,
+        initargs=(console_handler.level,),
+    )
+    contributions: List[Optional[Mapping[str, CNamespace]]] = [None] * len(shares)
+    for index, result in pool.imap_unordered((share,) for share in shares):
+        if isinstance(result, WorkerError):
+            raise WorkerError(
+                f"Unable to load skeleton files {shares[index][0]} to {shares[index][-1]}:\n"
+                f"{result}"
+            )
+        contributions[index] = pickle.loads(result)
+    return merge_contributions(contributions)
+
+
 def build_stubs(
     skeleton_files: Sequence[Path],
     doc_files: Sequence[Path],
@@ -1278,27 +1618,21 @@ def build_stubs(
     line_length: int,
     multi_threaded: bool,
     format_files: bool,
+    process_count: Optional[int] = None,
 ) -> Union[int, str]:
-    namespaces: Dict[str, CNamespace] = {}
-    for skeleton_file in skeleton_files:
-        logger.info("Loading skeletons file: '%s'", skeleton_file)
-        with skeleton_file.open("r") as file:
-            skeleton_dict: Dict[str, Any] = json.load(file)
-
-        for namespace_json in skeleton_dict["namespaces"].values():
-            namespace: CNamespace = CNamespace.from_json(namespace_json)
-            if namespace.name in namespaces:
-                namespace = merge_namespace(namespaces[namespace.name], namespace, False)
-            namespaces[namespace.name] = namespace
+    namespaces: Mapping[str, CNamespace]
+    if process_count is not None and process_count > 1 and len(skeleton_files) > 1:
+        namespaces = load_skeletons_in_workers(skeleton_files, process_count)
+    else:
+        namespaces = load_skeletons(skeleton_files)
 
-    doc: Doc = Doc({})
+    doc_layers: List[Mapping[str, Any]] = []
     for doc_file in doc_files:
         logger.info("Loading Doc File: %r", str(doc_file))
         with doc_file.open("r") as file:
-            loaded_doc_dict_tree: Dict[str, Any] = json.load(file)
-
-        new_doc: Doc = Doc(loaded_doc_dict_tree)
-        doc = merge_doc(doc, new_doc)
+            doc_layers.append(json.load(file))
+    # Merged the same as with merge_doc, but only where the stubs look
+    doc: Doc = Doc(LayeredDocNode(doc_layers))
 
     if multi_threaded:
         executor: Executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="Worker")
@@ -0,0 +1,568 @@
+from __future__ import annotations
+
+import dataclasses
+import functools
+import itertools
+import json
+import sys
+import tempfile
+import time
+from concurrent.futures import Executor
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+from typing import BinaryIO
+from typing import Callable
+from typing import Collection
+from typing import Dict
+from typing import Final
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import TextIO
+from typing import Tuple
+from typing import TypeVar
+from typing import Union
+
+from stubgen.log import console_handler
+from stubgen.log import get_logger
+from stubgen.manifest import Manifest
+from stubgen.manifest import ManifestEntry
+from stubgen.model import CMethod
+from stubgen.model import CParameter
+from stubgen.model import CProperty
+from stubgen.model import CType
+from stubgen.model import CTypeDefinition
+from stubgen.model import by_sort_key
+from stubgen.pool import WorkerError
+from stubgen.pool import WorkerPool
+
+# Parts of the extraction shared by the reflection and the metadata backends
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+ExtractResult = Tuple[Union[int, str], Optional[ManifestEntry]]
+
+# Type workers get more slices than there are workers, so one slow slice does not leave the
+# others idle
+SLICES_PER_WORKER: Final[int] = 4
+
+COPY_CHUNK_SIZE: Final[int] = 1 << 20
+
+
+def member_table(raw_members: Iterable[T]) -> Mapping[str, T]:
+    sorted_members: Sequence[T] = sorted(raw_members, key=by_sort_key)
+
+    return {str(member): member for member in sorted_members}
+
+
+def property_table(raw_members: Iterable[CProperty]) -> Mapping[str, CProperty]:
+    sorted_members: Sequence[CProperty] = sorted(raw_members, key=by_sort_key)
+
+    # TODO - Item property will need a special type to handle get/set of different types
+    excluded: Collection[str] = ("Item",)
+
+    def filter_func(member: CProperty) -> bool:
+        return member.name not in excluded
+
+    return {str(member): member for member in sorted_members if filter_func(member)}
+
+
+def method_table(raw_members: Iterable[CMethod]) -> Mapping[str, CMethod]:
+    raw_members: List[CMethod] = list(raw_members)
+
+    supported_methods: Mapping[str, Tuple[str, bool]] = {
+        "op_Addition": ("__add__", True),
+        "op_BitwiseAnd": ("__and__", True),
+        "op_BitwiseOr": ("__or__", True),
+        # "op_Decrement": "",
+        "op_Division": ("__truediv__", True),
+        "op_Equality": ("__eq__", True),
+        "op_ExclusiveOr": ("__xor__", True),
+        "op_GreaterThan": ("__gt__", True),
+        "op_GreaterThanOrEqual": ("__ge__", True),
+        # "op_Implicit": ""
+        # "op_Increment": "",
+        "op_Inequality": ("__ne__", True),
+        "op_LeftShift": ("__lshift__", True),
+        "op_LessThan": ("__lt__", True),
+        "op_LessThanOrEqual": ("__le__", True),
+        "op_Modulus": ("__mod__", True),
+        "op_Multiply": ("__mul__", True),
+        "op_OnesComplement": ("__invert__", True),
+        "op_RightShift": ("__rshift__", True),
+        "op_Subtraction": ("__sub__", True),
+        "op_UnaryNegation": ("__neg__", True),
+        "op_UnaryPlus": ("__pos__", True),
+        # "op_UnsignedRightShift": "",
+        "get_Item": ("__getitem__", False),
+        "set_Item": ("__setitem__", False),
+        "Remove": ("__delitem__", False),
+        "get_Count": ("__len__", False),
+        "Contains": ("__contains__", False),
+        "ContainsKey": ("__contains__", False),
+    }
+
+    method: CMethod
+    for method in tuple(raw_members):
+        if method.name in supported_methods:
+            new_name, remove_param = supported_methods[method.name]
+            parameters: Sequence[CParameter] = method.parameters
+            if remove_param:
+                parameters = tuple(
+                    map(lambda p: dataclasses.replace(p, name="other"), method.parameters[1:])
+                )
+
+            method: CMethod = dataclasses.replace(
+                method,
+                name=new_name,
+                parameters=parameters,
+                static=False,
+            )
+            raw_members.append(method)
+        if method.name == "GetEnumerator":
+            return_types: Sequence[CType] = (
+                dataclasses.replace(
+                    method.return_types[0],
+                    name="Iterator",
+                    namespace="typing",
+                ),
+            )
+            method: CMethod = dataclasses.replace(
+                method,
+                name="__iter__",
+                return_types=return_types,
+            )
+            raw_members.append(method)
+
+    sorted_members: Sequence[CMethod] = sorted(raw_members, key=by_sort_key)
+
+    def filter_func(member: CMethod) -> bool:
+        return not (
+            member.name.startswith("get_")
+            or member.name.startswith("set_")
+            or member.name.startswith("add_")
+            or member.name.startswith("remove_")
+        )
+
+    return {str(member): member for member in sorted_members if filter_func(member)}
+
+
+class AssemblyWriter:
+    # Writes the skeleton file one type at a time in the layout json.dump(indent=2) gives the
+    # whole assembly, so only the types being written are held in memory. Types have to be written
+    # in the skeleton order, by namespace and then by sort key. Of types with the same name the
+    # last one is kept, at the place of the first.
+    #
+    # The doc file nests the namespaces by their dotted parts in the order the assembly lists
+    # them, which is not the skeleton order. The doc entries of each namespace are spooled to a
+    # temporary file and copied into that order when the writer is closed.
+    def __init__(
+        self,
+        assembly_name: str,
+        assembly_version: str,
+        extract_file: Path,
+        doc_file: Path,
+        namespaces: Sequence[str] = (),
+    ) -> None:
+        self.assembly_name: Final[str] = assembly_name
+        self.assembly_version: Final[str] = assembly_version
+        self.extract_file: Final[Path] = extract_file
+        self.doc_file: Final[Path] = doc_file
+        # Namespaces missing from the given order follow it in the order they are written
+        self.namespace_order: Final[Dict[str, int]] = {n: i for i, n in enumerate(namespaces)}
+        self.skeleton: Optional[TextIO] = None
+        self.doc: Optional[TextIO] = None
+        self.spool: Optional[BinaryIO] = None
+        self.last_key: Optional[Tuple[str, Any]] = None
+        self.namespace: Optional[str] = None
+        self.type_count: int = 0
+        self.pending: Dict[str, CTypeDefinition] = {}
+        self.doc_start: int = 0
+        self.doc_ranges: Dict[str, Tuple[int, int]] = {}
+
+    def __enter__(self) -> AssemblyWriter:
+        logger.debug("Saving types to file: %r", str(self.extract_file))
+        self.skeleton = self.extract_file.open("w")
+        logger.debug("Generating doc file: %r", str(self.doc_file))
+        self.doc = self.doc_file.open("w")
+        self.spool = tempfile.TemporaryFile()
+
+        self.skeleton.write(
+            f'{{\n  "name": {dumps(self.assembly_name, 1)},'
+            f'\n  "version": {dumps(self.assembly_version, 1)},'
+            f'\n  "namespaces": {{'
+        )
+        return self
+
+    def __exit__(self, exc_type: Any, exc_value: Any, traceback: Any) -> None:
+        try:
+            if exc_type is None:
+                if self.namespace is None:
+                    self.skeleton.write("}\n}")
+                else:
+                    self.end_namespace()
+                    self.skeleton.write("\n  }\n}")
+                self.write_doc()
+        finally:
+            self.skeleton.close()
+            self.doc.close()
+            self.spool.close()
+            if exc_type is not None:
+                # A partial file would be taken for a finished one by the next run
+                self.extract_file.unlink()
+                self.doc_file.unlink()
+
+    def write(self, type_definition: CTypeDefinition) -> None:
+        key: Tuple[str, Any] = (type_definition.namespace, type_definition.sort_key)
+        if self.last_key is not None and key < self.last_key:
+            raise ValueError(f"Type written out of order: {type_definition}")
+
+        # Types of the same name have the same sort key, so they are all pending together
+        if key != self.last_key:
+            self.write_pending()
+            if type_definition.namespace != self.namespace:
+                if self.namespace is not None:
+                    self.end_namespace()
+                self.start_namespace(type_definition.namespace)
+        self.last_key = key
+
+        name: str = str(type_definition)
+        if name in self.pending:
+            logger.debug("Replacing duplicate type: %s", name)
+        self.pending[name] = type_definition
+
+    def write_pending(self) -> None:
+        if not self.pending:
+            return
+        level: int = self.namespace.count(".") + 2
+        name: str
+        type_definition: CTypeDefinition
+        for name, type_definition in self.pending.items():
+            separator: str = "," if self.type_count > 0 else ""
+            self.skeleton.write(
+                f"{separator}\n        {dumps(name, 4)}: {dumps(type_definition.to_json(), 4)}"
+            )
+            self.type_count += 1
+
+            doc_name, doc_json = type_definition.to_doc_json()
+            self.spool.write(
+                f",\n{'  ' * level}{dumps(doc_name, level)}: {dumps(doc_json, level)}".encode()
+            )
+        self.pending.clear()
+
+    def start_namespace(self, namespace: str) -> None:
+        separator: str = "," if self.namespace is not None else ""
+        self.skeleton.write(
+            f'{separator}\n    {dumps(namespace, 2)}: {{\n      "name": {dumps(namespace, 3)},'
+            f'\n      "types": {{'
+        )
+        self.namespace = namespace
+        self.type_count = 0
+        self.doc_start = self.spool.tell()
+
+    def end_namespace(self) -> None:
+        self.write_pending()
+        self.skeleton.write("\n      }\n    }")
+        self.doc_ranges[self.namespace] = (self.doc_start, self.spool.tell())
+
+    def write_doc(self) -> None:
+        # Each namespace is a node of the tree of dotted parts, the None key places its types
+        # among the nested namespaces the same as adding them to nested dicts would
+        tree: Dict[Optional[str], Any] = {}
+        namespace: str
+        for namespace in sorted(
+            self.doc_ranges, key=lambda n: self.namespace_order.get(n, len(self.namespace_order))
+        ):
+            node: Dict[Optional[str], Any] = tree
+            for part in namespace.split("."):
+                node = node.setdefault(part, {})
+            node[None] = namespace
+
+        self.doc.write("{")
+        self.write_doc_node(tree, 1)
+        self.doc.write("\n}" if tree else "}")
+
+    def write_doc_node(self, node: Dict[Optional[str], Any], level: int) -> None:
+        indent: str = "  " * level
+        # Nested namespaces always follow their "doc" key
+        separator: str = "," if level > 1 else ""
+        part: Optional[str]
+        for part, child in node.items():
+            if part is None:
+                self.copy_doc_entries(*self.doc_ranges[child])
+                continue
+            self.doc.write(f'{separator}\n{indent}{dumps(part, level)}: {{\n{indent}  "doc": ""')
+            self.write_doc_node(child, level + 1)
+            self.doc.write(f"\n{indent}}}")
+            separator = ","
+
+    def copy_doc_entries(self, start: int, stop: int) -> None:
+        self.spool.seek(start)
+        while start < stop:
+            chunk: bytes = self.spool.read(min(stop - start, COPY_CHUNK_SIZE))
+            self.doc.write(chunk.decode())
+            start += len(chunk)
+
+
+def dumps(value: Any, level: int) -> str:
+    # Strings in the output never contain raw line breaks, so every line break starts a line
+    # that has to be indented to the level of the value
+    return json.dumps(value, indent=2).replace("\n", "\n" + "  " * level)
+
+
+def gil_disabled() -> bool:
+    # sys._is_gil_enabled exists from Python 3.13 on
+    is_gil_enabled: Callable[[], bool] = getattr(sys, "_is_gil_enabled", lambda: True)
+    return not is_gil_enabled()
+
+
+def extract_types_in_workers(
+    extract_slice: Callable[..., Sequence[Optional[CTypeDefinition]]],
+    args: Sequence[Any],
+    type_names: Sequence[str],
+    worker_count: int,
+) -> Iterator[Optional[CTypeDefinition]]:
+    # Each worker is given (*args, start, stop), loads the assembly itself and extracts that
+    # slice of the sorted type list. The slices are yielded in order, so the types come out the
+    # same for any number of workers.
+    slice_size: int = max(1, -(-len(type_names) // (worker_count * SLICES_PER_WORKER)))
+    slices: Sequence[Tuple[int, int]] = tuple(
+        (start, min(start + slice_size, len(type_names)))
+        for start in range(0, len(type_names), slice_size)
+    )
+    tasks: Sequence[Sequence[Any]] = tuple((*args, start, stop) for start, stop in slices)
+
+    if gil_disabled():
+        with ThreadPoolExecutor(worker_count, thread_name_prefix="TypeWorker") as executor:
+            for type_definitions in executor.map(lambda task: extract_slice(*task), tasks):
+                yield from type_definitions
+        return
+
+    pool: WorkerPool = WorkerPool(
+        extract_slice,
+        worker_count=worker_count,
+        initializer=init_worker,
+        initargs=(console_handler.level,),
+    )
+    results: Iterator[Tuple[int, Any]] = pool.imap_unordered(tasks)
+    finished: Dict[int, Any] = {}
+    next_index: int = 0
+    try:
+        for index, result in results:
+            finished[index] = result
+            while next_index in finished:
+                result = finished.pop(next_index)
+                start, stop = slices[next_index]
+                if isinstance(result, WorkerError):
+                    logger.warning(
+                        "Could not extract types %s to %s:\n%s",
+                        type_names[start],
+                        type_names[stop - 1],
+                        result,
+                    )
+                    result = (None,) * (stop - start)
+                yield from result
+                next_index += 1
+    finally:
+        results.close()
+
+
+def reference_closure(
+    assembly_names: Sequence[str],
+    get_references: Callable[[str], Optional[Tuple[str, Sequence[str]]]],
+) -> Sequence[str]:
+    # get_references loads an assembly and returns a key that identifies it and the names of the
+    # assemblies it references. Depth first, so every assembly comes after the ones it references
+    # and their base types are already extracted and cached. Cycles are broken where found.
+    closure: List[str] = []
+    visited_names: Set[str] = set()
+    visited: Set[str] = set()
+
+    def visit(assembly_name: str, is_entry: bool) -> None:
+        if assembly_name in visited_names:
+            return
+        visited_names.add(assembly_name)
+        found: Optional[Tuple[str, Sequence[str]]] = get_references(assembly_name)
+        if found is None:
+            if is_entry:
+                # Fails again when extracted and is reported there
+                closure.append(assembly_name)
+            else:
+                logger.warning("Unable to load referenced assembly: %s", assembly_name)
+            return
+        key, references = found
+        if key in visited:
+            return
+        visited.add(key)
+        for reference in references:
+            visit(reference, False)
+        closure.append(assembly_name)
+
+    for entry_name in assembly_names:
+        visit(entry_name, True)
+
+    logger.info(
+        "Reference closure of %d assemblies has %d assemblies", len(assembly_names), len(closure)
+    )
+    return closure
+
+
+def timed_extract(
+    extract_entry: Callable[[str, Path, bool], ExtractResult],
+    assembly_name: str,
+    output_dir: Path,
+    overwrite: bool,
+) -> ExtractResult:
+    start: float = time.perf_counter()
+    try:
+        return extract_entry(assembly_name, output_dir, overwrite)
+    finally:
+        logger.info("Finished %s in %.2f s", assembly_name, time.perf_counter() - start)
+
+
+def extract_changed(
+    extract_entry: Callable[[str, Path, bool], ExtractResult],
+    locate: Callable[[str], Optional[Path]],
+    options: Mapping[str, Any],
+    previous: Mapping[str, ManifestEntry],
+    assembly_name: str,
+    output_dir: Path,
+    overwrite: bool,
+) -> ExtractResult:
+    # Runs where the assembly is extracted, as locating it can load it into the runtime
+    entry: Optional[ManifestEntry] = previous.get(assembly_name)
+    if entry is not None:
+        current: Optional[ManifestEntry] = entry.check(locate(assembly_name), output_dir, options)
+        if current is not None:
+            logger.info("Skipping unchanged assembly: %r", assembly_name)
+            return 0, current
+    return extract_entry(assembly_name, output_dir, overwrite)
+
+
+def run_extraction(
+    extract_entry: Callable[[str, Path, bool], ExtractResult],
+    locate: Callable[[str], Optional[Path]],
+    options: Mapping[str, Any],
+    assembly_names: Sequence[str],
+    output_dir: Path,
+    overwrite: bool,
+    skip_failed: bool,
+    multi_threaded: bool,
+    process_count: Optional[int] = None,
+    max_assemblies_per_process: Optional[int] = None,
+) -> Union[int, str]:
+    manifest: Manifest = Manifest(output_dir)
+    # Assemblies are checked against their manifest entries by the workers that would extract them
+    previous: Mapping[str, ManifestEntry] = (
+        {} if overwrite else {n: manifest.entries[n] for n in assembly_names if n in manifest}
+    )
+    extract_entry = functools.partial(
+        timed_extract,
+        functools.partial(extract_changed, extract_entry, locate, options, previous),
+    )
+    # Files listed in the manifest were written by a previous run and may be replaced
+    overwrites: Sequence[bool] = tuple(overwrite or n in manifest for n in assembly_names)
+
+    def record(assembly_name: str, result: ExtractResult) -> Union[int, str]:
+        exit_code, entry = result
+        if entry is not None:
+            manifest.update(assembly_name, dataclasses.replace(entry, options=options))
+        return exit_code
+
+    try:
+        if process_count is not None:
+            return extract_assemblies_in_processes(
+                extract_entry,
+                assembly_names,
+                output_dir,
+                overwrites,
+                skip_failed,
+                process_count,
+                max_assemblies_per_process,
+                record,
+            )
+        if multi_threaded:
+            executor: Executor = ThreadPoolExecutor(thread_name_prefix="Worker")
+            for assembly_name, result in zip(
+                assembly_names,
+                executor.map(
+                    extract_entry,
+                    assembly_names,
+                    itertools.repeat(output_dir),
+                    overwrites,
+                ),
+            ):
+                exit_code: Union[int, str] = record(assembly_name, result)
+                if exit_code != 0 and not skip_failed:
+                    executor.shutdown(cancel_futures=True)
+                    return exit_code
+            executor.shutdown(wait=True)
+        else:
+            assembly_name: str
+            for assembly_name, assembly_overwrite in zip(assembly_names, overwrites):
+                try:
+                    exit_code: Union[int, str] = record(
+                        assembly_name,
+                        extract_entry(assembly_name, output_dir, assembly_overwrite),
+                    )
+                    if exit_code != 0 and not skip_failed:
+                        return exit_code
+                except Exception as e:
+                    if skip_failed:
+                        logger.warning("Could not extract assembly: %s", assembly_name, exc_info=e)
+                    else:
+                        raise e from None
+
+        return 0
+    finally:
+        manifest.save()
+
+
+def init_worker(log_level: int) -> None:
+    console_handler.setLevel(log_level)
+
+
+def extract_assemblies_in_processes(
+    extract_entry: Callable[[str, Path, bool], ExtractResult],
+    assembly_names: Sequence[str],
+    output_dir: Path,
+    overwrites: Sequence[bool],
+    skip_failed: bool,
+    process_count: int,
+    max_assemblies_per_process: Optional[int],
+    record: Callable[[str, ExtractResult], Union[int, str]],
+) -> Union[int, str]:
+    # Each worker is a fresh process with its own runtime, recycling bounds its memory growth
+    pool: WorkerPool = WorkerPool(
+        extract_entry,
+        worker_count=process_count,
+        max_tasks_per_worker=max_assemblies_per_process,
+        initializer=init_worker,
+        initargs=(console_handler.level,),
+    )
+    results: Iterator[Tuple[int, Any]] = pool.imap_unordered(
+        zip(assembly_names, itertools.repeat(output_dir), overwrites)
+    )
+    try:
+        for index, result in results:
+            if isinstance(result, WorkerError):
+                if skip_failed:
+                    logger.warning(
+                        "Could not extract assembly: %s\n%s", assembly_names[index], result
+                    )
+                    continue
+                raise result
+            exit_code: Union[int, str] = record(assembly_names[index], result)
+            if exit_code != 0 and not skip_failed:
+                return exit_code
+    finally:
+        results.close()
+
+    return 0
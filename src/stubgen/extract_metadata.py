@@ -0,0 +1,1023 @@
+from __future__ import annotations
+
+import dataclasses
+import functools
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+from typing import Collection
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import TypeVar
+from typing import Union
+
+from stubgen.extract_common import AssemblyWriter
+from stubgen.extract_common import ExtractResult
+from stubgen.extract_common import extract_types_in_workers
+from stubgen.extract_common import member_table
+from stubgen.extract_common import method_table
+from stubgen.extract_common import property_table
+from stubgen.extract_common import reference_closure
+from stubgen.extract_common import run_extraction
+from stubgen.log import get_logger
+from stubgen.manifest import ManifestEntry
+from stubgen.metadata import ASSEMBLY
+from stubgen.metadata import ASSEMBLY_REF
+from stubgen.metadata import ELEMENT_TYPE_ARRAY
+from stubgen.metadata import ELEMENT_TYPE_BYREF
+from stubgen.metadata import ELEMENT_TYPE_GENERICINST
+from stubgen.metadata import ELEMENT_TYPE_MVAR
+from stubgen.metadata import ELEMENT_TYPE_PTR
+from stubgen.metadata import ELEMENT_TYPE_SZARRAY
+from stubgen.metadata import ELEMENT_TYPE_VAR
+from stubgen.metadata import EVENT
+from stubgen.metadata import EVENT_MAP
+from stubgen.metadata import EXPORTED_TYPE
+from stubgen.metadata import FIELD
+from stubgen.metadata import FIELD_LITERAL
+from stubgen.metadata import GENERIC_PARAM
+from stubgen.metadata import HAS_SEMANTICS
+from stubgen.metadata import IMPLEMENTATION
+from stubgen.metadata import INTERFACE_IMPL
+from stubgen.metadata import MEMBER_ACCESS_MASK
+from stubgen.metadata import MEMBER_PUBLIC
+from stubgen.metadata import MEMBER_STATIC
+from stubgen.metadata import METHOD_DEF
+from stubgen.metadata import METHOD_RT_SPECIAL_NAME
+from stubgen.metadata import METHOD_SEMANTICS
+from stubgen.metadata import NESTED_CLASS
+from stubgen.metadata import PARAM
+from stubgen.metadata import PARAM_HAS_DEFAULT
+from stubgen.metadata import PARAM_OUT
+from stubgen.metadata import PRIMITIVE_TYPES
+from stubgen.metadata import PROPERTY
+from stubgen.metadata import PROPERTY_MAP
+from stubgen.metadata import RESOLUTION_SCOPE
+from stubgen.metadata import SEMANTICS_ADD_ON
+from stubgen.metadata import SEMANTICS_GETTER
+from stubgen.metadata import SEMANTICS_SETTER
+from stubgen.metadata import TYPE_ABSTRACT
+from stubgen.metadata import TYPE_DEF
+from stubgen.metadata import TYPE_DEF_OR_REF
+from stubgen.metadata import TYPE_INTERFACE
+from stubgen.metadata import TYPE_NESTED_PUBLIC
+from stubgen.metadata import TYPE_OR_METHOD_DEF
+from stubgen.metadata import TYPE_REF
+from stubgen.metadata import TYPE_SPEC
+from stubgen.metadata import TYPE_VISIBILITY_MASK
+from stubgen.metadata import MetadataError
+from stubgen.metadata import MetadataReader
+from stubgen.metadata import MethodSig
+from stubgen.metadata import Row
+from stubgen.metadata import TypeSig
+from stubgen.metadata import decode_index
+from stubgen.model import CClass
+from stubgen.model import CConstructor
+from stubgen.model import CDelegate
+from stubgen.model import CEnum
+from stubgen.model import CEvent
+from stubgen.model import CField
+from stubgen.model import CInterface
+from stubgen.model import CMethod
+from stubgen.model import CParameter
+from stubgen.model import CProperty
+from stubgen.model import CStruct
+from stubgen.model import CType
+from stubgen.model import CTypeDefinition
+from stubgen.model import by_sort_key
+from stubgen.util import is_name_valid
+from stubgen.util import make_python_name
+
+# Extracts assemblies from their metadata tables instead of through reflection, no CLR is loaded
+# so this runs on any platform and in any number of processes. Members inherited from other
+# assemblies are only found when those assemblies are in the search paths.
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+ASSEMBLY_SUFFIXES: Sequence[str] = (".dll", ".exe")
+
+
+class MetadataAssembly:
+    def __init__(self, loader: AssemblyLoader, reader: MetadataReader) -> None:
+        self.loader: AssemblyLoader = loader
+        self.reader: MetadataReader = reader
+        self.types: Sequence[Row] = reader.rows(TYPE_DEF)
+
+        row: Row = reader.row(ASSEMBLY, 1) if reader.row_counts[ASSEMBLY] else ()
+        self.name: str = reader.string(row[7]) if row else reader.path.stem
+        self.version: str = ".".join(map(str, row[1:5])) if row else "0.0.0.0"
+
+        self.enclosing: Dict[int, int] = {}
+        self.nested: Dict[int, List[int]] = defaultdict(list)
+        for nested, enclosing in reader.rows(NESTED_CLASS):
+            self.enclosing[nested] = enclosing
+            self.nested[enclosing].append(nested)
+
+        self.top_level: Dict[Tuple[str, str], int] = {}
+        self.nested_names: Dict[Tuple[int, str], int] = {}
+        for index, row in enumerate(self.types, 1):
+            name: str = reader.string(row[1])
+            if index in self.enclosing:
+                self.nested_names[(self.enclosing[index], name)] = index
+            else:
+                self.top_level[(reader.string(row[2]), name)] = index
+
+        self.generic_params: Dict[int, List[Tuple[int, str]]] = defaultdict(list)
+        for number, _, owner, name in reader.rows(GENERIC_PARAM):
+            self.generic_params[owner].append((number, reader.string(name)))
+
+        self.interfaces: Dict[int, List[int]] = defaultdict(list)
+        for owner, interface in reader.rows(INTERFACE_IMPL):
+            self.interfaces[owner].append(interface)
+
+        self.semantics: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        for semantics, method, association in reader.rows(METHOD_SEMANTICS):
+            self.semantics[association].append((semantics, method))
+
+        self.property_lists: Dict[int, int] = {
+            parent: index for index, (parent, _) in enumerate(reader.rows(PROPERTY_MAP), 1)
+        }
+        self.event_lists: Dict[int, int] = {
+            parent: index for index, (parent, _) in enumerate(reader.rows(EVENT_MAP), 1)
+        }
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.name!r})"
+
+    def references(self) -> Sequence[str]:
+        return tuple(self.reader.string(row[6]) for row in self.reader.rows(ASSEMBLY_REF))
+
+    def type_name(self, index: int) -> Tuple[Optional[str], str]:
+        # Returns the namespace and the python name, nested types are prefixed with their parents
+        row: Row = self.types[index - 1]
+        name: str = make_python_name(self.reader.string(row[1]))
+        while index in self.enclosing:
+            index = self.enclosing[index]
+            name = f"{make_python_name(self.reader.string(self.types[index - 1][1]))}.{name}"
+        return self.reader.string(self.types[index - 1][2]) or None, name
+
+    def type_ref_name(self, index: int) -> Tuple[Optional[str], str]:
+        scope, name, namespace = self.reader.row(TYPE_REF, index)
+        table, row = decode_index(RESOLUTION_SCOPE, scope)
+        if table == TYPE_REF and row != 0:
+            outer_namespace, outer_name = self.type_ref_name(row)
+            return outer_namespace, f"{outer_name}.{make_python_name(self.reader.string(name))}"
+        return self.reader.string(namespace) or None, make_python_name(self.reader.string(name))
+
+    def generic_args(self, table: int, index: int) -> Tuple[CType, ...]:
+        owner: int = index << TYPE_OR_METHOD_DEF.bits | TYPE_OR_METHOD_DEF.tables.index(table)
+        return tuple(
+            CType(name=make_python_name(name), namespace=None, generic=True)
+            for _, name in sorted(self.generic_params.get(owner, ()))
+        )
+
+    def members(self, index: int, table: int) -> range:
+        if table in (FIELD, METHOD_DEF):
+            column: int = 4 if table == FIELD else 5
+            return self.reader.list_range(TYPE_DEF, index, column, table)
+        lists: Dict[int, int] = self.property_lists if table == PROPERTY else self.event_lists
+        if index not in lists:
+            return range(0)
+        map_table: int = PROPERTY_MAP if table == PROPERTY else EVENT_MAP
+        return self.reader.list_range(map_table, lists[index], 1, table)
+
+    def accessors(self, table: int, index: int) -> Sequence[Tuple[int, int]]:
+        association: int = index << HAS_SEMANTICS.bits | HAS_SEMANTICS.tables.index(table)
+        return self.semantics.get(association, ())
+
+
+class AssemblyLoader:
+    def __init__(self, search_paths: Sequence[Path] = ()) -> None:
+        self.search_paths: Sequence[Path] = tuple(search_paths)
+        self.assemblies: Dict[Path, MetadataAssembly] = {}
+        self.names: Dict[Tuple[Path, str], Optional[MetadataAssembly]] = {}
+        self.resolved: Dict[Tuple[MetadataAssembly, int, int], Optional[MetaType]] = {}
+
+    def load(self, path: Path) -> MetadataAssembly:
+        path = path.resolve()
+        if path not in self.assemblies:
+            self.assemblies[path] = MetadataAssembly(self, MetadataReader(path))
+        return self.assemblies[path]
+
+    def find(self, assembly_name: str, near: Path) -> Optional[MetadataAssembly]:
+        # Referenced assemblies are searched next to the referencing one, then in the search paths
+        key: Tuple[Path, str] = (near, assembly_name)
+        if key not in self.names:
+            self.names[key] = None
+            for directory in (near, *self.search_paths):
+                for suffix in ASSEMBLY_SUFFIXES:
+                    path: Path = directory / f"{assembly_name}{suffix}"
+                    if path.is_file():
+                        try:
+                            self.names[key] = self.load(path)
+                        except MetadataError as e:
+                            logger.warning("Unable to read assembly %r: %s", str(path), e)
+                            continue
+                        return self.names[key]
+            logger.debug("Unable to find referenced assembly: %s", assembly_name)
+        return self.names[key]
+
+    def find_type(
+        self, assembly: MetadataAssembly, namespace: str, name: str, depth: int = 0
+    ) -> Optional[MetaType]:
+        index: Optional[int] = assembly.top_level.get((namespace, name))
+        if index is not None:
+            return MetaType(assembly, index)
+        # Follow type forwarders, such as System.Runtime to System.Private.CoreLib
+        reader: MetadataReader = assembly.reader
+        for _, _, type_name, type_namespace, implementation in reader.rows(EXPORTED_TYPE):
+            if reader.string(type_name) != name or reader.string(type_namespace) != namespace:
+                continue
+            table, row = decode_index(IMPLEMENTATION, implementation)
+            if table == ASSEMBLY_REF and depth < 8:
+                target: Optional[MetadataAssembly] = self.find(
+                    reader.string(reader.row(ASSEMBLY_REF, row)[6]), reader.path.parent
+                )
+                if target is not None:
+                    return self.find_type(target, namespace, name, depth + 1)
+        return None
+
+    def resolve(self, assembly: MetadataAssembly, table: int, index: int) -> Optional[MetaType]:
+        # Resolves a TypeDef or TypeRef token to its definition
+        if table == TYPE_DEF:
+            return MetaType(assembly, index)
+        key: Tuple[MetadataAssembly, int, int] = (assembly, table, index)
+        if key not in self.resolved:
+            self.resolved[key] = None
+            reader: MetadataReader = assembly.reader
+            scope, name, namespace = reader.row(TYPE_REF, index)
+            scope_table, scope_row = decode_index(RESOLUTION_SCOPE, scope)
+            found: Optional[MetaType] = None
+            if scope_table == TYPE_REF:
+                outer: Optional[MetaType] = self.resolve(assembly, TYPE_REF, scope_row)
+                if outer is not None:
+                    nested: Optional[int] = outer.assembly.nested_names.get(
+                        (outer.index, reader.string(name))
+                    )
+                    if nested is not None:
+                        found = MetaType(outer.assembly, nested)
+            else:
+                target: Optional[MetadataAssembly] = assembly
+                if scope_table == ASSEMBLY_REF:
+                    target = self.find(
+                        reader.string(reader.row(ASSEMBLY_REF, scope_row)[6]), reader.path.parent
+                    )
+                if target is not None:
+                    found = self.find_type(target, reader.string(namespace), reader.string(name))
+            self.resolved[key] = found
+        return self.resolved[key]
+
+    def close(self) -> None:
+        for assembly in self.assemblies.values():
+            assembly.reader.close()
+        self.assemblies.clear()
+        self.names.clear()
+        self.resolved.clear()
+
+
+@dataclass(frozen=True)
+class MetaType:
+    # A type definition, args are its generic arguments once constructed, e.g. IList[Int32]
+    assembly: MetadataAssembly
+    index: int
+    args: Optional[Tuple[CType, ...]] = None
+
+    @property
+    def row(self) -> Row:
+        return self.assembly.types[self.index - 1]
+
+    @property
+    def flags(self) -> int:
+        return self.row[0]
+
+    @property
+    def name(self) -> str:
+        return self.assembly.reader.string(self.row[1])
+
+    @property
+    def namespace(self) -> Optional[str]:
+        return self.assembly.type_name(self.index)[0]
+
+    @property
+    def is_nested(self) -> bool:
+        return self.index in self.assembly.enclosing
+
+    @property
+    def generic_args(self) -> Tuple[CType, ...]:
+        return self.assembly.generic_args(TYPE_DEF, self.index)
+
+    @property
+    def type_args(self) -> Tuple[CType, ...]:
+        return self.generic_args if self.args is None else self.args
+
+    def construct(self, args: Tuple[CType, ...]) -> MetaType:
+        return dataclasses.replace(self, args=args)
+
+
+def extract_type_def(info: MetaType) -> Optional[CTypeDefinition]:
+    if not is_name_valid(info.namespace):
+        return None
+
+    base: Tuple[Optional[str], str] = get_base_name(info)
+    own: Tuple[Optional[str], str] = info.assembly.type_name(info.index)
+    if base in (("System", "ValueType"), ("System", "Enum")) and own != ("System", "Enum"):
+        if base[1] == "Enum":
+            return extract_enum(info)
+        return extract_struct(info)
+    if info.flags & TYPE_INTERFACE:
+        return extract_interface(info)
+    if base in (("System", "MulticastDelegate"), ("System", "Delegate")) and own not in (
+        ("System", "MulticastDelegate"),
+        ("System", "Delegate"),
+    ):
+        return extract_delegate(info)
+    return extract_class(info)
+
+
+def extract_class(info: MetaType) -> Optional[CClass]:
+    logger.info(f'Extracting class "{info.namespace}.{info.name}"')
+    return CClass(
+        name=make_python_name(info.name),
+        namespace=info.namespace,
+        nested=extract_declaring_type(info),
+        abstract=bool(info.flags & TYPE_ABSTRACT),
+        generic_args=info.generic_args,
+        super_class=get_base(info)[0],
+        interfaces=tuple(sorted((t for t, _ in get_interfaces(info)), key=by_sort_key)),
+        fields=extract_fields(info),
+        constructors=extract_constructors(info),
+        properties=extract_properties(info),
+        methods=extract_methods(info),
+        events=extract_events(info),
+        nested_types=extract_nested_types(info),
+    )
+
+
+def extract_struct(info: MetaType) -> Optional[CStruct]:
+    logger.info(f'Extracting struct "{info.namespace}.{info.name}"')
+    return CStruct(
+        name=make_python_name(info.name),
+        namespace=info.namespace,
+        nested=extract_declaring_type(info),
+        abstract=bool(info.flags & TYPE_ABSTRACT),
+        generic_args=info.generic_args,
+        super_class=get_base(info)[0],
+        interfaces=tuple(sorted((t for t, _ in get_interfaces(info)), key=by_sort_key)),
+        fields=extract_fields(info),
+        constructors=extract_constructors(info),
+        properties=extract_properties(info),
+        methods=extract_methods(info),
+        events=extract_events(info),
+        nested_types=extract_nested_types(info),
+    )
+
+
+def extract_interface(info: MetaType) -> Optional[CInterface]:
+    logger.info(f'Extracting interface "{info.namespace}.{info.name}"')
+    return CInterface(
+        name=make_python_name(info.name),
+        namespace=info.namespace,
+        nested=extract_declaring_type(info),
+        generic_args=info.generic_args,
+        interfaces=tuple(sorted((t for t, _ in get_interfaces(info)), key=by_sort_key)),
+        fields=extract_fields(info),
+        properties=extract_properties(info),
+        methods=extract_methods(info),
+        events=extract_events(info),
+        nested_types=extract_nested_types(info),
+    )
+
+
+def extract_enum(info: MetaType) -> Optional[CEnum]:
+    logger.info(f'Extracting enum "{info.namespace}.{info.name}"')
+    reader: MetadataReader = info.assembly.reader
+    values: List[Tuple[int, str]] = []
+    for index in info.assembly.members(info.index, FIELD):
+        flags, name, _ = reader.row(FIELD, index)
+        if flags & FIELD_LITERAL and flags & MEMBER_STATIC:
+            value: object = reader.constant(FIELD, index)
+            values.append((value if isinstance(value, int) else 0, reader.string(name)))
+    # Names are ordered by their unsigned value like Enum.GetNames
+    values.sort(key=lambda v: v[0] % 2**64)
+    return CEnum(
+        name=make_python_name(info.name),
+        namespace=info.namespace,
+        nested=extract_declaring_type(info),
+        fields=tuple(name for _, name in values),
+    )
+
+
+def extract_delegate(info: MetaType) -> Optional[CDelegate]:
+    logger.info(f'Extracting delegate "{info.namespace}.{info.name}"')
+    reader: MetadataReader = info.assembly.reader
+    index: int
+    for index in info.assembly.members(info.index, METHOD_DEF):
+        if reader.string(reader.row(METHOD_DEF, index)[3]) == "Invoke":
+            break
+    else:
+        return None
+
+    signature: MethodSig = reader.signature(reader.row(METHOD_DEF, index)[4]).read_method()
+    method_args: Tuple[CType, ...] = info.assembly.generic_args(METHOD_DEF, index)
+    return CDelegate(
+        name=make_python_name(info.name),
+        namespace=info.namespace,
+        nested=extract_declaring_type(info),
+        parameters=extract_parameters(info, index, signature, method_args),
+        return_type=extract_type(info, signature.return_type, method_args),
+    )
+
+
+def extract_declaring_type(info: MetaType) -> Optional[CType]:
+    if not info.is_nested:
+        return None
+    return definition_type(MetaType(info.assembly, info.assembly.enclosing[info.index]))
+
+
+def definition_type(info: MetaType) -> CType:
+    namespace, name = info.assembly.type_name(info.index)
+    return CType(name=name, namespace=namespace, inner=info.type_args)
+
+
+def reference_type(
+    assembly: MetadataAssembly, table: int, index: int, inner: Tuple[CType, ...] = ()
+) -> CType:
+    namespace: Optional[str]
+    name: str
+    if table == TYPE_DEF:
+        namespace, name = assembly.type_name(index)
+    else:
+        namespace, name = assembly.type_ref_name(index)
+    return CType(name=name, namespace=namespace, inner=inner)
+
+
+def extract_type(
+    info: MetaType, signature: TypeSig, method_args: Tuple[CType, ...] = ()
+) -> Optional[CType]:
+    # Converts a signature in the context of a possibly constructed type, so that members of
+    # IList[Int32] get Int32 where IList[T] declares T
+    element: int = signature.element
+    if element in PRIMITIVE_TYPES:
+        return CType(name=PRIMITIVE_TYPES[element], namespace="System")
+    if element in (ELEMENT_TYPE_VAR, ELEMENT_TYPE_MVAR):
+        generic_args: Tuple[CType, ...] = (
+            info.type_args if element == ELEMENT_TYPE_VAR else method_args
+        )
+        if signature.number < len(generic_args):
+            return generic_args[signature.number]
+        return CType(name=f"T{signature.number}", namespace=None, generic=True)
+    if element in (ELEMENT_TYPE_BYREF, ELEMENT_TYPE_PTR):
+        inner: CType = extract_type(info, signature.args[0], method_args)
+        if element == ELEMENT_TYPE_PTR:
+            return inner
+        if inner.name == "Array" and signature.args[0].element in (
+            ELEMENT_TYPE_SZARRAY,
+            ELEMENT_TYPE_ARRAY,
+        ):
+            inner = inner.inner[0]
+        return dataclasses.replace(inner, reference=True)
+    if element in (ELEMENT_TYPE_SZARRAY, ELEMENT_TYPE_ARRAY):
+        inner: CType = extract_type(info, signature.args[0], method_args)
+        if signature.args[0].element in (ELEMENT_TYPE_SZARRAY, ELEMENT_TYPE_ARRAY):
+            return inner
+        return CType(name="Array", namespace="System", inner=(inner,))
+    if signature.token is None:
+        # Function pointers
+        return CType(name="IntPtr", namespace="System")
+
+    table, index = signature.token
+    if table == TYPE_SPEC:
+        blob: int = info.assembly.reader.row(TYPE_SPEC, index)[0]
+        return extract_type(info, info.assembly.reader.signature(blob).read_type(), method_args)
+    args: Tuple[CType, ...] = tuple(extract_type(info, arg, method_args) for arg in signature.args)
+    if element == ELEMENT_TYPE_GENERICINST:
+        extracted: CType = reference_type(info.assembly, table, index)
+        if extracted.name == "Nullable" and len(args) > 0:
+            return dataclasses.replace(args[0], nullable=True)
+    return reference_type(info.assembly, table, index, args)
+
+
+def extract_token(info: MetaType, coded: int) -> Tuple[Optional[CType], Optional[MetaType]]:
+    # Converts a TypeDefOrRef index, such as a base type, to its type and its resolved definition
+    table, index = decode_index(TYPE_DEF_OR_REF, coded)
+    if index == 0:
+        return None, None
+    signature: TypeSig
+    if table == TYPE_SPEC:
+        blob: int = info.assembly.reader.row(TYPE_SPEC, index)[0]
+        signature = info.assembly.reader.signature(blob).read_type()
+    else:
+        signature = TypeSig(0, token=(table, index))
+    extracted: Optional[CType] = extract_type(info, signature)
+    if signature.token is None or signature.token[0] == TYPE_SPEC:
+        return extracted, None
+    resolved: Optional[MetaType] = info.assembly.loader.resolve(info.assembly, *signature.token)
+    if resolved is not None and signature.element == ELEMENT_TYPE_GENERICINST:
+        resolved = resolved.construct(extracted.inner)
+    return extracted, resolved
+
+
+def get_base_name(info: MetaType) -> Tuple[Optional[str], str]:
+    table, index = decode_index(TYPE_DEF_OR_REF, info.row[3])
+    if index == 0 or table == TYPE_SPEC:
+        return None, ""
+    if table == TYPE_DEF:
+        return info.assembly.type_name(index)
+    return info.assembly.type_ref_name(index)
+
+
+@functools.lru_cache(maxsize=None)
+def get_base(info: MetaType) -> Tuple[Optional[CType], Optional[MetaType]]:
+    return extract_token(info, info.row[3])
+
+
+@functools.lru_cache(maxsize=None)
+def get_interfaces(info: MetaType) -> Sequence[Tuple[CType, Optional[MetaType]]]:
+    # Same order as Type.GetInterfaces: interfaces of the base type, then each declared
+    # interface followed by the interfaces it inherits
+    found: Dict[CType, Optional[MetaType]] = {}
+    base: Optional[MetaType] = get_base(info)[1]
+    if base is not None:
+        found.update(get_interfaces(base))
+    for coded in info.assembly.interfaces.get(info.index, ()):
+        interface, resolved = extract_token(info, coded)
+        if interface is None:
+            continue
+        found.setdefault(interface, resolved)
+        if resolved is not None:
+            for inherited, inherited_resolved in get_interfaces(resolved):
+                found.setdefault(inherited, inherited_resolved)
+    return tuple(found.items())
+
+
+def is_public(flags: int) -> bool:
+    return flags & MEMBER_ACCESS_MASK == MEMBER_PUBLIC
+
+
+def extract_parameters(
+    info: MetaType, method: int, signature: MethodSig, method_args: Tuple[CType, ...]
+) -> Tuple[CParameter, ...]:
+    reader: MetadataReader = info.assembly.reader
+    rows: Dict[int, Row] = {}
+    for index in reader.list_range(METHOD_DEF, method, 5, PARAM):
+        row: Row = reader.row(PARAM, index)
+        rows[row[1]] = row
+    parameters: List[CParameter] = []
+    for sequence, parameter_type in enumerate(signature.parameters, 1):
+        row: Optional[Row] = rows.get(sequence)
+        # Reflection reports a default value for parameters without a Param row
+        flags: int = row[0] if row is not None else PARAM_HAS_DEFAULT
+        parameters.append(
+            CParameter(
+                name="param" if row is None else make_python_name(reader.string(row[2])),
+                type=extract_type(info, parameter_type, method_args),
+                default=bool(flags & PARAM_HAS_DEFAULT),
+                out=bool(flags & PARAM_OUT),
+            )
+        )
+    return tuple(parameters)
+
+
+def extract_field(info: MetaType, index: int) -> CField:
+    reader: MetadataReader = info.assembly.reader
+    flags, name, signature = reader.row(FIELD, index)
+    return CField(
+        name=make_python_name(reader.string(name)),
+        declaring_type=definition_type(info),
+        return_type=extract_type(info, reader.signature(signature).read_field()),
+        static=bool(flags & MEMBER_STATIC),
+    )
+
+
+def extract_constructor(info: MetaType, index: int) -> CConstructor:
+    reader: MetadataReader = info.assembly.reader
+    signature: MethodSig = reader.signature(reader.row(METHOD_DEF, index)[4]).read_method()
+    return CConstructor(
+        declaring_type=definition_type(info),
+        parameters=extract_parameters(info, index, signature, ()),
+    )
+
+
+def extract_property(info: MetaType, index: int) -> CProperty:
+    reader: MetadataReader = info.assembly.reader
+    _, name, signature = reader.row(PROPERTY, index)
+    getter: bool = False
+    setter: bool = False
+    static: bool = False
+    for semantics, method in info.assembly.accessors(PROPERTY, index):
+        flags: int = reader.row(METHOD_DEF, method)[2]
+        if semantics & SEMANTICS_GETTER and is_public(flags):
+            getter = True
+            static = bool(flags & MEMBER_STATIC)
+        elif semantics & SEMANTICS_SETTER and is_public(flags):
+            setter = True
+
+    return CProperty(
+        name=make_python_name(reader.string(name)),
+        declaring_type=definition_type(MetaType(info.assembly, info.index)),
+        type=extract_type(info, reader.signature(signature).read_property()),
+        setter=setter,
+        static=getter and static,
+    )
+
+
+def extract_method(info: MetaType, index: int) -> CMethod:
+    reader: MetadataReader = info.assembly.reader
+    _, _, flags, name, signature_blob, _ = reader.row(METHOD_DEF, index)
+    signature: MethodSig = reader.signature(signature_blob).read_method()
+    method_args: Tuple[CType, ...] = info.assembly.generic_args(METHOD_DEF, index)
+
+    parameters: Tuple[CParameter, ...] = extract_parameters(info, index, signature, method_args)
+    return_types: List[CType] = [extract_type(info, signature.return_type, method_args)]
+    return_types.extend(p.type for p in parameters if p.out)
+
+    return CMethod(
+        name=make_python_name(reader.string(name)),
+        declaring_type=definition_type(MetaType(info.assembly, info.index)),
+        parameters=parameters,
+        return_types=tuple(return_types),
+        static=bool(flags & MEMBER_STATIC),
+    )
+
+
+def extract_event(info: MetaType, index: int) -> CEvent:
+    reader: MetadataReader = info.assembly.reader
+    _, name, event_type = reader.row(EVENT, index)
+    return CEvent(
+        name=make_python_name(reader.string(name)),
+        declaring_type=definition_type(info),
+        type=extract_token(info, event_type)[0],
+    )
+
+
+def extract_base_members(
+    info: MetaType,
+    found: Dict[str, T],
+    extract: Callable[[MetaType, bool], Collection[T]],
+) -> None:
+    bases: List[T] = []
+    base: Optional[MetaType] = get_base(info)[1]
+    if base is not None:
+        bases.extend(extract_base_table(base, extract))
+    interface: Optional[MetaType]
+    for _, interface in get_interfaces(info):
+        if interface is not None:
+            bases.extend(extract_base_table(interface, extract))
+
+    base_member: T
+    for base_member in bases:
+        key: str = base_member.doc_key
+        new: T
+        if key in found:
+            new = dataclasses.replace(found[key], declaring_type=base_member.declaring_type)
+        else:
+            new = base_member
+        found[key] = new
+
+
+@functools.lru_cache(maxsize=None)
+def extract_base_table(
+    info: MetaType, extract: Callable[[MetaType, bool], Collection[T]]
+) -> Sequence[T]:
+    return tuple(extract(info, False))
+
+
+def extract_raw_fields(info: MetaType, static: bool = True) -> Collection[CField]:
+    found: Dict[str, CField] = {}
+
+    flags: int
+    for index in info.assembly.members(info.index, FIELD):
+        flags = info.assembly.reader.row(FIELD, index)[0]
+        if is_public(flags) and (static or not flags & MEMBER_STATIC):
+            obj: CField = extract_field(info, index)
+            found[obj.doc_key] = obj
+
+    extract_base_members(info, found, extract_raw_fields)
+
+    return found.values()
+
+
+def extract_fields(info: MetaType) -> Mapping[str, CField]:
+    return member_table(extract_raw_fields(info))
+
+
+def extract_constructors(info: MetaType) -> Mapping[str, CConstructor]:
+    found: Dict[str, CConstructor] = {}
+
+    reader: MetadataReader = info.assembly.reader
+    for index in info.assembly.members(info.index, METHOD_DEF):
+        _, _, flags, name, _, _ = reader.row(METHOD_DEF, index)
+        if is_public(flags) and flags & METHOD_RT_SPECIAL_NAME and reader.string(name) == ".ctor":
+            obj: CConstructor = extract_constructor(info, index)
+            found[obj.doc_key] = obj
+
+    return member_table(found.values())
+
+
+def extract_raw_properties(info: MetaType, static: bool = True) -> Collection[CProperty]:
+    found: Dict[str, CProperty] = {}
+
+    reader: MetadataReader = info.assembly.reader
+    for index in info.assembly.members(info.index, PROPERTY):
+        # Properties are public and static through their accessors
+        accessors: Sequence[int] = tuple(
+            reader.row(METHOD_DEF, m)[2] for _, m in info.assembly.accessors(PROPERTY, index)
+        )
+        if not any(map(is_public, accessors)):
+            continue
+        if not static and any(flags & MEMBER_STATIC for flags in accessors):
+            continue
+        obj: CProperty = extract_property(info, index)
+        found[obj.doc_key] = obj
+
+    extract_base_members(info, found, extract_raw_properties)
+
+    return found.values()
+
+
+def extract_properties(info: MetaType) -> Mapping[str, CProperty]:
+    return property_table(extract_raw_properties(info))
+
+
+def extract_raw_methods(info: MetaType, static: bool = True) -> Collection[CMethod]:
+    found: Dict[str, CMethod] = {}
+
+    flags: int
+    for index in info.assembly.members(info.index, METHOD_DEF):
+        flags = info.assembly.reader.row(METHOD_DEF, index)[2]
+        if flags & METHOD_RT_SPECIAL_NAME:
+            continue
+        if is_public(flags) and (static or not flags & MEMBER_STATIC):
+            obj: CMethod = extract_method(info, index)
+            found[obj.doc_key] = obj
+
+    extract_base_members(info, found, extract_raw_methods)
+
+    return found.values()
+
+
+def extract_methods(info: MetaType) -> Mapping[str, CMethod]:
+    return method_table(extract_raw_methods(info))
+
+
+def extract_raw_events(info: MetaType, static: bool = True) -> Collection[CEvent]:
+    found: Dict[str, CEvent] = {}
+
+    reader: MetadataReader = info.assembly.reader
+    for index in info.assembly.members(info.index, EVENT):
+        add_flags: Sequence[int] = tuple(
+            reader.row(METHOD_DEF, m)[2]
+            for semantics, m in info.assembly.accessors(EVENT, index)
+            if semantics & SEMANTICS_ADD_ON
+        )
+        if not any(map(is_public, add_flags)):
+            continue
+        if not static and any(flags & MEMBER_STATIC for flags in add_flags):
+            continue
+        obj: CEvent = extract_event(info, index)
+        found[obj.doc_key] = obj
+
+    extract_base_members(info, found, extract_raw_events)
+
+    return found.values()
+
+
+def extract_events(info: MetaType) -> Mapping[str, CEvent]:
+    return member_table(extract_raw_events(info))
+
+
+def extract_nested_types(info: MetaType) -> Mapping[str, CTypeDefinition]:
+    found: Dict[str, CTypeDefinition] = {}
+
+    for index in info.assembly.nested.get(info.index, ()):
+        nested: MetaType = MetaType(info.assembly, index)
+        if nested.flags & TYPE_VISIBILITY_MASK != TYPE_NESTED_PUBLIC:
+            continue
+        obj: Optional[CTypeDefinition] = extract_type_def(nested)
+        if obj is not None:
+            found[obj.doc_key] = obj
+
+    return member_table(found.values())
+
+
+def find_assembly(assembly_name: str, search_paths: Sequence[Path]) -> Optional[Path]:
+    path: Path = Path(assembly_name)
+    if path.suffix.lower() in ASSEMBLY_SUFFIXES and path.is_file():
+        return path.resolve()
+    for directory in (Path(), *search_paths):
+        for suffix in ASSEMBLY_SUFFIXES:
+            path = directory / f"{assembly_name}{suffix}"
+            if path.is_file():
+                return path.resolve()
+    return None
+
+
+loaders: Dict[Tuple[Path, ...], AssemblyLoader] = {}
+
+
+def get_loader(search_paths: Tuple[Path, ...]) -> AssemblyLoader:
+    # Shared by all assemblies extracted in a process, so referenced assemblies are read once
+    if search_paths not in loaders:
+        loaders[search_paths] = AssemblyLoader(search_paths)
+    return loaders[search_paths]
+
+
+def extract_assembly(
+    assembly_name: str,
+    output_dir: Path,
+    overwrite: bool,
+    search_paths: Sequence[Path] = (),
+    type_workers: Optional[int] = None,
+) -> Union[int, str]:
+    return extract_assembly_entry(assembly_name, output_dir, overwrite, search_paths, type_workers)[
+        0
+    ]
+
+
+def extract_assembly_entry(
+    assembly_name: str,
+    output_dir: Path,
+    overwrite: bool,
+    search_paths: Sequence[Path] = (),
+    type_workers: Optional[int] = None,
+) -> ExtractResult:
+    logger.info("Extracting assembly: %r", assembly_name)
+
+    path: Optional[Path] = find_assembly(assembly_name, search_paths)
+    if path is None:
+        logger.error(f"Unable to find assembly {assembly_name}")
+        return 1, None
+
+    try:
+        assembly: MetadataAssembly = get_loader(tuple(search_paths)).load(path)
+    except MetadataError as e:
+        logger.error(f"Unable to load assembly {assembly_name}: {str(e)}")
+        return 1, None
+
+    name: str = assembly.name
+    version: str = assembly.version
+
+    extract_file: Path = output_dir / f"{name}_{version}_skeleton.json"
+    if extract_file.exists() and not overwrite:
+        logger.critical("Extract file already exists: %r", str(extract_file))
+        return 1, None
+
+    doc_file: Path = output_dir / f"{name}_{version}_doc.json"
+    if doc_file.exists() and not overwrite:
+        logger.critical("Doc file already exists: %r", str(doc_file))
+        return 1, None
+
+    logger.debug("Parsing types")
+
+    found: Sequence[MetaType] = find_types(assembly)
+    types: Sequence[MetaType] = list_types(found)
+
+    type_definitions: Iterable[Optional[CTypeDefinition]]
+    if type_workers is not None and type_workers > 1 and len(types) > 1:
+        type_definitions = extract_types_in_workers(
+            extract_type_slice,
+            (path, tuple(search_paths)),
+            tuple(f"{t.namespace}.{t.name}" for t in types),
+            type_workers,
+        )
+    else:
+        type_definitions = (try_extract_type_def(info) for info in types)
+
+    namespaces: Sequence[str] = tuple(dict.fromkeys(t.namespace for t in found))
+    with AssemblyWriter(name, version, extract_file, doc_file, namespaces) as writer:
+        type_definition: Optional[CTypeDefinition]
+        for type_definition in type_definitions:
+            if type_definition is not None:
+                writer.write(type_definition)
+
+    return 0, ManifestEntry.from_file(path, name=name, version=version)
+
+
+def find_types(assembly: MetadataAssembly) -> Sequence[MetaType]:
+    # In the order of the TypeDef table, which is the namespace order of the doc file. The first
+    # row is the <Module> pseudo type.
+    types: List[MetaType] = []
+    for index in range(2, len(assembly.types) + 1):
+        info: MetaType = MetaType(assembly, index)
+        if not info.is_nested and info.namespace is not None:
+            types.append(info)
+    return types
+
+
+def list_types(types: Iterable[MetaType]) -> Sequence[MetaType]:
+    # Extracted in the order of the skeleton file, so each type can be written right away
+    return sorted(types, key=lambda t: (t.namespace, make_python_name(t.name)))
+
+
+def try_extract_type_def(info: MetaType) -> Optional[CTypeDefinition]:
+    try:
+        type_definition: Optional[CTypeDefinition] = extract_type_def(info)
+        if type_definition is None:
+            logger.warning(f"Unable to parse type: {info.namespace}.{info.name}")
+        return type_definition
+    except Exception as ex:
+        # One broken type is left out, the same as with the reflection backend
+        logger.warning(f"Error processing type {info.namespace}.{info.name}: {str(ex)}")
+        return None
+
+
+def extract_type_slice(
+    path: Path, search_paths: Tuple[Path, ...], start: int, stop: int
+) -> Sequence[Optional[CTypeDefinition]]:
+    # Runs in a type worker, the sorted type list is the same as in the process that started it
+    assembly: MetadataAssembly = get_loader(search_paths).load(path)
+    types: Sequence[MetaType] = list_types(find_types(assembly))
+    return [try_extract_type_def(info) for info in types[start:stop]]
+
+
+def get_references(
+    search_paths: Tuple[Path, ...], assembly_name: str
+) -> Optional[Tuple[str, Sequence[str]]]:
+    path: Optional[Path] = find_assembly(assembly_name, search_paths)
+    if path is None:
+        return None
+    loader: AssemblyLoader = get_loader(search_paths)
+    try:
+        assembly: MetadataAssembly = loader.load(path)
+    except MetadataError as e:
+        logger.warning(f"Unable to load assembly {assembly_name}: {str(e)}")
+        return None
+    # Referenced assemblies found next to this one are named by path, so they are found again
+    references: List[str] = []
+    for reference in assembly.references():
+        target: Optional[MetadataAssembly] = loader.find(reference, path.parent)
+        references.append(reference if target is None else str(target.reader.path))
+    return str(path), references
+
+
+def extract_assemblies(
+    assembly_names: Sequence[str],
+    output_dir: Path,
+    overwrite: bool,
+    skip_failed: bool,
+    process_count: Optional[int] = None,
+    max_assemblies_per_process: Optional[int] = None,
+    search_paths: Sequence[Path] = (),
+    type_workers: Optional[int] = None,
+    closure: bool = False,
+) -> Union[int, str]:
+    # Pure python extraction is bound by the GIL, so there is no threaded mode
+    if process_count is not None and type_workers is not None:
+        # Worker processes cannot start processes of their own
+        logger.warning("Types are not split across workers when assemblies are")
+        type_workers = None
+
+    clear_caches()
+    try:
+        if closure:
+            assembly_names = reference_closure(
+                assembly_names, functools.partial(get_references, tuple(search_paths))
+            )
+        return run_extraction(
+            functools.partial(
+                extract_assembly_entry,
+                search_paths=tuple(search_paths),
+                type_workers=type_workers,
+            ),
+            functools.partial(find_assembly, search_paths=tuple(search_paths)),
+            {"backend": "metadata"},
+            assembly_names,
+            output_dir,
+            overwrite,
+            skip_failed,
+            False,
+            process_count,
+            max_assemblies_per_process,
+        )
+    finally:
+        log_caches()
+
+
+def clear_caches() -> None:
+    for func in (get_base, get_interfaces, extract_base_table):
+        func.cache_clear()
+    for loader in loaders.values():
+        loader.close()
+    loaders.clear()
+
+
+def log_caches() -> None:
+    for func in (get_base, get_interfaces, extract_base_table):
+        info = func.cache_info()
+        lookups: int = info.hits + info.misses
+        ratio: float = info.hits / lookups if lookups > 0 else 0.0
+        logger.info(
+            "%s cache: %d calls saved, %d misses, %.1f%% hit ratio",
+            func.__name__,
+            info.hits,
+            info.misses,
+            ratio * 100,
+        )
@@ -1,15 +1,13 @@
 from __future__ import annotations
 
 import dataclasses
-import itertools
-import json
-from collections import defaultdict
-from concurrent.futures import Executor
-from concurrent.futures import ThreadPoolExecutor
+import functools
 from pathlib import Path
+from typing import TYPE_CHECKING
 from typing import Callable
 from typing import Collection
 from typing import Dict
+from typing import Iterable
 from typing import List
 from typing import Mapping
 from typing import Optional
@@ -17,23 +15,17 @@ from typing import Sequence
 from typing import Tuple
 from typing import TypeVar
 from typing import Union
-import clr
-from System import Delegate
-from System import MulticastDelegate
-from System import Nullable
-from System.Reflection import Assembly
-from System.Reflection import ReflectionTypeLoadException
-from System.Reflection import AssemblyName
-from System.Reflection import BindingFlags
-from System.Reflection import ConstructorInfo
-from System.Reflection import EventInfo
-from System.Reflection import FieldInfo
-from System.Reflection import MethodInfo
-from System.Reflection import ParameterInfo
-from System.Reflection import PropertyInfo
-from System.Reflection import TypeInfo
 
+from stubgen.extract_common import AssemblyWriter
+from stubgen.extract_common import ExtractResult
+from stubgen.extract_common import extract_types_in_workers
+from stubgen.extract_common import member_table
+from stubgen.extract_common import method_table
+from stubgen.extract_common import property_table
+from stubgen.extract_common import reference_closure
+from stubgen.extract_common import run_extraction
 from stubgen.log import get_logger
+from stubgen.manifest import ManifestEntry
 from stubgen.model import CClass
 from stubgen.model import CConstructor
 from stubgen.model import CDelegate
@@ -42,43 +34,69 @@ from stubgen.model import CEvent
 from stubgen.model import CField
 from stubgen.model import CInterface
 from stubgen.model import CMethod
-from stubgen.model import CNamespace
 from stubgen.model import CParameter
 from stubgen.model import CProperty
 from stubgen.model import CStruct
 from stubgen.model import CType
 from stubgen.model import CTypeDefinition
+from stubgen.model import by_sort_key
+from stubgen.reflection import ClrReflection
+from stubgen.reflection import MemberPartitions
+from stubgen.reflection import Reflection
+from stubgen.snapshot import RecordingReflection
+from stubgen.snapshot import ReplayReflection
 from stubgen.util import is_name_valid
 from stubgen.util import make_python_name
 
+if TYPE_CHECKING:
+    from System.Reflection import Assembly
+    from System.Reflection import AssemblyName
+    from System.Reflection import ConstructorInfo
+    from System.Reflection import EventInfo
+    from System.Reflection import FieldInfo
+    from System.Reflection import MethodInfo
+    from System.Reflection import ParameterInfo
+    from System.Reflection import PropertyInfo
+    from System.Reflection import TypeInfo
+
 logger = get_logger(__name__)
 
 T = TypeVar("T")
 
+# The extraction functions call each other and share caches keyed by the reflection objects, so
+# one backend answers for the whole process, see use_reflection
+reflection: Optional[Reflection] = None
+
+
+def get_reflection() -> Reflection:
+    global reflection
+    if reflection is None:
+        reflection = ClrReflection()
+    return reflection
+
+
+def use_reflection(backend: Optional[Reflection]) -> None:
+    global reflection
+    reflection = backend
 
-def extract_type_def(info: TypeInfo) -> Optional[CTypeDefinition]:
-    def is_delegate() -> bool:
-        if info in (Delegate, MulticastDelegate):
-            return False
-        # noinspection PyTypeChecker
-        return info.IsSubclassOf(Delegate) or info.IsSubclassOf(MulticastDelegate)
 
+def extract_type_def(info: TypeInfo, declared_only: bool = False) -> Optional[CTypeDefinition]:
     if not is_name_valid(info.Namespace):
         return None
 
     if info.IsValueType:
         if info.IsEnum:
             return extract_enum(info)
-        return extract_struct(info)
+        return extract_struct(info, declared_only)
     if info.IsInterface:
-        return extract_interface(info)
-    if is_delegate():
+        return extract_interface(info, declared_only)
+    if get_reflection().is_delegate(info):
         return extract_delegate(info)
     if info.IsClass:
-        return extract_class(info)
+        return extract_class(info, declared_only)
 
 
-def extract_class(info: TypeInfo) -> Optional[CClass]:
+def extract_class(info: TypeInfo, declared_only: bool = False) -> Optional[CClass]:
     logger.info(f'Extracting class "{info.Namespace}.{info.Name}"')
     return CClass(
         name=make_python_name(info.Name),
@@ -87,17 +105,17 @@ def extract_class(info: TypeInfo) -> Optional[CClass]:
         abstract=info.IsAbstract,
         generic_args=tuple(map(extract_type, info.GetGenericArguments())),
         super_class=extract_type(info.BaseType),
-        interfaces=tuple(sorted(map(extract_type, info.GetInterfaces()))),
-        fields=extract_fields(info),
-        constructors=extract_constructors(info),
-        properties=extract_properties(info),
-        methods=extract_methods(info),
-        events=extract_events(info),
-        nested_types=extract_nested_types(info),
+        interfaces=tuple(sorted(map(extract_type, get_interfaces(info)), key=by_sort_key)),
+        fields=extract_fields(info, declared_only),
+        constructors=extract_constructors(info, declared_only),
+        properties=extract_properties(info, declared_only),
+        methods=extract_methods(info, declared_only),
+        events=extract_events(info, declared_only),
+        nested_types=extract_nested_types(info, declared_only),
     )
 
 
-def extract_struct(info: TypeInfo) -> Optional[CStruct]:
+def extract_struct(info: TypeInfo, declared_only: bool = False) -> Optional[CStruct]:
     logger.info(f'Extracting struct "{info.Namespace}.{info.Name}"')
     return CStruct(
         name=make_python_name(info.Name),
@@ -106,29 +124,29 @@ def extract_struct(info: TypeInfo) -> Optional[CStruct]:
         abstract=info.IsAbstract,
         generic_args=tuple(map(extract_type, info.GetGenericArguments())),
         super_class=extract_type(info.BaseType),
-        interfaces=tuple(sorted(map(extract_type, info.GetInterfaces()))),
-        fields=extract_fields(info),
-        constructors=extract_constructors(info),
-        properties=extract_properties(info),
-        methods=extract_methods(info),
-        events=extract_events(info),
-        nested_types=extract_nested_types(info),
+        interfaces=tuple(sorted(map(extract_type, get_interfaces(info)), key=by_sort_key)),
+        fields=extract_fields(info, declared_only),
+        constructors=extract_constructors(info, declared_only),
+        properties=extract_properties(info, declared_only),
+        methods=extract_methods(info, declared_only),
+        events=extract_events(info, declared_only),
+        nested_types=extract_nested_types(info, declared_only),
     )
 
 
-def extract_interface(info: TypeInfo) -> Optional[CInterface]:
+def extract_interface(info: TypeInfo, declared_only: bool = False) -> Optional[CInterface]:
     logger.info(f'Extracting interface "{info.Namespace}.{info.Name}"')
     return CInterface(
         name=make_python_name(info.Name),
         namespace=info.Namespace,
         nested=extract_type(info.DeclaringType),
         generic_args=tuple(map(extract_type, info.GetGenericArguments())),
-        interfaces=tuple(sorted(map(extract_type, info.GetInterfaces()))),
-        fields=extract_fields(info),
-        properties=extract_properties(info),
-        methods=extract_methods(info),
-        events=extract_events(info),
-        nested_types=extract_nested_types(info),
+        interfaces=tuple(sorted(map(extract_type, get_interfaces(info)), key=by_sort_key)),
+        fields=extract_fields(info, declared_only),
+        properties=extract_properties(info, declared_only),
+        methods=extract_methods(info, declared_only),
+        events=extract_events(info, declared_only),
+        nested_types=extract_nested_types(info, declared_only),
     )
 
 
@@ -156,7 +174,9 @@ def extract_delegate(info: TypeInfo) -> Optional[CDelegate]:
     )
 
 
+@functools.lru_cache(maxsize=None)
 def extract_type(info: TypeInfo, use_generic: bool = False) -> Optional[CType]:
+    # Types are referenced by many members, each conversion crosses into the CLR several times
     if info is None:
         return None
 
@@ -168,7 +188,7 @@ def extract_type(info: TypeInfo, use_generic: bool = False) -> Optional[CType]:
     nullable: bool = False
 
     name: str = make_python_name(info.Name)
-    underlying_type: TypeInfo = Nullable.GetUnderlyingType(info)
+    underlying_type: TypeInfo = get_reflection().get_nullable_type(info)
     if underlying_type is not None:
         info = underlying_type
         name = make_python_name(info.Name)
@@ -201,6 +221,11 @@ def extract_type(info: TypeInfo, use_generic: bool = False) -> Optional[CType]:
     return extracted
 
 
+@functools.lru_cache(maxsize=None)
+def get_interfaces(info: TypeInfo) -> Sequence[TypeInfo]:
+    return tuple(info.GetInterfaces())
+
+
 def extract_parameter(info: ParameterInfo) -> CParameter:
     return CParameter(
         name="param" if info.Name is None else make_python_name(info.Name),
@@ -296,19 +321,19 @@ def extract_event(info: EventInfo) -> CEvent:
 def extract_base_members(
     type_info: TypeInfo,
     found: Dict[str, T],
-    extract: Callable[[TypeInfo, BindingFlags], Collection[T]],
+    extract: Callable[[TypeInfo, bool, bool], Collection[T]],
+    declared_only: bool = False,
 ) -> None:
     bases: List[T] = []
-    base_binding_flags: BindingFlags = BindingFlags.Public | BindingFlags.Instance
     if type_info.BaseType is not None:
-        bases.extend(extract(type_info.BaseType, base_binding_flags))
+        bases.extend(extract_base_table(type_info.BaseType, extract, declared_only))
     interface: TypeInfo
-    for interface in type_info.GetInterfaces():
-        bases.extend(extract(interface, base_binding_flags))
+    for interface in get_interfaces(type_info):
+        bases.extend(extract_base_table(interface, extract, declared_only))
 
     base: T
     for base in bases:
-        key: str = base.to_doc_json()[0]
+        key: str = base.doc_key
         new: T
         if key in found:
             new = dataclasses.replace(found[key], declaring_type=base.declaring_type)
@@ -317,232 +342,202 @@ def extract_base_members(
         found[key] = new
 
 
-def extract_fields(type_info: TypeInfo) -> Mapping[str, CField]:
-    def extract_raw(type_info: TypeInfo, binding_flags: BindingFlags = None) -> Collection[CField]:
-        found: Dict[str, CField] = {}
+@functools.lru_cache(maxsize=None)
+def extract_base_table(
+    type_info: TypeInfo,
+    extract: Callable[[TypeInfo, bool, bool], Collection[T]],
+    declared_only: bool = False,
+) -> Sequence[T]:
+    # Base types such as System.Object are shared by most types, so their members are only
+    # extracted once per run, the members are frozen so the table can be shared
+    return tuple(extract(type_info, False, declared_only))
 
-        info: FieldInfo
-        if binding_flags is None:
-            binding_flags = BindingFlags.Public | BindingFlags.Instance | BindingFlags.Static
-        for info in type_info.GetFields(binding_flags):
-            obj: CField = extract_field(info)
-            key: str = obj.to_doc_json()[0]
-            found[key] = obj
 
-        extract_base_members(type_info, found, extract_raw)
+@functools.lru_cache(maxsize=1024)
+def get_members(
+    type_info: TypeInfo, static: bool = True, declared_only: bool = False
+) -> MemberPartitions:
+    # The member kinds of a type are extracted one after the other, so a bounded cache is enough
+    # to share a single call into the runtime between them
+    return get_reflection().get_members(type_info, static, declared_only)
 
-        return found.values()
 
-    raw_members: Collection[CField] = extract_raw(type_info)
+def extract_raw_fields(
+    type_info: TypeInfo, static: bool = True, declared_only: bool = False
+) -> Collection[CField]:
+    found: Dict[str, CField] = {}
+
+    info: FieldInfo
+    for info in get_members(type_info, static, declared_only).get("Field", ()):
+        obj: CField = extract_field(info)
+        key: str = obj.doc_key
+        found[key] = obj
+
+    extract_base_members(type_info, found, extract_raw_fields, declared_only)
 
-    sorted_members: Sequence[CField] = sorted(raw_members)
+    return found.values()
 
-    return {str(member): member for member in sorted_members}
 
+def extract_fields(type_info: TypeInfo, declared_only: bool = False) -> Mapping[str, CField]:
+    return member_table(extract_raw_fields(type_info, declared_only=declared_only))
 
-def extract_constructors(type_info: TypeInfo) -> Mapping[str, CConstructor]:
-    def extract_raw(
-        type_info: TypeInfo, binding_flags: BindingFlags = None
-    ) -> Collection[CConstructor]:
+
+def extract_constructors(
+    type_info: TypeInfo, declared_only: bool = False
+) -> Mapping[str, CConstructor]:
+    def extract_raw(type_info: TypeInfo) -> Collection[CConstructor]:
         found: Dict[str, CConstructor] = {}
 
         info: ConstructorInfo
-        if binding_flags is None:
-            binding_flags = BindingFlags.Public | BindingFlags.Instance | BindingFlags.Static
-        for info in type_info.GetConstructors(binding_flags):
+        for info in get_members(type_info, declared_only=declared_only).get("Constructor", ()):
             obj: CConstructor = extract_constructor(info)
-            key: str = obj.to_doc_json()[0]
+            key: str = obj.doc_key
             found[key] = obj
 
         return found.values()
 
-    raw_members: Collection[CConstructor] = extract_raw(type_info)
-
-    sorted_members: Sequence[CConstructor] = sorted(raw_members)
-
-    return {str(member): member for member in sorted_members}
-
-
-def extract_properties(type_info: TypeInfo) -> Mapping[str, CProperty]:
-    def extract_raw(
-        type_info: TypeInfo, binding_flags: BindingFlags = None
-    ) -> Collection[CProperty]:
-        found: Dict[str, CProperty] = {}
-
-        info: PropertyInfo
-        if binding_flags is None:
-            binding_flags = BindingFlags.Public | BindingFlags.Instance | BindingFlags.Static
-        for info in type_info.GetProperties(binding_flags):
-            obj: CProperty = extract_property(info)
-            key: str = obj.to_doc_json()[0]
-            found[key] = obj
+    return member_table(extract_raw(type_info))
 
-        extract_base_members(type_info, found, extract_raw)
 
-        return found.values()
+def extract_raw_properties(
+    type_info: TypeInfo, static: bool = True, declared_only: bool = False
+) -> Collection[CProperty]:
+    found: Dict[str, CProperty] = {}
 
-    raw_members: Collection[CProperty] = extract_raw(type_info)
+    info: PropertyInfo
+    for info in get_members(type_info, static, declared_only).get("Property", ()):
+        obj: CProperty = extract_property(info)
+        key: str = obj.doc_key
+        found[key] = obj
 
-    sorted_members: Sequence[CProperty] = sorted(raw_members)
+    extract_base_members(type_info, found, extract_raw_properties, declared_only)
 
-    # TODO - Item property will need a special type to handle get/set of different types
-    excluded: Collection[str] = ("Item",)
+    return found.values()
 
-    def filter_func(member: CProperty) -> bool:
-        return member.name not in excluded
 
-    return {str(member): member for member in sorted_members if filter_func(member)}
+def extract_properties(type_info: TypeInfo, declared_only: bool = False) -> Mapping[str, CProperty]:
+    return property_table(extract_raw_properties(type_info, declared_only=declared_only))
 
 
-def extract_methods(type_info: TypeInfo) -> Mapping[str, CMethod]:
-    def extract_raw(type_info: TypeInfo, binding_flags: BindingFlags = None) -> Collection[CMethod]:
-        found: Dict[str, CMethod] = {}
+def extract_raw_methods(
+    type_info: TypeInfo, static: bool = True, declared_only: bool = False
+) -> Collection[CMethod]:
+    found: Dict[str, CMethod] = {}
 
-        info: MethodInfo
-        if binding_flags is None:
-            binding_flags = BindingFlags.Public | BindingFlags.Instance | BindingFlags.Static
-        for info in type_info.GetMethods(binding_flags):
-            obj: Optional[CMethod] = extract_method(info)
-            key: str = obj.to_doc_json()[0]
-            found[key] = obj
+    info: MethodInfo
+    for info in get_members(type_info, static, declared_only).get("Method", ()):
+        obj: Optional[CMethod] = extract_method(info)
+        key: str = obj.doc_key
+        found[key] = obj
 
-        extract_base_members(type_info, found, extract_raw)
+    extract_base_members(type_info, found, extract_raw_methods, declared_only)
 
-        return found.values()
+    return found.values()
 
-    raw_members: List[CMethod] = list(extract_raw(type_info))
-
-    supported_methods: Mapping[str, Tuple[str, bool]] = {
-        "op_Addition": ("__add__", True),
-        "op_BitwiseAnd": ("__and__", True),
-        "op_BitwiseOr": ("__or__", True),
-        # "op_Decrement": "",
-        "op_Division": ("__truediv__", True),
-        "op_Equality": ("__eq__", True),
-        "op_ExclusiveOr": ("__xor__", True),
-        "op_GreaterThan": ("__gt__", True),
-        "op_GreaterThanOrEqual": ("__ge__", True),
-        # "op_Implicit": ""
-        # "op_Increment": "",
-        "op_Inequality": ("__ne__", True),
-        "op_LeftShift": ("__lshift__", True),
-        "op_LessThan": ("__lt__", True),
-        "op_LessThanOrEqual": ("__le__", True),
-        "op_Modulus": ("__mod__", True),
-        "op_Multiply": ("__mul__", True),
-        "op_OnesComplement": ("__invert__", True),
-        "op_RightShift": ("__rshift__", True),
-        "op_Subtraction": ("__sub__", True),
-        "op_UnaryNegation": ("__neg__", True),
-        "op_UnaryPlus": ("__pos__", True),
-        # "op_UnsignedRightShift": "",
-        "get_Item": ("__getitem__", False),
-        "set_Item": ("__setitem__", False),
-        "Remove": ("__delitem__", False),
-        "get_Count": ("__len__", False),
-        "Contains": ("__contains__", False),
-        "ContainsKey": ("__contains__", False),
-    }
-
-    method: CMethod
-    for method in tuple(raw_members):
-        if method.name in supported_methods:
-            new_name, remove_param = supported_methods[method.name]
-            parameters: Sequence[CParameter] = method.parameters
-            if remove_param:
-                parameters = tuple(
-                    map(lambda p: dataclasses.replace(p, name="other"), method.parameters[1:])
-                )
-
-            method: CMethod = dataclasses.replace(
-                method,
-                name=new_name,
-                parameters=parameters,
-                static=False,
-            )
-            raw_members.append(method)
-        if method.name == "GetEnumerator":
-            return_types: Sequence[CType] = (
-                dataclasses.replace(
-                    method.return_types[0],
-                    name="Iterator",
-                    namespace="typing",
-                ),
-            )
-            method: CMethod = dataclasses.replace(
-                method,
-                name="__iter__",
-                return_types=return_types,
-            )
-            raw_members.append(method)
-
-    sorted_members: Sequence[CMethod] = sorted(raw_members)
-
-    def filter_func(member: CMethod) -> bool:
-        return not (
-            member.name.startswith("get_")
-            or member.name.startswith("set_")
-            or member.name.startswith("add_")
-            or member.name.startswith("remove_")
-        )
 
-    return {str(member): member for member in sorted_members if filter_func(member)}
+def extract_methods(type_info: TypeInfo, declared_only: bool = False) -> Mapping[str, CMethod]:
+    return method_table(extract_raw_methods(type_info, declared_only=declared_only))
 
 
-def extract_events(type_info: TypeInfo) -> Mapping[str, CEvent]:
-    def extract_raw(type_info: TypeInfo, binding_flags: BindingFlags = None) -> Collection[CEvent]:
-        found: Dict[str, CEvent] = {}
+def extract_raw_events(
+    type_info: TypeInfo, static: bool = True, declared_only: bool = False
+) -> Collection[CEvent]:
+    found: Dict[str, CEvent] = {}
 
-        info: EventInfo
-        if binding_flags is None:
-            binding_flags = BindingFlags.Public | BindingFlags.Instance | BindingFlags.Static
-        for info in type_info.GetEvents(binding_flags):
-            obj: CEvent = extract_event(info)
-            key: str = obj.to_doc_json()[0]
-            found[key] = obj
-
-        extract_base_members(type_info, found, extract_raw)
+    info: EventInfo
+    for info in get_members(type_info, static, declared_only).get("Event", ()):
+        obj: CEvent = extract_event(info)
+        key: str = obj.doc_key
+        found[key] = obj
 
-        return found.values()
+    extract_base_members(type_info, found, extract_raw_events, declared_only)
 
-    raw_members: Collection[CEvent] = extract_raw(type_info)
+    return found.values()
 
-    sorted_members: Sequence[CEvent] = sorted(raw_members)
 
-    return {str(member): member for member in sorted_members}
+def extract_events(type_info: TypeInfo, declared_only: bool = False) -> Mapping[str, CEvent]:
+    return member_table(extract_raw_events(type_info, declared_only=declared_only))
 
 
-def extract_nested_types(type_info: TypeInfo) -> Mapping[str, CTypeDefinition]:
-    def extract_raw(
-        type_info: TypeInfo, binding_flags: BindingFlags = None
-    ) -> Collection[CTypeDefinition]:
+def extract_nested_types(
+    type_info: TypeInfo, declared_only: bool = False
+) -> Mapping[str, CTypeDefinition]:
+    def extract_raw(type_info: TypeInfo) -> Collection[CTypeDefinition]:
         found: Dict[str, CTypeDefinition] = {}
 
         info: TypeInfo
-        if binding_flags is None:
-            binding_flags = BindingFlags.Public
-        for info in type_info.GetNestedTypes(binding_flags):
-            obj: CTypeDefinition = extract_type_def(info)
-            key: str = obj.to_doc_json()[0]
+        for info in get_members(type_info, declared_only=declared_only).get("NestedType", ()):
+            obj: CTypeDefinition = extract_type_def(info, declared_only)
+            key: str = obj.doc_key
             found[key] = obj
 
         return found.values()
 
-    raw_members: Collection[CTypeDefinition] = extract_raw(type_info)
+    return member_table(extract_raw(type_info))
+
 
-    sorted_members: Sequence[CTypeDefinition] = sorted(raw_members)
+def extract_assembly(
+    assembly_name: str,
+    output_dir: Path,
+    overwrite: bool,
+    declared_only: bool = False,
+    record_dir: Optional[Path] = None,
+    replay: bool = False,
+    type_workers: Optional[int] = None,
+) -> Union[int, str]:
+    return extract_assembly_entry(
+        assembly_name, output_dir, overwrite, declared_only, record_dir, replay, type_workers
+    )[0]
 
-    return {str(member): member for member in sorted_members}
+
+def extract_assembly_entry(
+    assembly_name: str,
+    output_dir: Path,
+    overwrite: bool,
+    declared_only: bool = False,
+    record_dir: Optional[Path] = None,
+    replay: bool = False,
+    type_workers: Optional[int] = None,
+) -> ExtractResult:
+    if record_dir is None and not replay:
+        return extract_with_reflection(
+            assembly_name, output_dir, overwrite, declared_only, type_workers=type_workers
+        )
+    if type_workers is not None:
+        logger.warning("Snapshots are recorded and replayed without type workers")
+
+    # A snapshot answers for a single assembly, objects cached while extracting other assemblies
+    # would be missing from it
+    previous: Optional[Reflection] = reflection
+    backend: Reflection = ReplayReflection() if replay else RecordingReflection(get_reflection())
+    clear_caches()
+    use_reflection(backend)
+    try:
+        return extract_with_reflection(
+            assembly_name, output_dir, overwrite, declared_only, record_dir
+        )
+    finally:
+        use_reflection(previous)
+        clear_caches()
 
 
-def extract_assembly(assembly_name: str, output_dir: Path, overwrite: bool) -> Union[int, str]:
+def extract_with_reflection(
+    assembly_name: str,
+    output_dir: Path,
+    overwrite: bool,
+    declared_only: bool,
+    record_dir: Optional[Path] = None,
+    type_workers: Optional[int] = None,
+) -> ExtractResult:
     logger.info(f"Extracting assembly: %r", assembly_name)
 
     try:
-        assembly: Assembly = clr.AddReference(assembly_name)
+        assembly: Assembly = get_reflection().load_assembly(assembly_name)
     except Exception as e:
         logger.error(f"Unable to load assembly {assembly_name}: {str(e)}")
-        return 1
+        return 1, None
+    # Type workers load the assembly the same way
+    reference: str = assembly_name
 
     name: AssemblyName = assembly.GetName()
     assembly_name: str = name.Name
@@ -551,90 +546,110 @@ def extract_assembly(assembly_name: str, output_dir: Path, overwrite: bool) -> U
     extract_file: Path = output_dir / f"{assembly_name}_{assembly_version}_skeleton.json"
     if extract_file.exists() and not overwrite:
         logger.critical("Extract file already exists: %r", str(extract_file))
-        return 1
+        return 1, None
 
     doc_file: Path = output_dir / f"{assembly_name}_{assembly_version}_doc.json"
     if doc_file.exists() and not overwrite:
         logger.critical("Doc file already exists: %r", str(doc_file))
-        return 1
+        return 1, None
 
     logger.debug("Parsing types")
-    type_definitions: Dict[str, List[CTypeDefinition]] = defaultdict(list)
+    members_before = get_members.cache_info()
+
+    found: Sequence[TypeInfo] = find_types(assembly)
+    types: Sequence[TypeInfo] = list_types(found)
+
+    type_definitions: Iterable[Optional[CTypeDefinition]]
+    if type_workers is not None and type_workers > 1 and len(types) > 1:
+        type_definitions = extract_types_in_workers(
+            extract_type_slice,
+            (reference, declared_only),
+            tuple(t.FullName for t in types),
+            type_workers,
+        )
+    else:
+        type_definitions = (try_extract_type_def(info, declared_only) for info in types)
+
+    namespaces: Sequence[str] = tuple(dict.fromkeys(t.Namespace for t in found))
+    with AssemblyWriter(
+        assembly_name, assembly_version, extract_file, doc_file, namespaces
+    ) as writer:
+        type_definition: Optional[CTypeDefinition]
+        for type_definition in type_definitions:
+            if type_definition is not None:
+                writer.write(type_definition)
+
+    members_after = get_members.cache_info()
+    # Every lookup used to be a separate GetFields, GetMethods, ... call into the runtime
+    logger.info(
+        "%s: %d member calls into the runtime, %d without batching",
+        assembly_name,
+        members_after.misses - members_before.misses,
+        members_after.hits + members_after.misses - members_before.hits - members_before.misses,
+    )
 
-    try:
-        types = assembly.GetTypes()
-    except ReflectionTypeLoadException as e:
-        logger.warning(f"Some types in {assembly_name} could not be loaded")
-        types = [t for t in e.Types if t is not None]
-        for ex in e.LoaderExceptions:
-            if ex:
-                logger.debug(f"Loader exception: {str(ex)}")
-
-    for info in types:
-        if info.Namespace is None or info.IsNested:
-            continue
-        try:
-            type_definition: CTypeDefinition = extract_type_def(info)
-            if type_definition is None:
-                logger.warning(f"Unable to parse type: {info.FullName}")
-                continue
-            type_definitions[type_definition.namespace].append(type_definition)
-        except Exception as ex:
-            logger.warning(f"Error processing type {info.FullName}: {str(ex)}")
-
-    for info in types:
-        if info.Namespace is None or info.IsNested:
-            continue
-        try:
-            type_definition: CTypeDefinition = extract_type_def(info)
-            if type_definition is None:
-                logger.warning(f"Unable to parse type: {info.FullName}")
-                continue
-            type_definitions[type_definition.namespace].append(type_definition)
-        except Exception as ex:
-            logger.warning(f"Unexpected error processing {info.FullName}: {str(ex)}")
-        except Exception as ex:
-            logger.warning(f"Error processing type {info.FullName}: {str(ex)}")
-
-    namespaces: Sequence[CNamespace] = tuple(
-        CNamespace(name=namespace, types={str(t): t for t in sorted(type_list)})
-        for namespace, type_list in type_definitions.items()
+    if record_dir is not None:
+        get_reflection().save(record_dir / f"{assembly_name}_{assembly_version}_snapshot.json.gz")
+
+    # Assemblies without a file, such as dynamic ones, are always extracted again
+    entry: Optional[ManifestEntry] = None
+    source: Optional[Path] = get_reflection().get_source(assembly)
+    if source is not None:
+        entry = ManifestEntry.from_file(source, name=assembly_name, version=assembly_version)
+
+    return 0, entry
+
+
+def find_types(assembly: Assembly) -> Sequence[TypeInfo]:
+    # In the order the assembly lists them, which is the namespace order of the doc file
+    return tuple(
+        t
+        for t in get_reflection().get_types(assembly)
+        if t.Namespace is not None and not t.IsNested
     )
 
-    logger.debug("Saving types to file: %r", str(extract_file))
-    with extract_file.open("w") as file:
-        json.dump(
-            {
-                "name": assembly_name,
-                "version": assembly_version,
-                "namespaces": {
-                    str(namespace): namespace.to_json() for namespace in sorted(namespaces)
-                },
-            },
-            file,
-            indent=2,
-        )
 
-    logger.debug("Generating doc file: %r", str(doc_file))
-    main_doc_namespace = {}
-    for namespace in namespaces:
-        curr = main_doc_namespace
-        for n in namespace.name.split("."):
-            if n not in curr:
-                curr[n] = {"doc": ""}
-            curr = curr[n]
-        for type in namespace.types.values():
-            name, doc_json = type.to_doc_json()
-            curr[name] = doc_json
-
-    with doc_file.open("w") as file:
-        json.dump(
-            main_doc_namespace,
-            file,
-            indent=2,
-        )
+def list_types(types: Iterable[TypeInfo]) -> Sequence[TypeInfo]:
+    # In the order of the skeleton file, so each type can be written right away
+    return sorted(types, key=lambda t: (t.Namespace, make_python_name(t.Name)))
+
+
+def try_extract_type_def(info: TypeInfo, declared_only: bool) -> Optional[CTypeDefinition]:
+    try:
+        type_definition: Optional[CTypeDefinition] = extract_type_def(info, declared_only)
+        if type_definition is None:
+            logger.warning(f"Unable to parse type: {info.FullName}")
+        return type_definition
+    except Exception as ex:
+        logger.warning(f"Error processing type {info.FullName}: {str(ex)}")
+        return None
 
-    return 0
+
+def extract_type_slice(
+    assembly_name: str, declared_only: bool, start: int, stop: int
+) -> Sequence[Optional[CTypeDefinition]]:
+    # Runs in a type worker, the sorted type list is the same as in the process that started it
+    assembly: Assembly = get_reflection().load_assembly(assembly_name)
+    types: Sequence[TypeInfo] = list_types(find_types(assembly))
+    return [try_extract_type_def(info, declared_only) for info in types[start:stop]]
+
+
+def get_references(assembly_name: str) -> Optional[Tuple[str, Sequence[str]]]:
+    try:
+        assembly: Assembly = get_reflection().load_assembly(assembly_name)
+    except Exception as e:
+        logger.debug(f"Unable to load assembly {assembly_name}: {str(e)}")
+        return None
+    return assembly.GetName().Name, tuple(n.Name for n in assembly.GetReferencedAssemblies())
+
+
+def locate_assembly(assembly_name: str) -> Optional[Path]:
+    try:
+        assembly: Assembly = get_reflection().load_assembly(assembly_name)
+    except Exception as e:
+        logger.debug(f"Unable to load assembly {assembly_name}: {str(e)}")
+        return None
+    return get_reflection().get_source(assembly)
 
 
 def extract_assemblies(
@@ -643,30 +658,66 @@ def extract_assemblies(
     overwrite: bool,
     skip_failed: bool,
     multi_threaded: bool,
+    process_count: Optional[int] = None,
+    max_assemblies_per_process: Optional[int] = None,
+    declared_only: bool = False,
+    record_dir: Optional[Path] = None,
+    replay: bool = False,
+    type_workers: Optional[int] = None,
+    closure: bool = False,
 ) -> Union[int, str]:
-    if multi_threaded:
-        executor: Executor = ThreadPoolExecutor(thread_name_prefix="Worker")
-        for exit_code in executor.map(
-            extract_assembly,
+    if closure and replay:
+        logger.warning("Snapshots have no references to follow")
+        closure = False
+    if multi_threaded and (record_dir is not None or replay):
+        logger.warning("Snapshots are recorded and replayed one assembly at a time")
+        multi_threaded = False
+    if process_count is not None and type_workers is not None:
+        # Worker processes cannot start processes of their own
+        logger.warning("Types are not split across workers when assemblies are")
+        type_workers = None
+
+    clear_caches()
+    try:
+        if closure:
+            assembly_names = reference_closure(assembly_names, get_references)
+        return run_extraction(
+            functools.partial(
+                extract_assembly_entry,
+                declared_only=declared_only,
+                record_dir=record_dir,
+                replay=replay,
+                type_workers=type_workers,
+            ),
+            # A replayed assembly comes from its snapshot file
+            Path if replay else locate_assembly,
+            {"backend": "reflection", "declared_only": declared_only},
             assembly_names,
-            itertools.repeat(output_dir),
-            itertools.repeat(overwrite),
-        ):
-            if exit_code != 0 and not skip_failed:
-                executor.shutdown(cancel_futures=True)
-                return exit_code
-        executor.shutdown(wait=True)
-    else:
-        assembly_name: str
-        for assembly_name in assembly_names:
-            try:
-                exit_code: Union[int, str] = extract_assembly(assembly_name, output_dir, overwrite)
-                if exit_code != 0 and not skip_failed:
-                    return exit_code
-            except Exception as e:
-                if skip_failed:
-                    logger.warning("Could not extract assembly: %s", assembly_name, exc_info=e)
-                else:
-                    raise e from None
-
-    return 0
+            output_dir,
+            overwrite,
+            skip_failed,
+            multi_threaded,
+            process_count,
+            max_assemblies_per_process,
+        )
+    finally:
+        log_caches()
+
+
+def clear_caches() -> None:
+    for func in (extract_type, get_interfaces, extract_base_table, get_members):
+        func.cache_clear()
+
+
+def log_caches() -> None:
+    for func in (extract_type, get_interfaces, extract_base_table, get_members):
+        info = func.cache_info()
+        lookups: int = info.hits + info.misses
+        ratio: float = info.hits / lookups if lookups > 0 else 0.0
+        logger.info(
+            "%s cache: %d calls saved, %d misses, %.1f%% hit ratio",
+            func.__name__,
+            info.hits,
+            info.misses,
+            ratio * 100,
+        )
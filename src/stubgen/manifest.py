@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from dataclasses import field
+from dataclasses import replace
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import Final
+from typing import Mapping
+from typing import Optional
+
+import stubgen
+from stubgen.log import get_logger
+from stubgen.model import JsonType
+
+logger = get_logger(__name__)
+
+
+def hash_file(path: Path, chunk_size: int = 2**20) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as file:
+        while chunk := file.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    path: str
+    size: int
+    mtime: int
+    hash: str
+    name: str
+    version: str
+    stubgen_version: str
+    # The extraction options the files were written with, such as the backend
+    options: Mapping[str, Any] = field(default_factory=dict)
+
+    @property
+    def skeleton_name(self) -> str:
+        return f"{self.name}_{self.version}_skeleton.json"
+
+    @property
+    def doc_name(self) -> str:
+        return f"{self.name}_{self.version}_doc.json"
+
+    def to_json(self) -> JsonType:
+        return {
+            "path": self.path,
+            "size": self.size,
+            "mtime": self.mtime,
+            "hash": self.hash,
+            "name": self.name,
+            "version": self.version,
+            "stubgen_version": self.stubgen_version,
+            "options": dict(self.options),
+        }
+
+    @classmethod
+    def from_json(cls, json: JsonType) -> ManifestEntry:
+        return cls(
+            path=json["path"],
+            size=json["size"],
+            mtime=json["mtime"],
+            hash=json["hash"],
+            name=json["name"],
+            version=json["version"],
+            stubgen_version=json["stubgen_version"],
+            # Entries written before the options were recorded are extracted again
+            options=json.get("options", {}),
+        )
+
+    def check(
+        self, path: Optional[Path], output_dir: Path, options: Mapping[str, Any]
+    ) -> Optional[ManifestEntry]:
+        # The entry for the files in output_dir if they are still current, else None. The path is
+        # the file the assembly name resolves to now, which can be another file than the one
+        # extracted before, for example when the search paths changed.
+        if self.stubgen_version != stubgen.__version__ or self.options != options:
+            return None
+        if not (output_dir / self.skeleton_name).exists():
+            return None
+        if not (output_dir / self.doc_name).exists():
+            return None
+
+        if path is None or str(path) != self.path:
+            return None
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        if stat.st_size != self.size:
+            return None
+        if stat.st_mtime_ns == self.mtime:
+            return self
+
+        # Touched but possibly unchanged, only the content hash can tell
+        if hash_file(path) != self.hash:
+            return None
+        return replace(
+            ManifestEntry.from_file(path, name=self.name, version=self.version),
+            options=self.options,
+        )
+
+    @classmethod
+    def from_file(cls, path: Path, name: str, version: str) -> ManifestEntry:
+        stat = path.stat()
+        return cls(
+            path=str(path),
+            size=stat.st_size,
+            mtime=stat.st_mtime_ns,
+            hash=hash_file(path),
+            name=name,
+            version=version,
+            stubgen_version=stubgen.__version__,
+        )
+
+
+class Manifest:
+    file_name: Final[str] = "manifest.json"
+
+    def __init__(self, output_dir: Path) -> None:
+        self.output_dir: Final[Path] = output_dir
+        self.file: Final[Path] = output_dir / self.file_name
+        self.entries: Final[Dict[str, ManifestEntry]] = {}
+        self.lock: Final[threading.Lock] = threading.Lock()
+
+        if self.file.exists():
+            try:
+                with self.file.open("r") as file:
+                    data: JsonType = json.load(file)
+                self.entries.update(
+                    (k, ManifestEntry.from_json(v)) for k, v in data["assemblies"].items()
+                )
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning("Ignoring invalid manifest %r: %s", str(self.file), e)
+
+    def __contains__(self, assembly_name: str) -> bool:
+        return assembly_name in self.entries
+
+    def update(self, assembly_name: str, entry: ManifestEntry) -> None:
+        with self.lock:
+            self.entries[assembly_name] = entry
+
+    def save(self) -> None:
+        if not self.entries and not self.file.exists():
+            return
+        with self.lock:
+            data: JsonType = {
+                "stubgen_version": stubgen.__version__,
+                "assemblies": {k: self.entries[k].to_json() for k in sorted(self.entries)},
+            }
+        temp_file: Path = self.file.with_suffix(".tmp")
+        with temp_file.open("w") as file:
+            json.dump(data, file, indent=2)
+        temp_file.replace(self.file)
@@ -0,0 +1,526 @@
+from __future__ import annotations
+
+import mmap
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict
+from typing import Final
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+# Reads the ECMA-335 metadata of an assembly straight from its PE file, see partition II of
+# https://www.ecma-international.org/publications-and-standards/standards/ecma-335/
+
+
+class MetadataError(Exception):
+    pass
+
+
+# Table indexes
+MODULE: Final[int] = 0x00
+TYPE_REF: Final[int] = 0x01
+TYPE_DEF: Final[int] = 0x02
+FIELD_PTR: Final[int] = 0x03
+FIELD: Final[int] = 0x04
+METHOD_PTR: Final[int] = 0x05
+METHOD_DEF: Final[int] = 0x06
+PARAM_PTR: Final[int] = 0x07
+PARAM: Final[int] = 0x08
+INTERFACE_IMPL: Final[int] = 0x09
+MEMBER_REF: Final[int] = 0x0A
+CONSTANT: Final[int] = 0x0B
+CUSTOM_ATTRIBUTE: Final[int] = 0x0C
+FIELD_MARSHAL: Final[int] = 0x0D
+DECL_SECURITY: Final[int] = 0x0E
+CLASS_LAYOUT: Final[int] = 0x0F
+FIELD_LAYOUT: Final[int] = 0x10
+STAND_ALONE_SIG: Final[int] = 0x11
+EVENT_MAP: Final[int] = 0x12
+EVENT_PTR: Final[int] = 0x13
+EVENT: Final[int] = 0x14
+PROPERTY_MAP: Final[int] = 0x15
+PROPERTY_PTR: Final[int] = 0x16
+PROPERTY: Final[int] = 0x17
+METHOD_SEMANTICS: Final[int] = 0x18
+METHOD_IMPL: Final[int] = 0x19
+MODULE_REF: Final[int] = 0x1A
+TYPE_SPEC: Final[int] = 0x1B
+IMPL_MAP: Final[int] = 0x1C
+FIELD_RVA: Final[int] = 0x1D
+ENC_LOG: Final[int] = 0x1E
+ENC_MAP: Final[int] = 0x1F
+ASSEMBLY: Final[int] = 0x20
+ASSEMBLY_PROCESSOR: Final[int] = 0x21
+ASSEMBLY_OS: Final[int] = 0x22
+ASSEMBLY_REF: Final[int] = 0x23
+ASSEMBLY_REF_PROCESSOR: Final[int] = 0x24
+ASSEMBLY_REF_OS: Final[int] = 0x25
+FILE: Final[int] = 0x26
+EXPORTED_TYPE: Final[int] = 0x27
+MANIFEST_RESOURCE: Final[int] = 0x28
+NESTED_CLASS: Final[int] = 0x29
+GENERIC_PARAM: Final[int] = 0x2A
+METHOD_SPEC: Final[int] = 0x2B
+GENERIC_PARAM_CONSTRAINT: Final[int] = 0x2C
+TABLE_COUNT: Final[int] = 0x40
+
+
+@dataclass(frozen=True)
+class CodedIndex:
+    tables: Tuple[Optional[int], ...]
+    bits: int
+
+
+TYPE_DEF_OR_REF: Final[CodedIndex] = CodedIndex((TYPE_DEF, TYPE_REF, TYPE_SPEC), 2)
+HAS_CONSTANT: Final[CodedIndex] = CodedIndex((FIELD, PARAM, PROPERTY), 2)
+HAS_CUSTOM_ATTRIBUTE: Final[CodedIndex] = CodedIndex(
+    (
+        METHOD_DEF,
+        FIELD,
+        TYPE_REF,
+        TYPE_DEF,
+        PARAM,
+        INTERFACE_IMPL,
+        MEMBER_REF,
+        MODULE,
+        DECL_SECURITY,
+        PROPERTY,
+        EVENT,
+        STAND_ALONE_SIG,
+        MODULE_REF,
+        TYPE_SPEC,
+        ASSEMBLY,
+        ASSEMBLY_REF,
+        FILE,
+        EXPORTED_TYPE,
+        MANIFEST_RESOURCE,
+        GENERIC_PARAM,
+        GENERIC_PARAM_CONSTRAINT,
+        METHOD_SPEC,
+    ),
+    5,
+)
+HAS_FIELD_MARSHAL: Final[CodedIndex] = CodedIndex((FIELD, PARAM), 1)
+HAS_DECL_SECURITY: Final[CodedIndex] = CodedIndex((TYPE_DEF, METHOD_DEF, ASSEMBLY), 2)
+MEMBER_REF_PARENT: Final[CodedIndex] = CodedIndex(
+    (TYPE_DEF, TYPE_REF, MODULE_REF, METHOD_DEF, TYPE_SPEC), 3
+)
+HAS_SEMANTICS: Final[CodedIndex] = CodedIndex((EVENT, PROPERTY), 1)
+METHOD_DEF_OR_REF: Final[CodedIndex] = CodedIndex((METHOD_DEF, MEMBER_REF), 1)
+MEMBER_FORWARDED: Final[CodedIndex] = CodedIndex((FIELD, METHOD_DEF), 1)
+IMPLEMENTATION: Final[CodedIndex] = CodedIndex((FILE, ASSEMBLY_REF, EXPORTED_TYPE), 2)
+CUSTOM_ATTRIBUTE_TYPE: Final[CodedIndex] = CodedIndex((None, None, METHOD_DEF, MEMBER_REF, None), 3)
+RESOLUTION_SCOPE: Final[CodedIndex] = CodedIndex((MODULE, MODULE_REF, ASSEMBLY_REF, TYPE_REF), 2)
+TYPE_OR_METHOD_DEF: Final[CodedIndex] = CodedIndex((TYPE_DEF, METHOD_DEF), 1)
+
+# Column kinds are fixed sizes ("H", "I", "B"), heap indexes ("string", "guid", "blob"), table
+# indexes (int) or coded indexes (CodedIndex)
+SCHEMA: Final[Dict[int, Tuple[object, ...]]] = {
+    MODULE: ("H", "string", "guid", "guid", "guid"),
+    TYPE_REF: (RESOLUTION_SCOPE, "string", "string"),
+    TYPE_DEF: ("I", "string", "string", TYPE_DEF_OR_REF, FIELD, METHOD_DEF),
+    FIELD_PTR: (FIELD,),
+    FIELD: ("H", "string", "blob"),
+    METHOD_PTR: (METHOD_DEF,),
+    METHOD_DEF: ("I", "H", "H", "string", "blob", PARAM),
+    PARAM_PTR: (PARAM,),
+    PARAM: ("H", "H", "string"),
+    INTERFACE_IMPL: (TYPE_DEF, TYPE_DEF_OR_REF),
+    MEMBER_REF: (MEMBER_REF_PARENT, "string", "blob"),
+    CONSTANT: ("B", "B", HAS_CONSTANT, "blob"),
+    CUSTOM_ATTRIBUTE: (HAS_CUSTOM_ATTRIBUTE, CUSTOM_ATTRIBUTE_TYPE, "blob"),
+    FIELD_MARSHAL: (HAS_FIELD_MARSHAL, "blob"),
+    DECL_SECURITY: ("H", HAS_DECL_SECURITY, "blob"),
+    CLASS_LAYOUT: ("H", "I", TYPE_DEF),
+    FIELD_LAYOUT: ("I", FIELD),
+    STAND_ALONE_SIG: ("blob",),
+    EVENT_MAP: (TYPE_DEF, EVENT),
+    EVENT_PTR: (EVENT,),
+    EVENT: ("H", "string", TYPE_DEF_OR_REF),
+    PROPERTY_MAP: (TYPE_DEF, PROPERTY),
+    PROPERTY_PTR: (PROPERTY,),
+    PROPERTY: ("H", "string", "blob"),
+    METHOD_SEMANTICS: ("H", METHOD_DEF, HAS_SEMANTICS),
+    METHOD_IMPL: (TYPE_DEF, METHOD_DEF_OR_REF, METHOD_DEF_OR_REF),
+    MODULE_REF: ("string",),
+    TYPE_SPEC: ("blob",),
+    IMPL_MAP: ("H", MEMBER_FORWARDED, "string", MODULE_REF),
+    FIELD_RVA: ("I", FIELD),
+    ENC_LOG: ("I", "I"),
+    ENC_MAP: ("I",),
+    ASSEMBLY: ("I", "H", "H", "H", "H", "I", "blob", "string", "string"),
+    ASSEMBLY_PROCESSOR: ("I",),
+    ASSEMBLY_OS: ("I", "I", "I"),
+    ASSEMBLY_REF: ("H", "H", "H", "H", "I", "blob", "string", "string", "blob"),
+    ASSEMBLY_REF_PROCESSOR: ("I", ASSEMBLY_REF),
+    ASSEMBLY_REF_OS: ("I", "I", "I", ASSEMBLY_REF),
+    FILE: ("I", "string", "blob"),
+    EXPORTED_TYPE: ("I", "I", "string", "string", IMPLEMENTATION),
+    MANIFEST_RESOURCE: ("I", "I", "string", IMPLEMENTATION),
+    NESTED_CLASS: (TYPE_DEF, TYPE_DEF),
+    GENERIC_PARAM: ("H", "H", TYPE_OR_METHOD_DEF, "string"),
+    METHOD_SPEC: (METHOD_DEF_OR_REF, "blob"),
+    GENERIC_PARAM_CONSTRAINT: (GENERIC_PARAM, TYPE_DEF_OR_REF),
+}
+
+# Element types of signatures
+ELEMENT_TYPE_VOID: Final[int] = 0x01
+ELEMENT_TYPE_PTR: Final[int] = 0x0F
+ELEMENT_TYPE_BYREF: Final[int] = 0x10
+ELEMENT_TYPE_VALUETYPE: Final[int] = 0x11
+ELEMENT_TYPE_CLASS: Final[int] = 0x12
+ELEMENT_TYPE_VAR: Final[int] = 0x13
+ELEMENT_TYPE_ARRAY: Final[int] = 0x14
+ELEMENT_TYPE_GENERICINST: Final[int] = 0x15
+ELEMENT_TYPE_FNPTR: Final[int] = 0x1B
+ELEMENT_TYPE_SZARRAY: Final[int] = 0x1D
+ELEMENT_TYPE_MVAR: Final[int] = 0x1E
+ELEMENT_TYPE_CMOD_REQD: Final[int] = 0x1F
+ELEMENT_TYPE_CMOD_OPT: Final[int] = 0x20
+ELEMENT_TYPE_SENTINEL: Final[int] = 0x41
+ELEMENT_TYPE_PINNED: Final[int] = 0x45
+
+PRIMITIVE_TYPES: Final[Dict[int, str]] = {
+    ELEMENT_TYPE_VOID: "Void",
+    0x02: "Boolean",
+    0x03: "Char",
+    0x04: "SByte",
+    0x05: "Byte",
+    0x06: "Int16",
+    0x07: "UInt16",
+    0x08: "Int32",
+    0x09: "UInt32",
+    0x0A: "Int64",
+    0x0B: "UInt64",
+    0x0C: "Single",
+    0x0D: "Double",
+    0x0E: "String",
+    0x16: "TypedReference",
+    0x18: "IntPtr",
+    0x19: "UIntPtr",
+    0x1C: "Object",
+}
+
+CONSTANT_FORMATS: Final[Dict[int, str]] = {
+    0x02: "<?",
+    0x03: "<H",
+    0x04: "<b",
+    0x05: "<B",
+    0x06: "<h",
+    0x07: "<H",
+    0x08: "<i",
+    0x09: "<I",
+    0x0A: "<q",
+    0x0B: "<Q",
+    0x0C: "<f",
+    0x0D: "<d",
+}
+
+# Calling conventions of method signatures
+SIGNATURE_GENERIC: Final[int] = 0x10
+SIGNATURE_HAS_THIS: Final[int] = 0x20
+
+# Flags of TypeDef, Field, MethodDef, Param and MethodSemantics rows
+TYPE_VISIBILITY_MASK: Final[int] = 0x07
+TYPE_NESTED_PUBLIC: Final[int] = 0x02
+TYPE_INTERFACE: Final[int] = 0x20
+TYPE_ABSTRACT: Final[int] = 0x80
+MEMBER_ACCESS_MASK: Final[int] = 0x07
+MEMBER_PUBLIC: Final[int] = 0x06
+MEMBER_STATIC: Final[int] = 0x10
+FIELD_LITERAL: Final[int] = 0x40
+METHOD_RT_SPECIAL_NAME: Final[int] = 0x1000
+PARAM_OUT: Final[int] = 0x02
+PARAM_HAS_DEFAULT: Final[int] = 0x1000
+SEMANTICS_SETTER: Final[int] = 0x01
+SEMANTICS_GETTER: Final[int] = 0x02
+SEMANTICS_ADD_ON: Final[int] = 0x08
+
+Row = Tuple[int, ...]
+
+
+@dataclass(frozen=True)
+class TypeSig:
+    # element is the element type, token a (table, row) pair of class and value types, args the
+    # generic arguments or the element of arrays, pointers and references, number the index of
+    # generic parameters
+    element: int
+    token: Optional[Tuple[int, int]] = None
+    args: Tuple[TypeSig, ...] = ()
+    number: int = 0
+
+
+@dataclass(frozen=True)
+class MethodSig:
+    has_this: bool
+    generic_count: int
+    return_type: TypeSig
+    parameters: Tuple[TypeSig, ...]
+
+
+class SignatureReader:
+    def __init__(self, blob: bytes) -> None:
+        self.blob: Final[bytes] = blob
+        self.position: int = 0
+
+    def read_byte(self) -> int:
+        value: int = self.blob[self.position]
+        self.position += 1
+        return value
+
+    def read_compressed(self) -> int:
+        first: int = self.read_byte()
+        if first & 0x80 == 0:
+            return first
+        if first & 0xC0 == 0x80:
+            return (first & 0x3F) << 8 | self.read_byte()
+        value: int = first & 0x1F
+        for _ in range(3):
+            value = value << 8 | self.read_byte()
+        return value
+
+    def read_token(self) -> Tuple[int, int]:
+        return decode_index(TYPE_DEF_OR_REF, self.read_compressed())
+
+    def skip_custom_modifiers(self) -> None:
+        while self.blob[self.position] in (ELEMENT_TYPE_CMOD_REQD, ELEMENT_TYPE_CMOD_OPT):
+            self.position += 1
+            self.read_compressed()
+
+    def read_type(self) -> TypeSig:
+        self.skip_custom_modifiers()
+        element: int = self.read_byte()
+        if element in PRIMITIVE_TYPES:
+            return TypeSig(element)
+        if element in (ELEMENT_TYPE_CLASS, ELEMENT_TYPE_VALUETYPE):
+            return TypeSig(element, token=self.read_token())
+        if element in (ELEMENT_TYPE_VAR, ELEMENT_TYPE_MVAR):
+            return TypeSig(element, number=self.read_compressed())
+        if element in (ELEMENT_TYPE_PTR, ELEMENT_TYPE_BYREF, ELEMENT_TYPE_SZARRAY):
+            return TypeSig(element, args=(self.read_type(),))
+        if element == ELEMENT_TYPE_PINNED:
+            return self.read_type()
+        if element == ELEMENT_TYPE_GENERICINST:
+            self.read_byte()
+            token: Tuple[int, int] = self.read_token()
+            count: int = self.read_compressed()
+            return TypeSig(element, token=token, args=tuple(self.read_type() for _ in range(count)))
+        if element == ELEMENT_TYPE_ARRAY:
+            inner: TypeSig = self.read_type()
+            rank: int = self.read_compressed()
+            for _ in range(self.read_compressed()):
+                self.read_compressed()
+            for _ in range(self.read_compressed()):
+                self.read_compressed()
+            return TypeSig(element, args=(inner,), number=rank)
+        if element == ELEMENT_TYPE_FNPTR:
+            self.read_method()
+            return TypeSig(element)
+        raise MetadataError(f"Unsupported element type: 0x{element:02x}")
+
+    def read_method(self) -> MethodSig:
+        convention: int = self.read_byte()
+        generic_count: int = self.read_compressed() if convention & SIGNATURE_GENERIC else 0
+        count: int = self.read_compressed()
+        return_type: TypeSig = self.read_type()
+        parameters: List[TypeSig] = []
+        while len(parameters) < count:
+            if self.blob[self.position] == ELEMENT_TYPE_SENTINEL:
+                self.position += 1
+            parameters.append(self.read_type())
+        return MethodSig(
+            has_this=bool(convention & SIGNATURE_HAS_THIS),
+            generic_count=generic_count,
+            return_type=return_type,
+            parameters=tuple(parameters),
+        )
+
+    def read_field(self) -> TypeSig:
+        self.read_byte()
+        return self.read_type()
+
+    def read_property(self) -> TypeSig:
+        self.read_byte()
+        count: int = self.read_compressed()
+        self.skip_custom_modifiers()
+        property_type: TypeSig = self.read_type()
+        for _ in range(count):
+            self.read_type()
+        return property_type
+
+
+def decode_index(coded_index: CodedIndex, value: int) -> Tuple[int, int]:
+    # Returns (table, row), rows are 1-based and 0 is a null index
+    table: Optional[int] = coded_index.tables[value & ((1 << coded_index.bits) - 1)]
+    if table is None:
+        raise MetadataError(f"Invalid coded index: {value}")
+    return table, value >> coded_index.bits
+
+
+class MetadataReader:
+    def __init__(self, path: Path) -> None:
+        self.path: Final[Path] = path
+        with path.open("rb") as file:
+            self.data: Final[mmap.mmap] = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.strings: Dict[int, str] = {}
+        self.tables: Dict[int, Sequence[Row]] = {}
+        self.constants: Optional[Dict[int, Tuple[int, int]]] = None
+        try:
+            self.read_headers()
+        except (struct.error, IndexError, ValueError) as e:
+            self.data.close()
+            raise MetadataError(f"Invalid assembly {str(path)!r}: {e}") from None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({str(self.path)!r})"
+
+    def close(self) -> None:
+        self.tables.clear()
+        self.data.close()
+
+    def unpack(self, fmt: str, offset: int) -> Tuple[int, ...]:
+        return struct.unpack_from(fmt, self.data, offset)
+
+    def read_headers(self) -> None:
+        if self.data[:2] != b"MZ":
+            raise MetadataError(f"Not a PE file: {str(self.path)!r}")
+        pe_offset: int = self.unpack("<I", 0x3C)[0]
+        if self.data[pe_offset : pe_offset + 4] != b"PE\0\0":
+            raise MetadataError(f"Not a PE file: {str(self.path)!r}")
+        section_count, optional_size = self.unpack("<2xH12xH", pe_offset + 4)
+        optional_offset: int = pe_offset + 24
+        magic: int = self.unpack("<H", optional_offset)[0]
+        directories: int = optional_offset + (96 if magic == 0x10B else 112)
+        cli_rva: int = self.unpack("<I", directories + 14 * 8)[0]
+        if cli_rva == 0:
+            raise MetadataError(f"Not a .NET assembly: {str(self.path)!r}")
+
+        self.sections: Final[List[Tuple[int, int, int]]] = []
+        for i in range(section_count):
+            virtual_size, virtual_address, raw_size, raw_offset = self.unpack(
+                "<8xIIII", optional_offset + optional_size + 40 * i
+            )
+            self.sections.append((max(virtual_size, raw_size), virtual_address, raw_offset))
+        metadata_rva: int = self.unpack("<I", self.offset(cli_rva) + 8)[0]
+        root: int = self.offset(metadata_rva)
+        if self.unpack("<I", root)[0] != 0x424A5342:
+            raise MetadataError(f"Invalid metadata signature: {str(self.path)!r}")
+        version_length: int = self.unpack("<I", root + 12)[0]
+        position: int = root + 16 + version_length
+        stream_count: int = self.unpack("<2xH", position)[0]
+        position += 4
+
+        streams: Dict[str, Tuple[int, int]] = {}
+        for _ in range(stream_count):
+            offset, size = self.unpack("<II", position)
+            end: int = self.data.find(b"\0", position + 8)
+            name: str = self.data[position + 8 : end].decode("ascii")
+            streams[name] = (root + offset, size)
+            position += 8 + (end - position - 8 + 4) // 4 * 4
+
+        self.string_heap: Final[int] = streams["#Strings"][0]
+        self.blob_heap: Final[int] = streams["#Blob"][0] if "#Blob" in streams else 0
+        tables_offset: int = streams["#~" if "#~" in streams else "#-"][0]
+        self.read_tables(tables_offset)
+
+    def offset(self, rva: int) -> int:
+        for virtual_size, virtual_address, raw_offset in self.sections:
+            if virtual_address <= rva < virtual_address + virtual_size:
+                return rva - virtual_address + raw_offset
+        raise MetadataError(f"Address outside of sections: 0x{rva:x}")
+
+    def read_tables(self, offset: int) -> None:
+        heap_sizes, valid = self.unpack("<6xBxQ", offset)
+        position: int = offset + 24
+        row_counts: List[int] = [0] * TABLE_COUNT
+        for table in range(TABLE_COUNT):
+            if valid >> table & 1:
+                row_counts[table] = self.unpack("<I", position)[0]
+                position += 4
+        if heap_sizes & 0x40:
+            # Extra data of uncompressed tables
+            position += 4
+        self.row_counts: Final[Sequence[int]] = tuple(row_counts)
+
+        sizes: Dict[str, str] = {
+            "string": "I" if heap_sizes & 0x01 else "H",
+            "guid": "I" if heap_sizes & 0x02 else "H",
+            "blob": "I" if heap_sizes & 0x04 else "H",
+        }
+
+        def column_format(column: object) -> str:
+            if isinstance(column, str):
+                return sizes.get(column, column)
+            if isinstance(column, CodedIndex):
+                limit: int = 1 << (16 - column.bits)
+                rows: int = max(row_counts[t] for t in column.tables if t is not None)
+                return "H" if rows < limit else "I"
+            return "H" if row_counts[column] < 1 << 16 else "I"
+
+        self.table_offsets: Final[Dict[int, Tuple[int, struct.Struct]]] = {}
+        for table in range(TABLE_COUNT):
+            if row_counts[table] == 0:
+                continue
+            if table not in SCHEMA:
+                raise MetadataError(f"Unknown metadata table: 0x{table:02x}")
+            row_struct: struct.Struct = struct.Struct(
+                "<" + "".join(map(column_format, SCHEMA[table]))
+            )
+            self.table_offsets[table] = (position, row_struct)
+            position += row_struct.size * row_counts[table]
+
+    def rows(self, table: int) -> Sequence[Row]:
+        # Tables are decoded on first use, row n of the metadata is at index n - 1
+        if table not in self.tables:
+            if table not in self.table_offsets:
+                self.tables[table] = ()
+            else:
+                offset, row_struct = self.table_offsets[table]
+                end: int = offset + row_struct.size * self.row_counts[table]
+                self.tables[table] = tuple(row_struct.iter_unpack(self.data[offset:end]))
+        return self.tables[table]
+
+    def row(self, table: int, index: int) -> Row:
+        return self.rows(table)[index - 1]
+
+    def string(self, offset: int) -> str:
+        value: Optional[str] = self.strings.get(offset)
+        if value is None:
+            start: int = self.string_heap + offset
+            value = self.data[start : self.data.find(b"\0", start)].decode("utf-8", "replace")
+            self.strings[offset] = value
+        return value
+
+    def blob(self, offset: int) -> bytes:
+        start: int = self.blob_heap + offset
+        reader: SignatureReader = SignatureReader(self.data[start : start + 4])
+        length: int = reader.read_compressed()
+        start += reader.position
+        return self.data[start : start + length]
+
+    def signature(self, offset: int) -> SignatureReader:
+        return SignatureReader(self.blob(offset))
+
+    def list_range(self, table: int, index: int, column: int, target: int) -> range:
+        # Rows own the target rows from their list column up to the list column of the next row
+        rows: Sequence[Row] = self.rows(table)
+        start: int = rows[index - 1][column]
+        end: int = rows[index][column] if index < len(rows) else self.row_counts[target] + 1
+        return range(start, end)
+
+    def constant(self, table: int, index: int) -> Optional[object]:
+        if self.constants is None:
+            self.constants = {
+                parent: (element, value) for element, _, parent, value in self.rows(CONSTANT)
+            }
+        parent: int = index << HAS_CONSTANT.bits | HAS_CONSTANT.tables.index(table)
+        if parent not in self.constants:
+            return None
+        element, value = self.constants[parent]
+        fmt: Optional[str] = CONSTANT_FORMATS.get(element)
+        if fmt is None:
+            return None
+        return struct.unpack(fmt, self.blob(value))[0]
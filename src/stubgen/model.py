@@ -1,11 +1,19 @@
 from __future__ import annotations
 
+import dataclasses
+import functools
+import hashlib
+import json as jsonlib
+import operator
 import re
 from abc import ABC
 from abc import abstractmethod
 from dataclasses import dataclass
 from typing import Any
+from typing import Callable
 from typing import Dict
+from typing import Final
+from typing import List
 from typing import Mapping
 from typing import Optional
 from typing import Sequence
@@ -22,7 +30,122 @@ JsonType = Union[None, int, float, str, Sequence, Mapping]
 
 logger = get_logger(__name__)
 
-
+by_sort_key: Final[Callable[[Any], Any]] = operator.attrgetter("sort_key")
+
+type_header_pattern: Final[re.Pattern] = re.compile(
+    r"(?:([^:\[\],?$* ]+):)?(\$)?(\*)?([^:\[\],?$* ]+)(\?)?"
+)
+
+
+class cached_slot:
+    # Like functools.cached_property, but stores the value in a slot of a frozen instance
+    def __init__(self, func: Callable[[Any], Any]) -> None:
+        self.func: Final[Callable[[Any], Any]] = func
+        self.slot: Final[str] = f"_{func.__name__}"
+        self.__doc__ = func.__doc__
+
+    def __get__(self, instance: Any, owner: Optional[type] = None) -> Any:
+        if instance is None:
+            return self
+        try:
+            return getattr(instance, self.slot)
+        except AttributeError:
+            value: Any = self.func(instance)
+            object.__setattr__(instance, self.slot, value)
+            return value
+
+    def preset(self, instance: Any, value: Any) -> None:
+        object.__setattr__(instance, self.slot, value)
+
+
+class stable_slot(cached_slot):
+    # A cached_slot whose value is the same in every process, so it is pickled with the fields
+    pass
+
+
+def slotted(cls: Type[T]) -> Type[T]:
+    # Rebuild a frozen dataclass with __slots__, dataclass(slots=True) needs Python 3.10
+    # and does not rebind the __class__ cell used by zero argument super() before 3.12
+    field_names: Tuple[str, ...] = tuple(f.name for f in dataclasses.fields(cls))
+    inherited: set = set()
+    for base in cls.__mro__[1:]:
+        inherited.update(base.__dict__.get("__slots__", ()))
+    cls_dict: Dict[str, Any] = dict(cls.__dict__)
+    # Values derived from the frozen fields are cached in extra slots, which are not part of
+    # the pickled state since hashes of strings differ between processes
+    cache_slots: List[str] = [v.slot for v in cls_dict.values() if isinstance(v, cached_slot)]
+    field_hash: Optional[Callable[[Any], int]] = cls_dict.get("__hash__")
+    if field_hash is not None:
+        cache_slots.append("_hash")
+
+        def __hash__(self: Any) -> int:
+            try:
+                return self._hash
+            except AttributeError:
+                value: int = field_hash(self)
+                object.__setattr__(self, "_hash", value)
+                return value
+
+        cls_dict["__hash__"] = __hash__
+    cls_dict["__slots__"] = tuple(n for n in (*field_names, *cache_slots) if n not in inherited)
+    stable_slots: Tuple[str, ...] = tuple(
+        dict.fromkeys(
+            v.slot
+            for c in (cls, *cls.__mro__[1:])
+            for v in vars(c).values()
+            if isinstance(v, stable_slot)
+        )
+    )
+    for name in field_names:
+        cls_dict.pop(name, None)
+    cls_dict.pop("__dict__", None)
+    cls_dict.pop("__weakref__", None)
+
+    # Frozen instances reject setattr, which default pickling of slots relies on
+    def __getstate__(self: Any) -> List[Any]:
+        state: List[Any] = [getattr(self, n) for n in field_names]
+        state.extend(getattr(self, n, None) for n in stable_slots)
+        return state
+
+    cls_dict["__getstate__"] = __getstate__
+
+    new_cls: Type[T] = type(cls)(cls.__name__, cls.__bases__, cls_dict)
+
+    # Set through the slot descriptors, which is faster than object.__setattr__ by name and
+    # matters when skeletons are loaded in worker processes and sent back
+    setters: Tuple[Callable[[Any, Any], None], ...] = tuple(
+        getattr(new_cls, n).__set__ for n in field_names
+    )
+
+    stable_setters: Tuple[Callable[[Any, Any], None], ...] = tuple(
+        getattr(new_cls, n).__set__ for n in stable_slots
+    )
+
+    def __setstate__(self: Any, state: List[Any]) -> None:
+        for setter, value in zip(setters, state):
+            setter(self, value)
+        # Stable values that were not computed before pickling are left to compute on demand
+        for setter, value in zip(stable_setters, state[len(setters) :]):
+            if value is not None:
+                setter(self, value)
+
+    new_cls.__setstate__ = __setstate__
+    new_cls.__qualname__ = cls.__qualname__
+    for value in cls_dict.values():
+        func: Any = getattr(value, "__func__", value)
+        for cell in getattr(func, "__closure__", None) or ():
+            if cell.cell_contents is cls:
+                cell.cell_contents = new_cls
+    return new_cls
+
+
+def json_digest(value: JsonType) -> bytes:
+    # Of the canonical JSON, so equal definitions have the same digest in every process
+    text: str = jsonlib.dumps(value, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+@slotted
 @dataclass(frozen=True)
 class CNamespace:
     name: str
@@ -32,16 +155,27 @@ class CNamespace:
         return self.name
 
     def __lt__(self, other: CField) -> bool:
-        return self.name < other.name
+        return self.sort_key < other.sort_key
 
     def __le__(self, other: CField) -> bool:
-        return self.name <= other.name
+        return self.sort_key <= other.sort_key
 
     def __gt__(self, other: CField) -> bool:
-        return self.name > other.name
+        return self.sort_key > other.sort_key
 
     def __ge__(self, other: CField) -> bool:
-        return self.name >= other.name
+        return self.sort_key >= other.sort_key
+
+    @cached_slot
+    def sort_key(self) -> Tuple[str]:
+        return (self.name,)
+
+    @stable_slot
+    def fingerprint(self) -> bytes:
+        digest: Any = hashlib.blake2b(self.name.encode(), digest_size=16)
+        for key, type_def in sorted(self.types.items()):
+            digest.update(b"\0" + key.encode() + b"\0" + type_def.fingerprint)
+        return digest.digest()
 
     def to_json(self) -> JsonType:
         return {"name": self.name, "types": {k: v.to_json() for k, v in self.types.items()}}
@@ -54,6 +188,7 @@ class CNamespace:
         )
 
 
+@slotted
 @dataclass(frozen=True)
 class CTypeDefinition(ABC):
     name: str
@@ -61,26 +196,34 @@ class CTypeDefinition(ABC):
     nested: Optional[CType]
 
     def __str__(self) -> str:
-        name: str = self.simple_name
-        if self.nested is not None:
-            name = f"{self.nested.full_name}.{name}"
-        elif self.namespace is not None:
-            name = f"{self.namespace}.{name}"
-        return name
+        return self.full_name
 
     def __lt__(self, other: CField) -> bool:
-        return self.name < other.name
+        return self.sort_key < other.sort_key
 
     def __le__(self, other: CField) -> bool:
-        return self.name <= other.name
+        return self.sort_key <= other.sort_key
 
     def __gt__(self, other: CField) -> bool:
-        return self.name > other.name
+        return self.sort_key > other.sort_key
 
     def __ge__(self, other: CField) -> bool:
-        return self.name >= other.name
+        return self.sort_key >= other.sort_key
 
-    @property
+    @cached_slot
+    def sort_key(self) -> Tuple[str]:
+        return (self.name,)
+
+    @cached_slot
+    def full_name(self) -> str:
+        name: str = self.simple_name
+        if self.nested is not None:
+            name = f"{self.nested.full_name}.{name}"
+        elif self.namespace is not None:
+            name = f"{self.namespace}.{name}"
+        return name
+
+    @cached_slot
     def simple_name(self) -> str:
         name: str = self.name
         if hasattr(self, "generic_args"):
@@ -89,6 +232,16 @@ class CTypeDefinition(ABC):
                 name = f"{name}[{generic}]"
         return name
 
+    @cached_slot
+    def doc_key(self) -> str:
+        return self.simple_name
+
+    @stable_slot
+    def fingerprint(self) -> bytes:
+        # Definitions with the same digest are equal. Loaded ones are digested from their JSON,
+        # which may differ from to_json() in order, so a few equal ones are still merged.
+        return json_digest(self.to_json())
+
     @abstractmethod
     def to_json(self) -> JsonType:
         pass
@@ -100,18 +253,24 @@ class CTypeDefinition(ABC):
     @classmethod
     def from_json(cls: Type[T], json: JsonType) -> T:
         type: str = json["type"]
+        type_def: Optional[CTypeDefinition] = None
         if type == "class":
-            return CClass.from_json(json)
-        if type == "struct":
-            return CStruct.from_json(json)
-        if type == "interface":
-            return CInterface.from_json(json)
-        if type == "enum":
-            return CEnum.from_json(json)
-        if type == "delegate":
-            return CDelegate.from_json(json)
-
-
+            type_def = CClass.from_json(json)
+        elif type == "struct":
+            type_def = CStruct.from_json(json)
+        elif type == "interface":
+            type_def = CInterface.from_json(json)
+        elif type == "enum":
+            type_def = CEnum.from_json(json)
+        elif type == "delegate":
+            type_def = CDelegate.from_json(json)
+        if type_def is not None:
+            # The loaded JSON is digested right away, rebuilding it from the model costs more
+            CTypeDefinition.fingerprint.preset(type_def, json_digest(json))
+        return type_def
+
+
+@slotted
 @dataclass(frozen=True)
 class CClass(CTypeDefinition):
     abstract: bool
@@ -163,7 +322,7 @@ class CClass(CTypeDefinition):
             name, json = child.to_doc_json()
             doc_json[name] = json
 
-        return self.simple_name, doc_json
+        return self.doc_key, doc_json
 
     @classmethod
     def from_json(cls: Type[T], json: JsonType) -> T:
@@ -184,6 +343,7 @@ class CClass(CTypeDefinition):
         )
 
 
+@slotted
 @dataclass(frozen=True)
 class CStruct(CClass):
     def to_json(self) -> JsonType:
@@ -192,6 +352,7 @@ class CStruct(CClass):
         return json
 
 
+@slotted
 @dataclass(frozen=True)
 class CInterface(CTypeDefinition):
     generic_args: Sequence[CType]
@@ -236,7 +397,7 @@ class CInterface(CTypeDefinition):
             name, json = child.to_doc_json()
             doc_json[name] = json
 
-        return self.simple_name, doc_json
+        return self.doc_key, doc_json
 
     @classmethod
     def from_json(cls: Type[T], json: JsonType) -> T:
@@ -244,7 +405,7 @@ class CInterface(CTypeDefinition):
             name=json["name"],
             namespace=json["namespace"],
             nested=CType.from_json(json["nested"]),
-            generic_args=tuple(sorted(map(CType.from_json, json["generic_args"]))),
+            generic_args=tuple(sorted(map(CType.from_json, json["generic_args"]), key=by_sort_key)),
             interfaces=tuple(map(CType.from_json, json["interfaces"])),
             fields={k: CField.from_json(v) for k, v in json["fields"].items()},
             properties={k: CProperty.from_json(v) for k, v in json["properties"].items()},
@@ -254,6 +415,7 @@ class CInterface(CTypeDefinition):
         )
 
 
+@slotted
 @dataclass(frozen=True)
 class CEnum(CTypeDefinition):
     fields: Sequence[str]
@@ -268,7 +430,7 @@ class CEnum(CTypeDefinition):
         }
 
     def to_doc_json(self) -> Tuple[str, JsonType]:
-        return self.simple_name, {
+        return self.doc_key, {
             "doc": "",
             "doc_formatted": {},
             **{f: {"doc": ""} for f in self.fields},
@@ -284,12 +446,13 @@ class CEnum(CTypeDefinition):
         )
 
 
+@slotted
 @dataclass(frozen=True)
 class CDelegate(CTypeDefinition):
     parameters: Sequence[CParameter]
     return_type: CType
 
-    @property
+    @cached_slot
     def simple_name(self) -> str:
         param_types: str = ", ".join(str(p.type) for p in self.parameters)
         return f"{self.name}({param_types})"
@@ -310,7 +473,7 @@ class CDelegate(CTypeDefinition):
             doc_json["parameters"] = {p.name: "" for p in self.parameters}
         if self.return_type is not None and self.return_type != CType("Void", "System"):
             doc_json["return"] = ""
-        return self.simple_name, doc_json
+        return self.doc_key, doc_json
 
     @classmethod
     def from_json(cls: Type[T], json: JsonType) -> T:
@@ -323,6 +486,7 @@ class CDelegate(CTypeDefinition):
         )
 
 
+@slotted
 @dataclass(frozen=True)
 class CType:
     name: str
@@ -336,16 +500,30 @@ class CType:
         return self.full_name
 
     def __lt__(self, other: CType) -> bool:
-        return CType.compare(self, other) < 0
+        return self.sort_key < other.sort_key
 
     def __le__(self, other: CType) -> bool:
-        return CType.compare(self, other) <= 0
+        return self.sort_key <= other.sort_key
 
     def __gt__(self, other: CType) -> bool:
-        return CType.compare(self, other) > 0
+        return self.sort_key > other.sort_key
 
     def __ge__(self, other: CType) -> bool:
-        return CType.compare(self, other) >= 0
+        return self.sort_key >= other.sort_key
+
+    @cached_slot
+    def sort_key(self) -> Tuple[Any, ...]:
+        # Orders the same as CType.compare
+        return (
+            self.namespace is not None,
+            self.namespace or "",
+            self.name,
+            len(self.inner),
+            tuple(t.sort_key for t in self.inner),
+            self.reference,
+            self.generic,
+            self.nullable,
+        )
 
     @property
     def import_name(self) -> str:
@@ -354,14 +532,14 @@ class CType:
             name = f"{self.namespace}.{name}"
         return name
 
-    @property
+    @cached_slot
     def simple_name(self) -> str:
         name: str = self.name
         if len(self.inner) > 0:
             name = f"{name}[{', '.join(t.simple_name for t in self.inner)}]"
         return name
 
-    @property
+    @cached_slot
     def full_name(self) -> str:
         name: str = self.name
         if self.reference:
@@ -380,23 +558,54 @@ class CType:
         return str(self)
 
     @classmethod
+    @functools.lru_cache(maxsize=65536)
     def from_json(cls, json: JsonType) -> Optional[CType]:
+        # Instances are frozen, so every occurrence of a type string shares one object
         if json is None:
             return None
-        match: re.Match = re.match(
-            r"(?:(\w+(?:\.\w+)*):)?(\$?\*?\w+(?:\.\w+)*\??)(?:\[(.*)])?", json
-        )
-        name: str = match.group(2)
-        inner: Sequence[CType] = tuple()
-        if (inner_str := match.group(3)) is not None:
-            inner = tuple(map(CType.from_json, inner_str.split(", ")))
-        return cls(
-            name=re.sub(r"[?$*]", "", name),
-            namespace=match.group(1),
-            inner=inner,
-            reference="*" in name,
-            generic="$" in name,
-            nullable="?" in name,
+        type, end = cls.parse(json)
+        if end != len(json):
+            raise ValueError(f"Invalid type string: {json!r}")
+        return type
+
+    @classmethod
+    def parse(cls, json: str, start: int = 0) -> Tuple[CType, int]:
+        # Parses "namespace:$*Name?[Inner, ...]" starting at start and returns the type and
+        # the index just past it
+        match: Optional[re.Match] = type_header_pattern.match(json, start)
+        if match is None:
+            raise ValueError(f"Invalid type string: {json!r}")
+        namespace, generic, reference, name, nullable = match.groups()
+        pos: int = match.end()
+
+        inner: List[CType] = []
+        if json.startswith("[", pos):
+            pos += 1
+            while True:
+                inner_start: int = pos
+                inner_type, pos = cls.parse(json, pos)
+                if len(inner_type.inner) == 0:
+                    # Leaf types are cheap to re-read, so share them through the cache
+                    inner_type = cls.from_json(json[inner_start:pos])
+                inner.append(inner_type)
+                if json.startswith(", ", pos):
+                    pos += 2
+                elif json.startswith("]", pos):
+                    pos += 1
+                    break
+                else:
+                    raise ValueError(f"Invalid type string: {json!r}")
+
+        return (
+            cls(
+                name=name,
+                namespace=namespace,
+                inner=tuple(inner),
+                reference=reference is not None,
+                generic=generic is not None,
+                nullable=nullable is not None,
+            ),
+            pos,
         )
 
     @staticmethod
@@ -436,6 +645,7 @@ class CType:
         return 0
 
 
+@slotted
 @dataclass(frozen=True)
 class CParameter:
     name: str
@@ -460,6 +670,11 @@ class CParameter:
             out=json["out"],
         )
 
+    @staticmethod
+    def sort_key_seq(params: Sequence[CParameter]) -> Tuple[int, Tuple[str, ...]]:
+        # Orders the same as CParameter.compare
+        return len(params), tuple(str(p.type) for p in params)
+
     @staticmethod
     def compare(params0: Sequence[CParameter], params1: Sequence[CParameter]) -> int:
         len0: int = len(params0)
@@ -481,14 +696,27 @@ class CParameter:
         return 0
 
 
+@slotted
 @dataclass(frozen=True)
 class CMember(ABC):
     name: str
     declaring_type: CType
 
     def __str__(self) -> str:
+        return self.full_name
+
+    @cached_slot
+    def full_name(self) -> str:
         return f"{self.declaring_type}.{self.name}"
 
+    @cached_slot
+    def sort_key(self) -> Tuple[Any, ...]:
+        return (self.name,)
+
+    @cached_slot
+    def doc_key(self) -> str:
+        return self.name
+
     @abstractmethod
     def to_json(self) -> JsonType:
         pass
@@ -498,22 +726,23 @@ class CMember(ABC):
         pass
 
 
+@slotted
 @dataclass(frozen=True)
 class CField(CMember):
     return_type: CType
     static: bool = False
 
     def __lt__(self, other: CField) -> bool:
-        return self.name < other.name
+        return self.sort_key < other.sort_key
 
     def __le__(self, other: CField) -> bool:
-        return self.name <= other.name
+        return self.sort_key <= other.sort_key
 
     def __gt__(self, other: CField) -> bool:
-        return self.name > other.name
+        return self.sort_key > other.sort_key
 
     def __ge__(self, other: CField) -> bool:
-        return self.name >= other.name
+        return self.sort_key >= other.sort_key
 
     def to_json(self) -> JsonType:
         return {
@@ -527,7 +756,7 @@ class CField(CMember):
         doc_json: Dict[str, Any] = {"doc": "", "doc_formatted": {}}
         if self.return_type is not None and self.return_type != CType("Void", "System"):
             doc_json["return"] = ""
-        return self.name, doc_json
+        return self.doc_key, doc_json
 
     @classmethod
     def from_json(cls, json: JsonType) -> CField:
@@ -539,6 +768,7 @@ class CField(CMember):
         )
 
 
+@slotted
 @dataclass(frozen=True)
 class CConstructor(CMember):
     parameters: Sequence[CParameter]
@@ -547,21 +777,30 @@ class CConstructor(CMember):
         super().__init__("__init__", declaring_type)
         object.__setattr__(self, "parameters", parameters)
 
-    def __str__(self) -> str:
-        param_types: str = ", ".join(str(p.type) for p in self.parameters)
-        return f"{self.declaring_type}.__init__({param_types})"
+    @cached_slot
+    def full_name(self) -> str:
+        return f"{self.declaring_type}.{self.doc_key}"
 
     def __lt__(self, other: CConstructor) -> bool:
-        return CParameter.compare(self.parameters, other.parameters) < 0
+        return self.sort_key < other.sort_key
 
     def __le__(self, other: CConstructor) -> bool:
-        return CParameter.compare(self.parameters, other.parameters) <= 0
+        return self.sort_key <= other.sort_key
 
     def __gt__(self, other: CConstructor) -> bool:
-        return CParameter.compare(self.parameters, other.parameters) > 0
+        return self.sort_key > other.sort_key
 
     def __ge__(self, other: CConstructor) -> bool:
-        return CParameter.compare(self.parameters, other.parameters) >= 0
+        return self.sort_key >= other.sort_key
+
+    @cached_slot
+    def sort_key(self) -> Tuple[int, Tuple[str, ...]]:
+        return CParameter.sort_key_seq(self.parameters)
+
+    @cached_slot
+    def doc_key(self) -> str:
+        param_types: str = ", ".join(str(p.type) for p in self.parameters)
+        return f"__init__({param_types})"
 
     def to_json(self) -> JsonType:
         return {
@@ -573,8 +812,7 @@ class CConstructor(CMember):
         doc_json: Dict[str, Any] = {"doc": "", "doc_formatted": {}}
         if len(self.parameters) > 0:
             doc_json["parameters"] = {p.name: "" for p in self.parameters}
-        param_types: str = ", ".join(str(p.type) for p in self.parameters)
-        return f"__init__({param_types})", doc_json
+        return self.doc_key, doc_json
 
     @classmethod
     def from_json(cls, json: JsonType) -> CConstructor:
@@ -584,6 +822,7 @@ class CConstructor(CMember):
         )
 
 
+@slotted
 @dataclass(frozen=True)
 class CProperty(CMember):
     type: CType
@@ -591,16 +830,16 @@ class CProperty(CMember):
     static: bool = False
 
     def __lt__(self, other: CProperty) -> bool:
-        return self.name < other.name
+        return self.sort_key < other.sort_key
 
     def __le__(self, other: CProperty) -> bool:
-        return self.name <= other.name
+        return self.sort_key <= other.sort_key
 
     def __gt__(self, other: CProperty) -> bool:
-        return self.name > other.name
+        return self.sort_key > other.sort_key
 
     def __ge__(self, other: CProperty) -> bool:
-        return self.name >= other.name
+        return self.sort_key >= other.sort_key
 
     def to_json(self) -> JsonType:
         return {
@@ -615,7 +854,7 @@ class CProperty(CMember):
         doc_json: Dict[str, Any] = {"doc": "", "doc_formatted": {}}
         if self.type is not None and self.type != CType("Void", "System"):
             doc_json["return"] = ""
-        return self.name, doc_json
+        return self.doc_key, doc_json
 
     @classmethod
     def from_json(cls, json: JsonType) -> CProperty:
@@ -628,35 +867,37 @@ class CProperty(CMember):
         )
 
 
+@slotted
 @dataclass(frozen=True)
 class CMethod(CMember):
     parameters: Sequence[CParameter]
     return_types: Sequence[CType]
     static: bool = False
 
-    def __str__(self) -> str:
-        param_types: str = ", ".join(str(p.type) for p in self.parameters)
-        return f"{self.declaring_type}.{self.name}({param_types})"
+    @cached_slot
+    def full_name(self) -> str:
+        return f"{self.declaring_type}.{self.doc_key}"
 
     def __lt__(self, other: CMethod) -> bool:
-        if self.name == other.name:
-            return CParameter.compare(self.parameters, other.parameters) < 0
-        return self.name < other.name
+        return self.sort_key < other.sort_key
 
     def __le__(self, other: CMethod) -> bool:
-        if self.name == other.name:
-            return CParameter.compare(self.parameters, other.parameters) <= 0
-        return self.name <= other.name
+        return self.sort_key <= other.sort_key
 
     def __gt__(self, other: CMethod) -> bool:
-        if self.name == other.name:
-            return CParameter.compare(self.parameters, other.parameters) > 0
-        return self.name > other.name
+        return self.sort_key > other.sort_key
 
     def __ge__(self, other: CMethod) -> bool:
-        if self.name == other.name:
-            return CParameter.compare(self.parameters, other.parameters) >= 0
-        return self.name >= other.name
+        return self.sort_key >= other.sort_key
+
+    @cached_slot
+    def sort_key(self) -> Tuple[str, Tuple[int, Tuple[str, ...]]]:
+        return self.name, CParameter.sort_key_seq(self.parameters)
+
+    @cached_slot
+    def doc_key(self) -> str:
+        param_types: str = ", ".join(str(p.type) for p in self.parameters)
+        return f"{self.name}({param_types})"
 
     def to_json(self) -> JsonType:
         return {
@@ -673,8 +914,7 @@ class CMethod(CMember):
             doc_json["parameters"] = {p.name: "" for p in self.parameters}
         if len(self.return_types) > 0 and self.return_types[0] != CType("Void", "System"):
             doc_json["return"] = ""
-        param_types: str = ", ".join(str(p.type) for p in self.parameters)
-        return f"{self.name}({param_types})", doc_json
+        return self.doc_key, doc_json
 
     @classmethod
     def from_json(cls, json: JsonType) -> CMethod:
@@ -687,24 +927,22 @@ class CMethod(CMember):
         )
 
 
+@slotted
 @dataclass(frozen=True)
 class CEvent(CMember):
     type: CType
 
-    def __str__(self) -> str:
-        return f"{self.declaring_type}.{self.name}"
-
     def __lt__(self, other: CProperty) -> bool:
-        return self.name < other.name
+        return self.sort_key < other.sort_key
 
     def __le__(self, other: CProperty) -> bool:
-        return self.name <= other.name
+        return self.sort_key <= other.sort_key
 
     def __gt__(self, other: CProperty) -> bool:
-        return self.name > other.name
+        return self.sort_key > other.sort_key
 
     def __ge__(self, other: CProperty) -> bool:
-        return self.name >= other.name
+        return self.sort_key >= other.sort_key
 
     def to_json(self) -> JsonType:
         return {
@@ -714,7 +952,7 @@ class CEvent(CMember):
         }
 
     def to_doc_json(self) -> Tuple[str, JsonType]:
-        return self.name, {"doc": "", "doc_formatted": {}}
+        return self.doc_key, {"doc": "", "doc_formatted": {}}
 
     @classmethod
     def from_json(cls, json: JsonType) -> CEvent:
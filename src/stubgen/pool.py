@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import multiprocessing
+import traceback
+from collections import deque
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+from multiprocessing.connection import wait
+from multiprocessing.context import BaseContext
+from multiprocessing.process import BaseProcess
+from typing import Any
+from typing import Callable
+from typing import Deque
+from typing import Final
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from stubgen.log import get_logger
+
+logger = get_logger(__name__)
+
+Task = Tuple[int, Sequence[Any]]
+
+
+class WorkerError(Exception):
+    def __init__(self, message: str, crashed: bool = False) -> None:
+        super().__init__(message)
+        self.crashed: Final[bool] = crashed
+
+
+@dataclass
+class Worker:
+    process: BaseProcess
+    connection: Connection
+    task: Optional[Task] = None
+    completed: int = 0
+
+
+def run_worker(
+    connection: Connection,
+    func: Callable[..., Any],
+    initializer: Optional[Callable[..., None]],
+    initargs: Sequence[Any],
+) -> None:
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        args: Optional[Sequence[Any]] = connection.recv()
+        if args is None:
+            break
+        try:
+            result: Any = func(*args)
+        except Exception:  # noqa
+            connection.send((False, traceback.format_exc()))
+        else:
+            connection.send((True, result))
+
+
+class WorkerPool:
+    # Unlike ProcessPoolExecutor this knows which task each worker runs, so a worker that dies
+    # only fails its own task and is replaced, and max_tasks_per_worker works before Python 3.11
+    def __init__(
+        self,
+        func: Callable[..., Any],
+        worker_count: int,
+        max_tasks_per_worker: Optional[int] = None,
+        initializer: Optional[Callable[..., None]] = None,
+        initargs: Sequence[Any] = (),
+    ) -> None:
+        self.func: Final[Callable[..., Any]] = func
+        self.worker_count: Final[int] = max(1, worker_count)
+        self.max_tasks_per_worker: Final[Optional[int]] = max_tasks_per_worker
+        self.initializer: Final[Optional[Callable[..., None]]] = initializer
+        self.initargs: Final[Sequence[Any]] = initargs
+        # Workers must not inherit the parent's runtime state, such as a loaded CLR
+        self.context: Final[BaseContext] = multiprocessing.get_context("spawn")
+        self.started: int = 0
+
+    def start_worker(self) -> Worker:
+        parent, child = self.context.Pipe()
+        process: BaseProcess = self.context.Process(
+            target=run_worker,
+            args=(child, self.func, self.initializer, self.initargs),
+            name=f"Worker-{self.started}",
+            daemon=True,
+        )
+        process.start()
+        child.close()
+        self.started += 1
+        logger.debug("Started worker: %s", process.name)
+        return Worker(process=process, connection=parent)
+
+    @staticmethod
+    def stop_worker(worker: Worker) -> None:
+        try:
+            worker.connection.send(None)
+        except OSError:
+            pass
+        worker.process.join(timeout=5)
+        if worker.process.is_alive():
+            worker.process.terminate()
+            worker.process.join()
+        worker.connection.close()
+        logger.debug("Stopped worker: %s", worker.process.name)
+
+    def imap_unordered(self, tasks: Iterable[Sequence[Any]]) -> Iterator[Tuple[int, Any]]:
+        # Yields (task index, result), failed tasks yield a WorkerError as their result
+        pending: Deque[Task] = deque(enumerate(tasks))
+        workers: List[Worker] = []
+        try:
+            while pending or any(w.task is not None for w in workers):
+                while pending and len(workers) < self.worker_count:
+                    workers.append(self.start_worker())
+                worker: Worker
+                for worker in tuple(workers):
+                    if worker.task is None and pending:
+                        try:
+                            worker.connection.send(pending[0][1])
+                        except OSError:
+                            # Died while idle, the task is given to its replacement
+                            workers.remove(worker)
+                            worker.connection.close()
+                            continue
+                        worker.task = pending.popleft()
+
+                busy: Sequence[Worker] = tuple(w for w in workers if w.task is not None)
+                if not busy:
+                    continue
+                ready: List[Any] = wait(
+                    [w.connection for w in busy] + [w.process.sentinel for w in busy]
+                )
+                for worker in busy:
+                    index: int = worker.task[0]
+                    if worker.connection in ready:
+                        try:
+                            success, value = worker.connection.recv()
+                        except EOFError:
+                            success, value = None, None
+                        if success is not None:
+                            worker.task = None
+                            worker.completed += 1
+                            yield index, value if success else WorkerError(value)
+                            if (
+                                self.max_tasks_per_worker is not None
+                                and worker.completed >= self.max_tasks_per_worker
+                            ):
+                                workers.remove(worker)
+                                self.stop_worker(worker)
+                            continue
+                    if worker.connection in ready or worker.process.sentinel in ready:
+                        worker.process.join()
+                        exit_code: Optional[int] = worker.process.exitcode
+                        logger.warning(
+                            "Worker %s crashed with exit code %s",
+                            worker.process.name,
+                            exit_code,
+                        )
+                        workers.remove(worker)
+                        worker.connection.close()
+                        yield index, WorkerError(
+                            f"Worker crashed with exit code {exit_code}", crashed=True
+                        )
+        finally:
+            for worker in workers:
+                if worker.task is None:
+                    self.stop_worker(worker)
+                else:
+                    worker.process.terminate()
+                    worker.process.join()
+                    worker.connection.close()
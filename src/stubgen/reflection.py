@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from abc import ABC
+from abc import abstractmethod
+from collections import defaultdict
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import Final
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+
+from stubgen.log import get_logger
+
+logger = get_logger(__name__)
+
+# Member kinds in the partitions returned by Reflection.get_members, the names of MemberTypes
+MEMBER_KINDS: Final[Sequence[str]] = (
+    "Constructor",
+    "Event",
+    "Field",
+    "Method",
+    "Property",
+    "NestedType",
+)
+
+MemberPartitions = Mapping[str, Sequence[Any]]
+
+
+class Reflection(ABC):
+    # Everything the extractor asks the runtime, apart from attributes and methods of the
+    # assembly, type and member objects these return
+
+    @abstractmethod
+    def load_assembly(self, assembly_name: str) -> Any:
+        pass
+
+    @abstractmethod
+    def get_types(self, assembly: Any) -> Sequence[Any]:
+        pass
+
+    @abstractmethod
+    def get_source(self, assembly: Any) -> Optional[Path]:
+        pass
+
+    @abstractmethod
+    def get_members(self, info: Any, static: bool, declared_only: bool) -> MemberPartitions:
+        pass
+
+    @abstractmethod
+    def get_nullable_type(self, info: Any) -> Any:
+        pass
+
+    @abstractmethod
+    def is_delegate(self, info: Any) -> bool:
+        pass
+
+
+class ClrReflection(Reflection):
+    def __init__(self) -> None:
+        import clr
+        from System import Delegate
+        from System import MulticastDelegate
+        from System import Nullable
+        from System.Reflection import BindingFlags
+        from System.Reflection import MemberTypes
+        from System.Reflection import ReflectionTypeLoadException
+
+        self.clr: Final[Any] = clr
+        self.delegates: Final[Sequence[Any]] = (Delegate, MulticastDelegate)
+        self.nullable: Final[Any] = Nullable
+        self.binding_flags: Final[Any] = BindingFlags
+        self.kinds: Final[Mapping[Any, str]] = {getattr(MemberTypes, k): k for k in MEMBER_KINDS}
+        self.load_exception: Final[Any] = ReflectionTypeLoadException
+
+    def load_assembly(self, assembly_name: str) -> Any:
+        return self.clr.AddReference(assembly_name)
+
+    def get_types(self, assembly: Any) -> Sequence[Any]:
+        try:
+            return tuple(assembly.GetTypes())
+        except self.load_exception as e:
+            logger.warning(f"Some types in {assembly.GetName().Name} could not be loaded")
+            for ex in e.LoaderExceptions:
+                if ex:
+                    logger.debug(f"Loader exception: {str(ex)}")
+            return tuple(t for t in e.Types if t is not None)
+
+    def get_source(self, assembly: Any) -> Optional[Path]:
+        # Dynamic assemblies have no location
+        return Path(assembly.Location) if assembly.Location else None
+
+    def get_members(self, info: Any, static: bool, declared_only: bool) -> MemberPartitions:
+        binding_flags: Any = self.binding_flags.Public | self.binding_flags.Instance
+        if static:
+            binding_flags |= self.binding_flags.Static
+        if declared_only:
+            binding_flags |= self.binding_flags.DeclaredOnly
+
+        # A single call into the runtime per type instead of one per member kind
+        partitions: Dict[str, List[Any]] = defaultdict(list)
+        member: Any
+        for member in info.GetMembers(binding_flags):
+            kind: Optional[str] = self.kinds.get(member.MemberType)
+            if kind is not None:
+                partitions[kind].append(member)
+        return partitions
+
+    def get_nullable_type(self, info: Any) -> Any:
+        return self.nullable.GetUnderlyingType(info)
+
+    def is_delegate(self, info: Any) -> bool:
+        if info in self.delegates:
+            return False
+        return any(info.IsSubclassOf(d) for d in self.delegates)
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import ast
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict
+from typing import Final
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+
+import stubgen
+from stubgen.log import get_logger
+from stubgen.model import JsonType
+
+logger = get_logger(__name__)
+
+# clr.AddReference of pythonnet and the variants IronPython adds
+ADD_REFERENCE_NAMES: Final[Sequence[str]] = (
+    "AddReference",
+    "AddReferenceByName",
+    "AddReferenceByPartialName",
+    "AddReferenceToFile",
+    "AddReferenceToFileAndPath",
+)
+
+ASSEMBLY_SUFFIXES: Final[Sequence[str]] = (".dll", ".exe")
+
+ParseResult = Tuple[Optional[Sequence[str]], Optional[str]]
+
+
+def parse_script(path: str) -> ParseResult:
+    # Returns the references or the reason the script could not be parsed
+    try:
+        with open(path, "rb") as file:
+            tree: ast.AST = ast.parse(file.read(), filename=path)
+    except (OSError, SyntaxError, ValueError) as e:
+        return None, str(e)
+
+    references: List[str] = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        if isinstance(node.func, ast.Attribute):
+            name: str = node.func.attr
+        elif isinstance(node.func, ast.Name):
+            name = node.func.id
+        else:
+            continue
+        if name not in ADD_REFERENCE_NAMES:
+            continue
+        for arg in node.args:
+            if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+                references.append(arg.value)
+    return references, None
+
+
+def find_scripts(script_roots: Iterable[Path]) -> Sequence[Path]:
+    scripts: Dict[Path, None] = {}
+    for root in script_roots:
+        if root.is_file():
+            scripts[root.resolve()] = None
+            continue
+        for path in sorted(root.rglob("*.py")):
+            scripts[path.resolve()] = None
+    return tuple(scripts)
+
+
+class ScanCache:
+    file_name: Final[str] = "scan_cache.json"
+
+    def __init__(self, file: Optional[Path]) -> None:
+        self.file: Final[Optional[Path]] = file
+        self.entries: Final[Dict[str, JsonType]] = {}
+
+        if file is not None and file.exists():
+            try:
+                with file.open("r") as f:
+                    data: JsonType = json.load(f)
+                if data["stubgen_version"] == stubgen.__version__:
+                    self.entries.update(data["scripts"])
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning("Ignoring invalid scan cache %r: %s", str(file), e)
+
+    def get(self, path: Path, stat: os.stat_result) -> Optional[Sequence[str]]:
+        entry: Optional[JsonType] = self.entries.get(str(path))
+        if entry is None or entry["mtime"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+            return None
+        return entry["references"]
+
+    def update(self, path: Path, stat: os.stat_result, references: Sequence[str]) -> None:
+        self.entries[str(path)] = {
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "references": list(references),
+        }
+
+    def save(self, paths: Iterable[Path]) -> None:
+        if self.file is None:
+            return
+        # Scripts under other roots are kept for the scans of those roots, only scripts that were
+        # removed since they were scanned are dropped
+        scanned: Set[str] = set(map(str, paths))
+        keys: Sequence[str] = sorted(k for k in self.entries if k in scanned or os.path.isfile(k))
+        data: JsonType = {
+            "stubgen_version": stubgen.__version__,
+            "scripts": {k: self.entries[k] for k in keys},
+        }
+        temp_file: Path = self.file.with_suffix(".tmp")
+        with temp_file.open("w") as file:
+            json.dump(data, file, indent=2)
+        temp_file.replace(self.file)
+
+
+def scan_scripts(
+    scripts: Sequence[Path], cache: ScanCache, process_count: Optional[int] = None
+) -> Sequence[str]:
+    references: Dict[Path, Sequence[str]] = {}
+    changed: List[Tuple[Path, os.stat_result]] = []
+    for path in scripts:
+        try:
+            stat: os.stat_result = path.stat()
+        except OSError as e:
+            logger.error(f"Unable to read script: {path}: {str(e)}")
+            continue
+        cached: Optional[Sequence[str]] = cache.get(path, stat)
+        if cached is None:
+            changed.append((path, stat))
+        else:
+            references[path] = cached
+    logger.info("Parsing %d of %d scripts", len(changed), len(scripts))
+
+    names: Sequence[str] = tuple(str(path) for path, _ in changed)
+    results: Sequence[ParseResult]
+    if process_count == 1 or len(names) < 2:
+        results = tuple(map(parse_script, names))
+    else:
+        worker_count: int = process_count or os.cpu_count() or 1
+        with ProcessPoolExecutor(worker_count) as executor:
+            results = tuple(
+                executor.map(
+                    parse_script, names, chunksize=max(1, len(names) // (worker_count * 4))
+                )
+            )
+
+    for (path, stat), (found, error) in zip(changed, results):
+        if found is None:
+            # Not cached, so it is parsed again once it is fixed
+            logger.error(f"Unable to read script: {path}: {error}")
+            continue
+        cache.update(path, stat, found)
+        references[path] = found
+    cache.save(scripts)
+
+    # In the order of the scripts, so the reference list does not change between runs
+    all_references: Dict[str, None] = {}
+    for path in scripts:
+        for reference in references.get(path, ()):
+            logger.debug(f"Found DLL reference: {reference}")
+            all_references[reference] = None
+    return tuple(all_references)
+
+
+def resolve_reference(reference: str, dll_dirs: Sequence[Path]) -> str:
+    file_name: str = reference
+    if Path(reference).suffix.lower() not in ASSEMBLY_SUFFIXES:
+        file_name = f"{reference}.dll"
+    for directory in dll_dirs:
+        path: Path = directory / file_name
+        if path.is_file():
+            logger.debug(f"Found DLL path: {path}")
+            return str(path.resolve())
+    # Left to the CLR, which also looks in the GAC and on sys.path
+    logger.debug(f"Unable to find DLL in the DLL directories: {reference}")
+    return reference
+
+
+def find_dll_references(
+    script_roots: Sequence[Path],
+    dll_dirs: Sequence[Path] = (),
+    cache_file: Optional[Path] = None,
+    process_count: Optional[int] = None,
+) -> Sequence[str]:
+    scripts: Sequence[Path] = find_scripts(script_roots)
+    references: Sequence[str] = scan_scripts(scripts, ScanCache(cache_file), process_count)
+    resolved: Dict[str, None] = dict.fromkeys(resolve_reference(r, dll_dirs) for r in references)
+    logger.info("Found %d references in %d scripts", len(resolved), len(scripts))
+    return tuple(resolved)
+
+
+def write_references(path: Path, references: Sequence[str]) -> None:
+    logger.debug("Saving references to file: %r", str(path))
+    with path.open("w") as file:
+        file.writelines(f"{reference}\n" for reference in references)
+
+
+def read_references(path: Path) -> Sequence[str]:
+    # One assembly name or path per line, blank lines and # comments are skipped
+    references: List[str] = []
+    with path.open("r") as file:
+        for line in file:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                references.append(line)
+    return references
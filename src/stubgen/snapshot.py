@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import functools
+import gzip
+import json
+from pathlib import Path
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Final
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+
+from stubgen.log import get_logger
+from stubgen.model import JsonType
+from stubgen.reflection import MemberPartitions
+from stubgen.reflection import Reflection
+
+logger = get_logger(__name__)
+
+# A snapshot holds every answer the extractor got from reflection while extracting one assembly,
+# so the extraction can be replayed without a CLR. Objects are numbered in the order they were
+# first seen, the first entry stands for the Reflection itself. Each entry maps attribute names
+# to values and method names to the values returned for each argument list. Values are JSON
+# with {"$": n} for object n, {"%": {...}} for a mapping and {"!": message} for an exception.
+
+FORMAT: Final[int] = 1
+
+Entry = Dict[str, Dict[str, Any]]
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class RecordedError(Exception):
+    pass
+
+
+def new_entry() -> Entry:
+    return {"a": {}, "c": {}}
+
+
+def args_key(args: Sequence[JsonType]) -> str:
+    return json.dumps(args, separators=(",", ":"))
+
+
+class RecordedObject:
+    __slots__ = ("recorder", "target", "index")
+
+    def __init__(self, recorder: RecordingReflection, target: Any, index: int) -> None:
+        self.recorder: Final[RecordingReflection] = recorder
+        self.target: Final[Any] = target
+        self.index: Final[int] = index
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__"):
+            raise AttributeError(name)
+        attributes: Dict[str, Any] = self.recorder.entries[self.index]["a"]
+        try:
+            value: Any = getattr(self.target, name)
+        except Exception as e:
+            attributes[name] = {"!": str(e)}
+            raise
+        if callable(value):
+            return functools.partial(self.recorder.record, self.index, name, value)
+        wrapped: Any = self.recorder.wrap(value)
+        attributes[name] = self.recorder.encode(wrapped)
+        return wrapped
+
+    def __repr__(self) -> str:
+        return f"RecordedObject({self.index}, {self.target!r})"
+
+
+class RecordingReflection(Reflection):
+    def __init__(self, inner: Reflection) -> None:
+        self.inner: Final[Reflection] = inner
+        self.entries: Final[List[Entry]] = [new_entry()]
+        self.objects: Final[Dict[Any, RecordedObject]] = {}
+
+    def wrap(self, value: Any) -> Any:
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        if isinstance(value, RecordedObject):
+            return value
+        if isinstance(value, Mapping):
+            return {k: self.wrap(v) for k, v in value.items()}
+        # Lists, tuples and .NET arrays
+        if hasattr(value, "__len__") and hasattr(value, "__iter__"):
+            return tuple(self.wrap(v) for v in value)
+        obj: Optional[RecordedObject] = self.objects.get(value)
+        if obj is None:
+            obj = RecordedObject(self, value, len(self.entries))
+            self.entries.append(new_entry())
+            self.objects[value] = obj
+        return obj
+
+    def encode(self, value: Any) -> JsonType:
+        if isinstance(value, RecordedObject):
+            return {"$": value.index}
+        if isinstance(value, Mapping):
+            return {"%": {k: self.encode(v) for k, v in value.items()}}
+        if isinstance(value, tuple):
+            return [self.encode(v) for v in value]
+        return value
+
+    def record(self, index: int, name: str, func: Callable[..., Any], *args: Any) -> Any:
+        calls: Dict[str, Any] = self.entries[index]["c"].setdefault(name, {})
+        key: str = args_key([self.encode(a) for a in args])
+        try:
+            value: Any = func(*(a.target if isinstance(a, RecordedObject) else a for a in args))
+        except Exception as e:
+            calls[key] = {"!": str(e)}
+            raise
+        wrapped: Any = self.wrap(value)
+        calls[key] = self.encode(wrapped)
+        return wrapped
+
+    def record_on(
+        self, obj: RecordedObject, name: str, func: Callable[..., Any], *args: Any
+    ) -> Any:
+        # Questions asked through the Reflection are stored with the object they are about
+        return self.record(obj.index, f"@{name}", lambda *a: func(obj.target, *a), *args)
+
+    def load_assembly(self, assembly_name: str) -> Any:
+        return self.record(0, "@load_assembly", self.inner.load_assembly, assembly_name)
+
+    def get_types(self, assembly: RecordedObject) -> Sequence[Any]:
+        return self.record_on(assembly, "get_types", self.inner.get_types)
+
+    def get_source(self, assembly: RecordedObject) -> Optional[Path]:
+        return self.inner.get_source(assembly.target)
+
+    def get_members(
+        self, info: RecordedObject, static: bool, declared_only: bool
+    ) -> MemberPartitions:
+        return self.record_on(info, "get_members", self.inner.get_members, static, declared_only)
+
+    def get_nullable_type(self, info: RecordedObject) -> Any:
+        return self.record_on(info, "get_nullable_type", self.inner.get_nullable_type)
+
+    def is_delegate(self, info: RecordedObject) -> bool:
+        return self.record_on(info, "is_delegate", self.inner.is_delegate)
+
+    def save(self, path: Path) -> None:
+        logger.debug("Saving reflection snapshot: %r", str(path))
+        entries: List[Entry] = [{k: v for k, v in e.items() if v} for e in self.entries]
+        with gzip.open(path, "wt") as file:
+            json.dump({"format": FORMAT, "objects": entries}, file, separators=(",", ":"))
+
+
+class ReplayedObject:
+    __slots__ = ("snapshot", "index")
+
+    def __init__(self, snapshot: Snapshot, index: int) -> None:
+        self.snapshot: Final[Snapshot] = snapshot
+        self.index: Final[int] = index
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__"):
+            raise AttributeError(name)
+        entry: Entry = self.snapshot.entries[self.index]
+        attributes: Dict[str, Any] = entry.get("a", {})
+        if name in attributes:
+            return self.snapshot.decode(attributes[name])
+        if name in entry.get("c", {}):
+            return functools.partial(self.snapshot.answer, self.index, name)
+        raise SnapshotError(f"{self.snapshot.path} has no answer for {name} of object {self.index}")
+
+    def __repr__(self) -> str:
+        return f"ReplayedObject({self.index})"
+
+
+class Snapshot:
+    def __init__(self, path: Path, entries: Sequence[Entry]) -> None:
+        self.path: Final[Path] = path
+        self.entries: Final[Sequence[Entry]] = entries
+        # One object per entry, so they compare and hash like the reflection objects did
+        self.objects: Final[Dict[int, ReplayedObject]] = {}
+
+    @classmethod
+    def load(cls, path: Path) -> Snapshot:
+        logger.debug("Loading reflection snapshot: %r", str(path))
+        try:
+            with gzip.open(path, "rt") as file:
+                data: JsonType = json.load(file)
+        except (OSError, ValueError) as e:
+            raise SnapshotError(f"Unable to read snapshot {path}: {e}") from None
+        if data.get("format") != FORMAT:
+            raise SnapshotError(f"Unsupported snapshot format in {path}: {data.get('format')}")
+        return cls(path, data["objects"])
+
+    def decode(self, value: JsonType) -> Any:
+        if isinstance(value, list):
+            return tuple(self.decode(v) for v in value)
+        if isinstance(value, dict):
+            if "$" in value:
+                index: int = value["$"]
+                obj: Optional[ReplayedObject] = self.objects.get(index)
+                if obj is None:
+                    obj = self.objects[index] = ReplayedObject(self, index)
+                return obj
+            if "%" in value:
+                return {k: self.decode(v) for k, v in value["%"].items()}
+            raise RecordedError(value["!"])
+        return value
+
+    def answer(self, index: int, name: str, *args: Any) -> Any:
+        key: str = args_key([{"$": a.index} if isinstance(a, ReplayedObject) else a for a in args])
+        try:
+            value: JsonType = self.entries[index]["c"][name][key]
+        except KeyError:
+            raise SnapshotError(
+                f"{self.path} has no answer for {name}{tuple(args)} of object {index}"
+            ) from None
+        return self.decode(value)
+
+
+class ReplayReflection(Reflection):
+    # Assemblies are loaded from snapshot files instead of by name
+
+    def load_assembly(self, assembly_name: str) -> Any:
+        snapshot: Snapshot = Snapshot.load(Path(assembly_name))
+        answers: Mapping[str, JsonType] = snapshot.entries[0].get("c", {}).get("@load_assembly")
+        if not answers:
+            raise SnapshotError(f"No assembly was loaded in snapshot {assembly_name}")
+        return snapshot.decode(next(iter(answers.values())))
+
+    def get_types(self, assembly: ReplayedObject) -> Sequence[Any]:
+        return assembly.snapshot.answer(assembly.index, "@get_types")
+
+    def get_source(self, assembly: ReplayedObject) -> Optional[Path]:
+        return assembly.snapshot.path
+
+    def get_members(
+        self, info: ReplayedObject, static: bool, declared_only: bool
+    ) -> MemberPartitions:
+        return info.snapshot.answer(info.index, "@get_members", static, declared_only)
+
+    def get_nullable_type(self, info: ReplayedObject) -> Any:
+        return info.snapshot.answer(info.index, "@get_nullable_type")
+
+    def is_delegate(self, info: ReplayedObject) -> bool:
+        return info.snapshot.answer(info.index, "@is_delegate")
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import functools
+import time
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import TypeVar
+
+from stubgen.build_stubs import Doc
+from stubgen.build_stubs import merge_all
+from stubgen.build_stubs import merge_classes
+from stubgen.build_stubs import merge_mappings
+from stubgen.build_stubs import merge_method
+from stubgen.model import CClass
+from stubgen.model import CMethod
+from stubgen.model import CParameter
+from stubgen.model import CType
+
+T = TypeVar("T")
+
+
+def time_call(name: str, func: Callable[[], Any], repeat: int = 3) -> float:
+    best: float = float("inf")
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    print(f"{name}: {best:.4f} sec")
+    return best
+
+
+def make_doc_tree(namespace_count: int, type_count: int, member_count: int) -> Dict[str, Any]:
+    tree: Dict[str, Any] = {"doc": ""}
+    for n in range(namespace_count):
+        namespace: Dict[str, Any] = {"doc": ""}
+        for t in range(type_count):
+            type_doc: Dict[str, Any] = {"doc": "", "doc_formatted": {}}
+            for m in range(member_count):
+                type_doc[f"Property{m}"] = {"doc": "", "doc_formatted": {}, "return": ""}
+                type_doc[f"Method{m}(System:Int32, System:String)"] = {
+                    "doc": "",
+                    "doc_formatted": {},
+                    "exceptions": {},
+                    "parameters": {"a": "", "b": ""},
+                }
+                type_doc[f"Method{m}($T)"] = {"doc": "", "doc_formatted": {}, "exceptions": {}}
+            namespace[f"Type{t}"] = type_doc
+            namespace[f"Generic{t}[$TKey, $TValue]"] = dict(type_doc)
+        tree[f"Namespace{n}"] = namespace
+    return {"System": tree}
+
+
+def make_lookups(namespace_count: int, type_count: int, member_count: int) -> Sequence[str]:
+    lookups: List[str] = []
+    for n in range(namespace_count):
+        namespace: str = f"System.Namespace{n}"
+        for t in range(type_count):
+            for type_name in (f"Type{t}", f"Generic{t}[System:Int32, System:String]"):
+                type_str: str = f"{namespace}:{type_name}"
+                lookups.append(type_str)
+                for m in range(member_count):
+                    lookups.append(f"{type_str}.Property{m}")
+                    lookups.append(f"{type_str}.Method{m}(System:Int32, System:String)")
+                    lookups.append(f"{type_str}.Method{m}(System:Double)")
+                    lookups.append(f"{type_str}.Missing{m}")
+    return lookups
+
+
+def legacy_split_node_str(node_str: str) -> Tuple[str, Optional[str]]:
+    result: List[str] = []
+    i: int = 0
+    n: int = len(node_str)
+    bracket_count: int = 0
+    while i < n:
+        c: str = node_str[i]
+        i = i + 1
+        if c in (".", ":") and bracket_count == 0:
+            return "".join(result), "".join(node_str[i:])
+        if c in ("[", "("):
+            bracket_count += 1
+        elif c in ("]", ")"):
+            bracket_count -= 1
+        result.append(c)
+    return "".join(result), None
+
+
+def legacy_get(data: Any, node_str: str) -> Optional[Any]:
+    # Linear wildcard scan used by Doc.get before the doc index
+    search: Optional[str] = node_str
+    while True:
+        if search in data:
+            return data[search]
+        node, search = legacy_split_node_str(search)
+        key: Optional[str] = Doc.scan(data, node)
+        if key is None:
+            return None
+        data = data[key]
+        if search is None:
+            return data
+
+
+def benchmark_doc_get() -> None:
+    tree: Dict[str, Any] = make_doc_tree(namespace_count=10, type_count=50, member_count=20)
+    lookups: Sequence[str] = make_lookups(namespace_count=10, type_count=50, member_count=20)
+    print(f"Doc.get: {len(lookups)} lookups")
+
+    def run_legacy() -> None:
+        for lookup in lookups:
+            legacy_get(tree, lookup)
+
+    def run_indexed() -> None:
+        doc: Doc = Doc(tree)
+        for lookup in lookups:
+            doc.get(lookup)
+
+    for lookup in lookups:
+        node: Optional[Doc] = Doc(tree).get(lookup)
+        assert legacy_get(tree, lookup) == (None if node is None else node.data), lookup
+
+    legacy: float = time_call("  linear scan", run_legacy)
+    indexed: float = time_call("  indexed", run_indexed)
+    print(f"  speedup: {legacy / indexed:.1f}x")
+
+
+def legacy_merge_mappings(
+    mappings: Sequence[Mapping[str, T]],
+    merge_func: Callable[[Sequence[T], bool], T],
+    should_raise: bool = True,
+) -> Mapping[str, T]:
+    # Collects the versions of each key, then sorts all of them by key, as before the run merge
+    contributions: Dict[str, List[T]] = {}
+    for mapping in mappings:
+        for key, obj in mapping.items():
+            found: Optional[List[T]] = contributions.get(key)
+            if found is None:
+                contributions[key] = [obj]
+            else:
+                found.append(obj)
+
+    return {
+        key: objs[0] if len(objs) == 1 else merge_func(objs, should_raise)
+        for key, objs in sorted(contributions.items(), key=lambda item: item[0])
+    }
+
+
+def make_class(method_count: int, skip: int) -> CClass:
+    # About the size of System.Windows.Forms.Control, every skip-th method left out
+    declaring_type: CType = CType(name="Control", namespace="System.Windows.Forms")
+    methods: List[CMethod] = []
+    for m in range(method_count):
+        if skip and m % skip == 0:
+            continue
+        parameters: Sequence[CParameter] = tuple(
+            CParameter(name=f"arg{p}", type=CType(name="Int32", namespace="System"))
+            for p in range(m % 4)
+        )
+        methods.append(
+            CMethod(
+                name=f"Method{m}",
+                declaring_type=declaring_type,
+                parameters=parameters,
+                return_types=(CType(name="Void", namespace="System"),),
+                static=False,
+            )
+        )
+    return CClass(
+        name="Control",
+        namespace="System.Windows.Forms",
+        nested=None,
+        abstract=False,
+        generic_args=(),
+        super_class=CType(name="Component", namespace="System.ComponentModel"),
+        interfaces=(),
+        fields={},
+        constructors={},
+        properties={},
+        methods={str(m): m for m in sorted(methods, key=str)},
+        events={},
+        nested_types={},
+    )
+
+
+def benchmark_merge_mappings() -> None:
+    full: CClass = make_class(method_count=2000, skip=0)
+    # Versions that each leave out different methods
+    versions: Sequence[CClass] = (full, *(make_class(2000, skip) for skip in (7, 11, 13)))
+
+    def keep_first(methods: Sequence[CMethod], should_raise: bool) -> CMethod:
+        return methods[0]
+
+    merge_methods: Callable[[Sequence[CMethod], bool], CMethod] = functools.partial(
+        merge_all, merge_func=merge_method
+    )
+
+    repeat: int = 20
+    # The member merges take most of the time, keep_first leaves only the work on the keys
+    for merge_name, merge_func in (("keys", keep_first), ("merge_method", merge_methods)):
+        for keys_name, classes in (
+            ("2 same", (full, full)),
+            ("2 different", versions[:2]),
+            ("8 same", (full,) * 8),
+            ("4 different", versions),
+            ("2 unsorted", versions[:2]),
+        ):
+            mappings: Sequence[Mapping[str, CMethod]] = tuple(c.methods for c in classes)
+            if keys_name.endswith("unsorted"):
+                # Takes the sorting fallback of the merge
+                mappings = tuple(dict(reversed(m.items())) for m in mappings)
+            expected: Mapping[str, CMethod] = legacy_merge_mappings(mappings, merge_func)
+            merged: Mapping[str, CMethod] = merge_mappings(mappings, merge_func)
+            assert list(expected.items()) == list(merged.items())
+
+            def run(func: Callable[..., Mapping[str, CMethod]]) -> None:
+                for _ in range(repeat):
+                    func(mappings, merge_func)
+
+            name: str = f"{merge_name}, {keys_name} keys"
+            print(f"merge_mappings: {name}")
+            legacy: float = time_call("  sort all keys", lambda: run(legacy_merge_mappings))
+            runs: float = time_call("  merge sorted runs", lambda: run(merge_mappings))
+            print(f"  speedup: {legacy / runs:.1f}x")
+
+    time_call("merge_classes", lambda: merge_classes(versions))
+
+
+def main() -> None:
+    benchmark_doc_get()
+    benchmark_merge_mappings()
+
+
+if __name__ == "__main__":
+    main()
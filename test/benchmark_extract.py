@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Sequence
+
+from stubgen.extract_stubs import extract_assembly
+from stubgen.log import console_handler
+
+# Replays reflection snapshots recorded with `extract --record-dir`, so the extractor can be
+# timed without a CLR, e.g. python benchmark_extract.py ../snapshots/*_snapshot.json.gz
+
+
+def time_replay(snapshot: Path, repeat: int = 3) -> float:
+    best: float = float("inf")
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as output_dir:
+            start: float = time.perf_counter()
+            extract_assembly(str(snapshot), Path(output_dir), overwrite=True, replay=True)
+            best = min(best, time.perf_counter() - start)
+    print(f"{snapshot.name}: {best:.4f} sec")
+    return best
+
+
+def main(snapshots: Sequence[Path]) -> None:
+    console_handler.setLevel(logging.WARNING)
+    total: float = sum(time_replay(snapshot) for snapshot in snapshots)
+    print(f"total: {total:.4f} sec")
+
+
+if __name__ == "__main__":
+    main(tuple(map(Path, sys.argv[1:])))
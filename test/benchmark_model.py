@@ -0,0 +1,392 @@
+from __future__ import annotations
+
+import dataclasses
+import functools
+import json
+import random
+import re
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from stubgen.model import CClass
+from stubgen.model import CConstructor
+from stubgen.model import CField
+from stubgen.model import CMethod
+from stubgen.model import CNamespace
+from stubgen.model import CParameter
+from stubgen.model import CProperty
+from stubgen.model import CType
+from stubgen.model import by_sort_key
+
+TYPES: Sequence[CType] = (
+    CType(name="Int32", namespace="System"),
+    CType(name="String", namespace="System"),
+    CType(name="Object", namespace="System"),
+    CType(name="Boolean", namespace="System"),
+    CType(name="Int32", namespace="System", reference=True, nullable=True),
+    CType(
+        name="Dictionary",
+        namespace="System.Collections.Generic",
+        inner=(CType(name="String", namespace="System"), CType(name="Object", namespace="System")),
+    ),
+    CType(
+        name="List", namespace="System.Collections.Generic", inner=(CType(name="T", generic=True),)
+    ),
+)
+
+
+def make_class(namespace: str, index: int, member_count: int) -> CClass:
+    declaring_type: CType = CType(name=f"Type{index}", namespace=namespace)
+    object_type: CType = CType(name="Object", namespace="System")
+
+    fields: Dict[str, CField] = {}
+    properties: Dict[str, CProperty] = {}
+    methods: Dict[str, CMethod] = {}
+    for m in range(member_count):
+        return_type: CType = TYPES[m % len(TYPES)]
+        parameters: Sequence[CParameter] = tuple(
+            CParameter(name=f"param{p}", type=TYPES[(m + p) % len(TYPES)]) for p in range(m % 4)
+        )
+        field: CField = CField(
+            name=f"Field{m}", declaring_type=declaring_type, return_type=return_type
+        )
+        fields[str(field)] = field
+        prop: CProperty = CProperty(
+            name=f"Property{m}", declaring_type=declaring_type, type=return_type
+        )
+        properties[str(prop)] = prop
+        for owner in (declaring_type, object_type):
+            method: CMethod = CMethod(
+                name=f"Method{m}",
+                declaring_type=owner,
+                parameters=parameters,
+                return_types=(return_type,),
+            )
+            methods[str(method)] = method
+    constructor: CConstructor = CConstructor(declaring_type=declaring_type, parameters=())
+
+    return CClass(
+        name=f"Type{index}",
+        namespace=namespace,
+        nested=None,
+        abstract=False,
+        generic_args=(),
+        super_class=object_type,
+        interfaces=(TYPES[5], TYPES[6]),
+        fields=fields,
+        constructors={str(constructor): constructor},
+        properties=properties,
+        methods=methods,
+        events={},
+        nested_types={},
+    )
+
+
+def make_skeleton(namespace_count: int, type_count: int, member_count: int) -> Dict[str, Any]:
+    namespaces: Dict[str, Any] = {}
+    for n in range(namespace_count):
+        name: str = f"System.Namespace{n}"
+        types: Dict[str, Any] = {}
+        for t in range(type_count):
+            type_def: CClass = make_class(name, t, member_count)
+            types[str(type_def)] = type_def
+        namespaces[name] = CNamespace(name=name, types=types).to_json()
+    # Round trip through json so the skeleton matches what is loaded from disk
+    return json.loads(
+        json.dumps({"name": "Synthetic", "version": "1.0.0.0", "namespaces": namespaces})
+    )
+
+
+@contextmanager
+def uncached_ctype() -> Iterator[None]:
+    cached: classmethod = CType.__dict__["from_json"]
+    CType.from_json = classmethod(cached.__func__.__wrapped__)
+    try:
+        yield
+    finally:
+        CType.from_json = cached
+
+
+def measure(func: Callable[[], Any], repeat: int = 3) -> Tuple[float, int]:
+    best: float = float("inf")
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    result: Any = func()
+    size: int = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return best, size
+
+
+def load_namespaces(skeleton: Dict[str, Any]) -> Sequence[CNamespace]:
+    return tuple(CNamespace.from_json(n) for n in skeleton["namespaces"].values())
+
+
+def benchmark_ctype_interning() -> None:
+    skeleton: Dict[str, Any] = make_skeleton(namespace_count=10, type_count=50, member_count=40)
+    print("CNamespace.from_json: 500 types")
+
+    with uncached_ctype():
+        plain_time, plain_size = measure(lambda: load_namespaces(skeleton))
+    print(f"  uncached: {plain_time:.4f} sec, {plain_size / 2 ** 20:.1f} MiB retained")
+
+    CType.from_json.cache_clear()
+    interned_time, interned_size = measure(lambda: load_namespaces(skeleton))
+    print(f"  interned: {interned_time:.4f} sec, {interned_size / 2 ** 20:.1f} MiB retained")
+    print(f"  {CType.from_json.cache_info()}")
+
+
+def collect_type_strings(json_value: Any, found: List[str]) -> None:
+    if isinstance(json_value, dict):
+        for value in json_value.values():
+            collect_type_strings(value, found)
+    elif isinstance(json_value, list):
+        for value in json_value:
+            collect_type_strings(value, found)
+    elif isinstance(json_value, str) and (":" in json_value or json_value.startswith("$")):
+        found.append(json_value)
+
+
+def legacy_from_json(json: Optional[str]) -> Optional[CType]:
+    # Regex parser used by CType.from_json before the hand-written parser
+    if json is None:
+        return None
+    match: re.Match = re.match(r"(?:(\w+(?:\.\w+)*):)?(\$?\*?\w+(?:\.\w+)*\??)(?:\[(.*)])?", json)
+    name: str = match.group(2)
+    inner: Sequence[CType] = tuple()
+    if (inner_str := match.group(3)) is not None:
+        inner = tuple(map(legacy_from_json, inner_str.split(", ")))
+    return CType(
+        name=re.sub(r"[?$*]", "", name),
+        namespace=match.group(1),
+        inner=inner,
+        reference="*" in name,
+        generic="$" in name,
+        nullable="?" in name,
+    )
+
+
+def benchmark_ctype_parser() -> None:
+    with Path("TestLib_1.0.0.0_skeleton.json").open("r") as file:
+        skeleton: Dict[str, Any] = json.load(file)
+    corpus: List[str] = []
+    collect_type_strings(skeleton, corpus)
+    nested: str = "System:Int32"
+    for _ in range(8):
+        nested = f"System.Collections.Generic:Dictionary[System:String, {nested}]"
+        corpus.append(nested)
+    corpus = sorted(set(corpus))
+    print(f"CType parsing: {len(corpus)} distinct type strings")
+
+    assert all(CType.from_json(t).to_json() == t for t in corpus)
+    round_trip: Sequence[str] = tuple(t for t in corpus if legacy_from_json(t).to_json() == t)
+    print(f"  regex round trip failures: {len(corpus) - len(round_trip)}")
+
+    def run_legacy() -> None:
+        for _ in range(100):
+            for type_str in round_trip:
+                legacy_from_json(type_str)
+
+    def run_parser() -> None:
+        for _ in range(100):
+            CType.from_json.cache_clear()
+            for type_str in round_trip:
+                CType.from_json(type_str)
+
+    legacy_time, _ = measure(run_legacy)
+    print(f"  regex: {legacy_time:.4f} sec")
+    parser_time, _ = measure(run_parser)
+    print(f"  parser (cold cache): {parser_time:.4f} sec")
+
+
+def legacy_type_name(c_type: CType) -> str:
+    # CType.full_name before derived strings were cached
+    name: str = c_type.name
+    if c_type.reference:
+        name = "*" + name
+    if c_type.generic:
+        name = "$" + name
+    if c_type.nullable:
+        name = name + "?"
+    if c_type.namespace is not None:
+        name = f"{c_type.namespace}:{name}"
+    if len(c_type.inner) > 0:
+        name = f"{name}[{', '.join(map(legacy_type_name, c_type.inner))}]"
+    return name
+
+
+def legacy_method_name(method: CMethod) -> str:
+    param_types: str = ", ".join(legacy_type_name(p.type) for p in method.parameters)
+    return f"{legacy_type_name(method.declaring_type)}.{method.name}({param_types})"
+
+
+def benchmark_derived_strings() -> None:
+    namespaces: Sequence[CNamespace] = load_namespaces(
+        make_skeleton(namespace_count=10, type_count=50, member_count=40)
+    )
+    methods: Sequence[CMethod] = tuple(
+        m for n in namespaces for t in n.types.values() for m in t.methods.values()
+    )
+    print(f"CMethod.__str__: {len(methods)} methods, 10 passes")
+    assert all(legacy_method_name(m) == str(m) for m in methods)
+
+    def run_legacy() -> None:
+        for _ in range(10):
+            for method in methods:
+                legacy_method_name(method)
+
+    def run_cached() -> None:
+        for _ in range(10):
+            for method in methods:
+                str(method)
+
+    legacy_time, _ = measure(run_legacy)
+    print(f"  recomputed: {legacy_time:.4f} sec")
+    cached_time, _ = measure(run_cached)
+    print(f"  cached: {cached_time:.4f} sec")
+
+
+def legacy_method_compare(method0: CMethod, method1: CMethod) -> int:
+    # CMethod.__lt__ before sort keys
+    if method0.name == method1.name:
+        return CParameter.compare(method0.parameters, method1.parameters)
+    return -1 if method0.name < method1.name else 1
+
+
+def make_sort_input(count: int) -> Tuple[List[CType], List[CMethod]]:
+    rng: random.Random = random.Random(0)
+    types: List[CType] = []
+    methods: List[CMethod] = []
+    for i in range(count):
+        inner: Tuple[CType, ...] = tuple(rng.sample(TYPES, rng.randrange(3)))
+        types.append(
+            CType(
+                name=f"Type{rng.randrange(count // 10)}",
+                namespace=rng.choice((None, "System", "System.Collections.Generic")),
+                inner=inner,
+                nullable=rng.random() < 0.5,
+            )
+        )
+        methods.append(
+            CMethod(
+                name=f"Method{rng.randrange(count // 10)}",
+                declaring_type=TYPES[0],
+                parameters=tuple(CParameter(name=f"param{p}", type=t) for p, t in enumerate(inner)),
+                return_types=(),
+            )
+        )
+    return types, methods
+
+
+def benchmark_sort() -> None:
+    count: int = 100000
+    print(f"Sorting: {count} types and {count} methods")
+
+    types, methods = make_sort_input(count)
+    legacy_types: List[CType] = sorted(types, key=functools.cmp_to_key(CType.compare))
+    legacy_methods: List[CMethod] = sorted(methods, key=functools.cmp_to_key(legacy_method_compare))
+    legacy_time, _ = measure(
+        lambda: (
+            sorted(types, key=functools.cmp_to_key(CType.compare)),
+            sorted(methods, key=functools.cmp_to_key(legacy_method_compare)),
+        ),
+        repeat=1,
+    )
+    print(f"  compare functions: {legacy_time:.4f} sec")
+
+    types, methods = make_sort_input(count)
+    start: float = time.perf_counter()
+    key_types: List[CType] = sorted(types, key=by_sort_key)
+    key_methods: List[CMethod] = sorted(methods, key=by_sort_key)
+    print(f"  sort keys (cold): {time.perf_counter() - start:.4f} sec")
+    key_time, _ = measure(
+        lambda: (sorted(types, key=by_sort_key), sorted(methods, key=by_sort_key))
+    )
+    print(f"  sort keys (cached): {key_time:.4f} sec")
+
+    assert list(map(str, key_types)) == list(map(str, legacy_types))
+    assert [m.sort_key for m in key_methods] == [m.sort_key for m in legacy_methods]
+
+
+def iter_models(namespace: CNamespace) -> Iterator[Any]:
+    yield namespace
+    for type_def in namespace.types.values():
+        yield type_def
+        for method in type_def.methods.values():
+            yield method
+            yield from method.parameters
+            yield from method.return_types
+        yield from type_def.fields.values()
+        yield from type_def.properties.values()
+        yield from type_def.constructors.values()
+
+
+def measure_peak(func: Callable[[], Any]) -> int:
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark_slots() -> None:
+    namespaces: Sequence[CNamespace] = load_namespaces(
+        make_skeleton(namespace_count=1, type_count=50, member_count=20)
+    )
+    # Only the fields, without the pickled digests
+    states: List[Tuple[type, List[Any]]] = [
+        (type(m), m.__getstate__()[: len(dataclasses.fields(m))])
+        for n in namespaces
+        for m in iter_models(n)
+    ]
+    # The same fields without __slots__, the field values are shared by both
+    with_dict: Dict[type, type] = {
+        cls: dataclasses.make_dataclass(
+            cls.__name__, [f.name for f in dataclasses.fields(cls)], frozen=True
+        )
+        for cls, _ in states
+    }
+    print(f"Rebuilding models: {len(states)} models")
+
+    def rebuild_slotted() -> List[Any]:
+        models: List[Any] = []
+        for cls, state in states:
+            model: Any = object.__new__(cls)
+            model.__setstate__(state)
+            models.append(model)
+        return models
+
+    def rebuild_with_dict() -> List[Any]:
+        return [with_dict[cls](*state) for cls, state in states]
+
+    dict_peak: int = measure_peak(rebuild_with_dict)
+    print(f"  __dict__: {dict_peak / 2 ** 20:.2f} MiB peak")
+    slotted_peak: int = measure_peak(rebuild_slotted)
+    print(f"  __slots__: {slotted_peak / 2 ** 20:.2f} MiB peak, {slotted_peak / dict_peak:.2f}x")
+
+
+def main() -> None:
+    benchmark_ctype_interning()
+    benchmark_ctype_parser()
+    benchmark_derived_strings()
+    benchmark_sort()
+    benchmark_slots()
+
+
+if __name__ == "__main__":
+    main()
@@ -37,7 +37,7 @@ def _extract_properties(
         binding_flags = BindingFlags.Public | BindingFlags.Instance | BindingFlags.Static
     for info in type.GetProperties(binding_flags):
         obj: CProperty = extract_property(info)
-        key: str = obj.to_doc_json()[0]
+        key: str = obj.doc_key
         found[key] = obj
 
     bases: List[CProperty] = []
@@ -50,7 +50,7 @@ def _extract_properties(
 
     base: CProperty
     for base in bases:
-        key: str = base.to_doc_json()[0]
+        key: str = base.doc_key
         new: CProperty
         if key in found:
             new = replace(found[key], declaring_type=base.declaring_type)
@@ -77,7 +77,7 @@ def _extract_methods(type: TypeInfo, binding_flags: BindingFlags = None) -> Coll
         binding_flags = BindingFlags.Public | BindingFlags.Instance | BindingFlags.Static
     for info in type.GetMethods(binding_flags):
         obj: CMethod = extract_method(info)
-        key: str = obj.to_doc_json()[0]
+        key: str = obj.doc_key
         found[key] = obj
 
     bases: List[CMethod] = []
@@ -90,7 +90,7 @@ def _extract_methods(type: TypeInfo, binding_flags: BindingFlags = None) -> Coll
 
     base: CMethod
     for base in bases:
-        key: str = base.to_doc_json()[0]
+        key: str = base.doc_key
         new: CMethod
         if key in found:
             new = replace(found[key], declaring_type=base.declaring_type)
@@ -1,7 +1,13 @@
+import json
+import pickle
+import tempfile
 import unittest
 from pathlib import Path
 from typing import Any
+from typing import Iterator
+from typing import List
 from typing import Mapping
+from typing import Optional
 from typing import Sequence
 from typing import Set
 from typing import Tuple
@@ -10,6 +16,7 @@ from test_base import TestBase
 
 from stubgen.build_stubs import Doc
 from stubgen.build_stubs import Imports
+from stubgen.build_stubs import LayeredDocNode
 from stubgen.build_stubs import build_class
 from stubgen.build_stubs import build_constructor
 from stubgen.build_stubs import build_delegate
@@ -23,6 +30,10 @@ from stubgen.build_stubs import build_property
 from stubgen.build_stubs import build_struct
 from stubgen.build_stubs import build_stubs
 from stubgen.build_stubs import build_type
+from stubgen.build_stubs import distinct_versions
+from stubgen.build_stubs import load_skeleton_share
+from stubgen.build_stubs import load_skeletons
+from stubgen.build_stubs import load_skeletons_in_workers
 from stubgen.build_stubs import merge_class
 from stubgen.build_stubs import merge_constructor
 from stubgen.build_stubs import merge_delegate
@@ -31,13 +42,17 @@ from stubgen.build_stubs import merge_enum
 from stubgen.build_stubs import merge_event
 from stubgen.build_stubs import merge_field
 from stubgen.build_stubs import merge_interface
+from stubgen.build_stubs import merge_mapping
+from stubgen.build_stubs import merge_mappings
 from stubgen.build_stubs import merge_method
 from stubgen.build_stubs import merge_namespace
+from stubgen.build_stubs import merge_namespaces
 from stubgen.build_stubs import merge_parameter
 from stubgen.build_stubs import merge_parameters
 from stubgen.build_stubs import merge_property
 from stubgen.build_stubs import merge_struct
 from stubgen.build_stubs import merge_type_def
+from stubgen.build_stubs import split_by_size
 from stubgen.model import CClass
 from stubgen.model import CConstructor
 from stubgen.model import CDelegate
@@ -54,6 +69,33 @@ from stubgen.model import CType
 from stubgen.model import CTypeDefinition
 
 
+class TestMergeMapping(TestBase):
+    @staticmethod
+    def add(value1: int, value2: int, should_raise: bool) -> int:
+        return value1 + value2
+
+    def test_sorted(self) -> None:
+        merged: Mapping[str, int] = merge_mapping({"a": 1, "c": 2}, {"b": 3, "c": 4}, self.add)
+
+        self.assertEqual([("a", 1), ("b", 3), ("c", 6)], list(merged.items()))
+
+    def test_same_keys(self) -> None:
+        merged: Mapping[str, int] = merge_mapping({"a": 1, "b": 2}, {"a": 3, "b": 4}, self.add)
+
+        self.assertEqual([("a", 4), ("b", 6)], list(merged.items()))
+
+    def test_unsorted(self) -> None:
+        merged: Mapping[str, int] = merge_mapping({"c": 1, "a": 2}, {"b": 3, "a": 4}, self.add)
+
+        self.assertEqual([("a", 6), ("b", 3), ("c", 1)], list(merged.items()))
+
+    def test_many(self) -> None:
+        mappings: Sequence[Mapping[str, int]] = ({"b": 1}, {"c": 2, "a": 3}, {"b": 4})
+        merged: Mapping[str, int] = merge_mappings(mappings, lambda values, _: sum(values))
+
+        self.assertEqual([("a", 3), ("b", 5), ("c", 2)], list(merged.items()))
+
+
 class TestMergeNamespace(TestBase):
     def test_merge(self) -> None:
         namespace1: CNamespace = CNamespace(
@@ -206,6 +248,166 @@ class TestMergeNamespace(TestBase):
         self.assertRaises(AttributeError, lambda: merge_namespace(namespace1, namespace2))
 
 
+def get_namespace_versions() -> Sequence[CNamespace]:
+    # Versions of the TestLib namespace with added, removed and changed types and members
+    with (Path(__file__).parent / "TestLib_1.0.0.0_skeleton.json").open("r") as file:
+        skeleton: Mapping[str, Any] = json.load(file)["namespaces"]["TestLib"]
+
+    version2: Any = json.loads(json.dumps(skeleton))
+    events: Any = version2["types"]["TestLib.ClassWithEvents"]
+    del events["methods"]["System:Object.GetHashCode()"]
+    events["fields"]["TestLib:ClassWithEvents.Added"] = {
+        "name": "Added",
+        "declaring_type": "TestLib:ClassWithEvents",
+        "return_type": "System:Int32",
+        "static": True,
+    }
+    del version2["types"]["TestLib.ClassWithFields"]
+
+    version3: Any = json.loads(json.dumps(skeleton))
+    version3["types"]["TestLib.ClassWithEvents"]["abstract"] = True
+    version3["types"]["TestLib.ClassWithEvents"]["interfaces"] = ["System:IDisposable"]
+
+    return tuple(CNamespace.from_json(v) for v in (skeleton, version2, version3, skeleton))
+
+
+class TestMergeNamespaces(TestBase):
+    def test_same_as_pairwise(self) -> None:
+        versions: Sequence[CNamespace] = get_namespace_versions()
+
+        with self.assertLogs("stubgen.build_stubs", "WARNING") as pairwise_logs:
+            expected: CNamespace = versions[0]
+            for version in versions[1:]:
+                expected = merge_namespace(expected, version, False)
+        with self.assertLogs("stubgen.build_stubs", "WARNING") as k_way_logs:
+            merged: CNamespace = merge_namespaces(versions, False)
+
+        self.assertEqual(expected, merged)
+        self.assertEqual(list(expected.types), list(merged.types))
+        events: str = "TestLib.ClassWithEvents"
+        self.assertEqual(list(expected.types[events].methods), list(merged.types[events].methods))
+        self.assertIn("TestLib:ClassWithEvents.Added", merged.types[events].fields)
+        self.assertEqual(sorted(pairwise_logs.output), sorted(k_way_logs.output))
+
+    def test_single_version_kept(self) -> None:
+        versions: Sequence[CNamespace] = get_namespace_versions()
+
+        merged: CNamespace = merge_namespaces(versions[:2], False)
+
+        self.assertIs(
+            versions[0].types["TestLib.ClassWithFields"], merged.types["TestLib.ClassWithFields"]
+        )
+
+    def test_raise(self) -> None:
+        versions: Sequence[CNamespace] = get_namespace_versions()
+
+        with self.assertRaises(AttributeError):
+            merge_namespaces(versions, True)
+
+    def test_identical_versions_kept(self) -> None:
+        versions: Sequence[CNamespace] = get_namespace_versions()
+        copy: CNamespace = versions[-1]
+        events: str = "TestLib.ClassWithEvents"
+
+        self.assertIsNot(versions[0], copy)
+        self.assertIs(versions[0], merge_namespaces((versions[0], copy), True))
+        self.assertIs(versions[0], merge_namespace(versions[0], copy, True))
+        self.assertIs(
+            versions[0].types[events],
+            merge_type_def(versions[0].types[events], copy.types[events], True),
+        )
+        # Types that are the same in both versions are not merged again
+        self.assertIs(
+            versions[0].types["TestLib.ClassWithMethods"],
+            merge_namespaces(versions[:2], False).types["TestLib.ClassWithMethods"],
+        )
+        self.assertEqual(merge_namespaces(versions, False), merge_namespaces(versions[:3], False))
+
+    def test_changed_member_merged(self) -> None:
+        versions: Sequence[CNamespace] = get_namespace_versions()
+        namespace_json: Any = versions[0].to_json()
+        for field_json in namespace_json["types"]["TestLib.ClassWithFields"]["fields"].values():
+            field_json["return_type"] = "System:Object"
+        changed: CNamespace = CNamespace.from_json(namespace_json)
+
+        self.assertNotEqual(versions[0].fingerprint, changed.fingerprint)
+        with self.assertRaises(AttributeError):
+            merge_namespaces((versions[0], changed), True)
+        with self.assertRaises(AttributeError):
+            merge_namespace(versions[0], changed, True)
+
+    def test_distinct_versions(self) -> None:
+        versions: Sequence[CNamespace] = get_namespace_versions()
+        namespace_json: Any = versions[0].to_json()
+        for field_json in namespace_json["types"]["TestLib.ClassWithFields"]["fields"].values():
+            field_json["return_type"] = "System:Object"
+        changed: CNamespace = CNamespace.from_json(namespace_json)
+        copy: CNamespace = CNamespace.from_json(namespace_json)
+
+        # Copies are dropped by their digest, the first of them is kept
+        distinct: Sequence[CNamespace] = distinct_versions(
+            (versions[0], changed, copy, versions[0])
+        )
+        self.assertEqual(2, len(distinct))
+        self.assertIs(versions[0], distinct[0])
+        self.assertIs(changed, distinct[1])
+
+
+class TestLoadSkeletons(TestBase):
+    def setUp(self) -> None:
+        self.temp_dir: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+        self.skeleton_files: List[Path] = []
+        for index, version in enumerate(get_namespace_versions()):
+            namespaces: Any = {"TestLib": version.to_json()}
+            if index % 2 == 1:
+                namespaces[f"Extra{index}"] = {"name": f"Extra{index}", "types": {}}
+            skeleton_file: Path = Path(self.temp_dir.name) / f"TestLib{index}_skeleton.json"
+            with skeleton_file.open("w") as file:
+                json.dump({"namespaces": namespaces}, file)
+            self.skeleton_files.append(skeleton_file)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_split_by_size(self) -> None:
+        shares: Sequence[Sequence[Path]] = split_by_size(self.skeleton_files, 2)
+
+        self.assertEqual(self.skeleton_files, [f for share in shares for f in share])
+        self.assertEqual([2, 2], [len(share) for share in shares])
+        self.assertEqual(1, len(split_by_size(self.skeleton_files[:1], 4)))
+
+    def test_shared_members(self) -> None:
+        loaded: Mapping[str, CNamespace] = pickle.loads(
+            load_skeleton_share(self.skeleton_files[:1])
+        )
+        key: str = "System:Object.GetHashCode()"
+        methods: Sequence[CMethod] = tuple(
+            t.methods[key]
+            for t in loaded["TestLib"].types.values()
+            if key in getattr(t, "methods", {})
+        )
+
+        self.assertGreater(len(methods), 1)
+        for method in methods:
+            self.assertIs(methods[0], method)
+
+    def test_workers(self) -> None:
+        expected: Mapping[str, CNamespace] = load_skeletons(self.skeleton_files)
+
+        for process_count in (2, 3):
+            with self.subTest(process_count=process_count):
+                loaded: Mapping[str, CNamespace] = load_skeletons_in_workers(
+                    self.skeleton_files, process_count
+                )
+
+                self.assertEqual(expected, loaded)
+                self.assertEqual(list(expected), list(loaded))
+                self.assertEqual(
+                    list(expected["TestLib"].types["TestLib.ClassWithEvents"].methods),
+                    list(loaded["TestLib"].types["TestLib.ClassWithEvents"].methods),
+                )
+
+
 class TestMergeTypeDefinition(TestBase):
     def test_merge_error_type(self) -> None:
         type_def1: CTypeDefinition = CClass(
@@ -3650,6 +3852,125 @@ class TestDoc(TestBase):
         self.assertIsInstance(node, Doc)
         self.assertEqual({"doc": ""}, node.data)
 
+    def test_get_wildcard_order(self) -> None:
+        doc_tree: Mapping[str, Any] = {
+            "Node[*]": {"doc": "A"},
+            "Node[Namespace:TypeA]": {"doc": "B"},
+        }
+        doc_dict: Doc = Doc(doc_tree)
+        node: Doc = doc_dict.get("Node[Namespace:TypeA].doc")
+
+        self.assertIsNotNone(node)
+        self.assertEqual("A", node.data)
+
+    def test_get_exact_order(self) -> None:
+        doc_tree: Mapping[str, Any] = {
+            "NodeA": {"Node[Namespace:TypeA]": {"doc": "A"}, "Node[*]": {"doc": "B"}}
+        }
+        doc_dict: Doc = Doc(doc_tree)
+        node_a: Doc = doc_dict.get("NodeA.Node[Namespace:TypeA]")
+        node_b: Doc = doc_dict.get("NodeA.Node[Namespace:TypeB]")
+
+        self.assertEqual({"doc": "A"}, node_a.data)
+        self.assertEqual({"doc": "B"}, node_b.data)
+
+    def test_get_missing_cached(self) -> None:
+        class CountingMapping(Mapping[str, Any]):
+            def __init__(self, data: Mapping[str, Any]) -> None:
+                self.data: Mapping[str, Any] = data
+                self.reads: int = 0
+
+            def __getitem__(self, key: str) -> Any:
+                self.reads += 1
+                return self.data[key]
+
+            def __contains__(self, key: object) -> bool:
+                self.reads += 1
+                return key in self.data
+
+            def __iter__(self) -> Iterator[str]:
+                self.reads += 1
+                return iter(self.data)
+
+            def __len__(self) -> int:
+                return len(self.data)
+
+        node_a: CountingMapping = CountingMapping({"NodeB": {"doc": ""}})
+        doc_dict: Doc = Doc({"NodeA": node_a})
+
+        self.assertIsNone(doc_dict.get("NodeA.Not Present"))
+        reads: int = node_a.reads
+        self.assertIsNone(doc_dict.get("NodeA.Not Present"))
+        self.assertEqual(reads, node_a.reads)
+
+    def test_get_shared_index(self) -> None:
+        doc_tree: Mapping[str, Any] = {"NodeA": {"NodeB": {"NodeC": {"doc": ""}}}}
+        doc_dict: Doc = Doc(doc_tree)
+        node_a: Doc = doc_dict.get("NodeA")
+        node_c: Doc = node_a.get("NodeB.NodeC")
+
+        self.assertIs(doc_dict.index, node_a.index)
+        self.assertIs(doc_dict.index, node_c.index)
+        self.assertEqual({"doc": ""}, node_c.data)
+
+    def test_get_member(self) -> None:
+        doc_tree: Mapping[str, Any] = {
+            "Namespace": {
+                "Type": {"Method(System:Int32)": {"doc": "Method doc string."}},
+                "Base": {"Field": {"doc": "Field doc string."}},
+            },
+        }
+        doc_dict: Doc = Doc(doc_tree)
+        method: CMethod = CMethod(
+            name="Method",
+            declaring_type=CType(name="Type", namespace="Namespace"),
+            parameters=(CParameter(name="a", type=CType(name="Int32", namespace="System")),),
+            return_types=(CType(name="Void", namespace="System"),),
+        )
+        field: CField = CField(
+            name="Field",
+            declaring_type=CType(name="Base", namespace="Namespace"),
+            return_type=CType(name="Int32", namespace="System"),
+        )
+
+        self.assertEqual({"doc": "Method doc string."}, doc_dict.get_member(method).data)
+        self.assertEqual({"doc": "Field doc string."}, doc_dict.get_member(field).data)
+        self.assertEqual(doc_dict.get(str(method)).data, doc_dict.get_member(method).data)
+        self.assertEqual(doc_dict.get(str(field)).data, doc_dict.get_member(field).data)
+
+    def test_get_member_wildcard_first(self) -> None:
+        doc_tree: Mapping[str, Any] = {
+            "Namespace": {
+                "Type[$T]": {"Field": {"doc": "Wildcard doc string."}},
+                "Type[$T, $TOther]": {"Field": {"doc": "Exact doc string."}},
+            },
+        }
+        doc_dict: Doc = Doc(doc_tree)
+        field: CField = CField(
+            name="Field",
+            declaring_type=CType(
+                name="Type",
+                namespace="Namespace",
+                inner=(CType(name="T", generic=True), CType(name="TOther", generic=True)),
+            ),
+            return_type=CType(name="Int32", namespace="System"),
+        )
+
+        # Like the whole member path, a wildcard key before the exact key of the type wins
+        self.assertEqual({"doc": "Wildcard doc string."}, doc_dict.get_member(field).data)
+        self.assertEqual(doc_dict.get(str(field)).data, doc_dict.get_member(field).data)
+
+    def test_get_member_missing(self) -> None:
+        doc_tree: Mapping[str, Any] = {"Namespace": {"Type": {"doc": ""}}}
+        doc_dict: Doc = Doc(doc_tree)
+        field: CField = CField(
+            name="Field",
+            declaring_type=CType(name="Missing", namespace="Namespace"),
+            return_type=CType(name="Int32", namespace="System"),
+        )
+
+        self.assertIsNone(doc_dict.get_member(field))
+
     def test_doc_string_empty(self) -> None:
         doc_tree: Mapping[str, Any] = {}
         doc_dict: Doc = Doc(doc_tree)
@@ -4255,6 +4576,78 @@ class TestMergeDoc(TestBase):
         )
 
 
+class TestLayeredDocNode(TestBase):
+    @staticmethod
+    def materialize(value: Any) -> Any:
+        # Nested plain dicts and lists, so dumps compares the key order as well
+        if isinstance(value, Mapping):
+            return {k: TestLayeredDocNode.materialize(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [TestLayeredDocNode.materialize(v) for v in value]
+        return value
+
+    def get_layers(self) -> Sequence[Mapping[str, Any]]:
+        with (Path(__file__).parent / "TestLib_1.0.0.0_doc.json").open("r") as file:
+            test_lib: Mapping[str, Any] = json.load(file)
+        return (
+            test_lib,
+            {
+                "TestLib": {
+                    "doc": "Namespace",
+                    "ClassB": {"doc": "Class B", "parameters": {"param0": "Parameter 0."}},
+                },
+                "Other": {"doc": "Other"},
+            },
+            json.loads(json.dumps(test_lib)),
+            {
+                "TestLib": {
+                    "ClassB": {
+                        "doc": "",
+                        "doc_formatted": {"format0": ["0", "1"]},
+                        "parameters": {"param0": "", "param1": "Parameter 1."},
+                        "exceptions": {"Exception0": "Exception 0."},
+                        "return": "Return",
+                    },
+                },
+            },
+        )
+
+    def test_same_as_merge_doc(self) -> None:
+        layers: Sequence[Mapping[str, Any]] = self.get_layers()
+        expected: Doc = Doc({})
+        for layer in self.get_layers():
+            expected = merge_doc(expected, Doc(layer))
+
+        layered: LayeredDocNode = LayeredDocNode(layers)
+
+        self.assertEqual(
+            json.dumps(self.materialize(expected.data)), json.dumps(self.materialize(layered))
+        )
+
+    def test_layers_unchanged(self) -> None:
+        layers: Sequence[Mapping[str, Any]] = self.get_layers()
+        copies: Sequence[str] = tuple(json.dumps(layer) for layer in layers)
+
+        self.materialize(LayeredDocNode(layers))
+
+        self.assertEqual(copies, tuple(json.dumps(layer) for layer in layers))
+
+    def test_get(self) -> None:
+        layered: LayeredDocNode = LayeredDocNode(self.get_layers())
+        doc: Doc = Doc(layered)
+
+        class_b: Optional[Doc] = doc.get("TestLib.ClassB")
+
+        self.assertIsNotNone(class_b)
+        self.assertEqual(
+            {"param0": "Parameter 0.", "param1": "Parameter 1."}, class_b.data["parameters"]
+        )
+        self.assertIs(layered["TestLib"], layered["TestLib"])
+        self.assertIn("Other", layered)
+        self.assertNotIn("Missing", layered)
+        self.assertIsNone(doc.get("Missing"))
+
+
 class TestBuildClass(TestBase):
     def test_build(self) -> None:
         type_def: CClass = CClass(
@@ -7265,6 +7658,37 @@ class TestBuildEnum(TestBase):
 
         self.assertEqual(expected, lines)
 
+    def test_doc_nested(self) -> None:
+        type_def: CEnum = CEnum(
+            name="Enum",
+            namespace="Namespace",
+            nested=CType(name="Class", namespace="Namespace"),
+            fields=("FieldA",),
+        )
+        imports: Imports = Imports()
+        doc: Doc = Doc(
+            {
+                "Namespace": {
+                    "Class": {
+                        "Enum": {
+                            "doc": "Enum doc string.",
+                            "FieldA": {"doc": "FieldA doc string."},
+                        },
+                    },
+                },
+            }
+        )
+
+        lines: Sequence[str] = build_enum(type_def=type_def, imports=imports, doc=doc)
+        expected: Sequence[str] = (
+            "class Enum(Enum):",
+            '    """Enum doc string."""',
+            "    FieldA: Enum = ...",
+            '    """FieldA doc string."""',
+        )
+
+        self.assertEqual(expected, lines)
+
     def test_doc_no_fields(self) -> None:
         type_def: CEnum = CEnum(
             name="Enum",
@@ -4,6 +4,7 @@ from pathlib import Path
 from typing import Any
 from typing import Dict
 from typing import Mapping
+from typing import Optional
 from typing import Sequence
 
 import clr
@@ -16,7 +17,9 @@ from System.Reflection import PropertyInfo
 from System.Reflection import TypeInfo
 from test_base import TestBase
 
+from stubgen.extract_common import reference_closure
 from stubgen.extract_stubs import extract_assembly
+from stubgen.extract_stubs import extract_base_table
 from stubgen.extract_stubs import extract_constructor
 from stubgen.extract_stubs import extract_constructors
 from stubgen.extract_stubs import extract_event
@@ -30,6 +33,8 @@ from stubgen.extract_stubs import extract_properties
 from stubgen.extract_stubs import extract_property
 from stubgen.extract_stubs import extract_type
 from stubgen.extract_stubs import extract_type_def
+from stubgen.extract_stubs import get_members
+from stubgen.extract_stubs import get_references
 from stubgen.model import CClass
 from stubgen.model import CConstructor
 from stubgen.model import CDelegate
@@ -5084,6 +5089,16 @@ class TestCType(TestExtractBase):
 
         self.assertEqual(expected, extracted)
 
+    def test_extract_type_cached(self) -> None:
+        type_info: TypeInfo = self.get_type("ClassWithSuper")
+
+        extracted: CType = extract_type(type_info)
+        hits: int = extract_type.cache_info().hits
+
+        self.assertIs(extracted, extract_type(type_info))
+        self.assertEqual(hits + 1, extract_type.cache_info().hits)
+        self.assertEqual(extracted, extract_type(type_info, use_generic=True))
+
     def test_extract_type_inner(self) -> None:
         type_info: TypeInfo = self.get_type("ClassWithGeneric")
 
@@ -5790,6 +5805,37 @@ class TestCEvent(TestExtractBase):
         self.assertDictEqual(expected, extracted)
 
 
+class TestExtractBaseTable(TestExtractBase):
+    def test_extract_base_table_cached(self) -> None:
+        type_map: Mapping[str, TypeInfo] = self.get_types("ClassWithFields", "ClassWithMethods")
+        extract_base_table.cache_clear()
+
+        methods0: Mapping[str, CMethod] = extract_methods(type_map["ClassWithFields"])
+        misses: int = extract_base_table.cache_info().misses
+        methods1: Mapping[str, CMethod] = extract_methods(type_map["ClassWithMethods"])
+
+        self.assertLess(0, extract_base_table.cache_info().hits)
+        self.assertEqual(misses, extract_base_table.cache_info().misses)
+        self.assertEqual(methods0["System:Object.ToString()"], methods1["System:Object.ToString()"])
+
+
+class TestGetMembers(TestExtractBase):
+    def test_get_members_shared(self) -> None:
+        type_map: Mapping[str, TypeInfo] = self.get_types("ClassWithMethods")
+        get_members.cache_clear()
+        extract_base_table.cache_clear()
+
+        extract_fields(type_map["ClassWithMethods"])
+        misses: int = get_members.cache_info().misses
+        extract_constructors(type_map["ClassWithMethods"])
+        extract_properties(type_map["ClassWithMethods"])
+        extract_methods(type_map["ClassWithMethods"])
+        extract_events(type_map["ClassWithMethods"])
+
+        self.assertLess(0, get_members.cache_info().hits)
+        self.assertEqual(misses, get_members.cache_info().misses)
+
+
 class TestExtractAssembly(TestBase):
     output_dir: Path
 
@@ -5883,6 +5929,87 @@ class TestExtractAssembly(TestBase):
                 type_def: Mapping[str, Any] = type_map.get(type_str, None)
                 self.assertIsNotNone(type_def)
 
+    def test_extract_test_lib_declared_only(self) -> None:
+        skeleton_name: str = "TestLib_1.0.0.0_skeleton.json"
+        skeletons: Dict[bool, Mapping[str, Any]] = {}
+
+        declared_only: bool
+        for declared_only in (False, True):
+            output_dir: Path = self.output_dir / f"declared_only_{declared_only}"
+            output_dir.mkdir(parents=True, exist_ok=True)
+
+            result = extract_assembly(
+                assembly_name="TestLib",
+                output_dir=output_dir,
+                overwrite=True,
+                declared_only=declared_only,
+            )
+            self.assertEqual(0, result)
+
+            with (output_dir / skeleton_name).open("r") as skeleton_file:
+                skeletons[declared_only] = json.load(skeleton_file)
+
+        self.assertEqual(skeletons[False], skeletons[True])
+
+    def test_extract_test_lib_type_workers(self) -> None:
+        file_names: Sequence[str] = (
+            "TestLib_1.0.0.0_skeleton.json",
+            "TestLib_1.0.0.0_doc.json",
+        )
+        outputs: Dict[Optional[int], Sequence[str]] = {}
+
+        type_workers: Optional[int]
+        for type_workers in (None, 2, 3):
+            output_dir: Path = self.output_dir / f"type_workers_{type_workers}"
+            output_dir.mkdir(parents=True, exist_ok=True)
+
+            result = extract_assembly(
+                assembly_name="TestLib",
+                output_dir=output_dir,
+                overwrite=True,
+                type_workers=type_workers,
+            )
+            self.assertEqual(0, result)
+
+            outputs[type_workers] = tuple((output_dir / n).read_text() for n in file_names)
+
+        self.assertEqual(outputs[None], outputs[2])
+        self.assertEqual(outputs[None], outputs[3])
+
+    def test_test_lib_closure(self) -> None:
+        name, references = get_references("TestLib")
+        closure: Sequence[str] = reference_closure(["TestLib"], get_references)
+
+        self.assertEqual("TestLib", name)
+        self.assertEqual("TestLib", closure[-1])
+        self.assertEqual(len(closure), len(set(closure)))
+        for reference in references:
+            self.assertIn(reference, closure)
+
+    def test_extract_test_lib_replay(self) -> None:
+        skeleton_name: str = "TestLib_1.0.0.0_skeleton.json"
+        record_dir: Path = self.output_dir / "record"
+        replay_dir: Path = self.output_dir / "replay"
+        record_dir.mkdir(parents=True, exist_ok=True)
+        replay_dir.mkdir(parents=True, exist_ok=True)
+
+        self.assertEqual(
+            0, extract_assembly("TestLib", record_dir, overwrite=True, record_dir=record_dir)
+        )
+        self.assertEqual(
+            0,
+            extract_assembly(
+                str(record_dir / "TestLib_1.0.0.0_snapshot.json.gz"),
+                replay_dir,
+                overwrite=True,
+                replay=True,
+            ),
+        )
+
+        self.assertEqual(
+            (record_dir / skeleton_name).read_text(), (replay_dir / skeleton_name).read_text()
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
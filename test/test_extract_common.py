@@ -0,0 +1,236 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+from stubgen.extract_common import AssemblyWriter
+from stubgen.extract_common import ExtractResult
+from stubgen.extract_common import reference_closure
+from stubgen.extract_common import run_extraction
+from stubgen.manifest import Manifest
+from stubgen.manifest import ManifestEntry
+from stubgen.model import CEnum
+from stubgen.model import CNamespace
+from stubgen.model import CTypeDefinition
+from stubgen.model import by_sort_key
+
+TEST_SKELETON: Path = Path(__file__).parent / "TestLib_1.0.0.0_skeleton.json"
+
+
+class TestAssemblyWriter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+        self.extract_file: Path = Path(self.temp_dir.name) / "TestLib_1.0.0.0_skeleton.json"
+        self.doc_file: Path = Path(self.temp_dir.name) / "TestLib_1.0.0.0_doc.json"
+
+        with TEST_SKELETON.open("r") as file:
+            skeleton: Dict[str, Any] = json.load(file)
+        self.namespaces: Sequence[CNamespace] = tuple(
+            CNamespace.from_json(namespace) for namespace in skeleton["namespaces"].values()
+        )
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def write(
+        self, type_definitions: Sequence[CTypeDefinition], namespaces: Sequence[str] = ()
+    ) -> None:
+        with AssemblyWriter(
+            "TestLib", "1.0.0.0", self.extract_file, self.doc_file, namespaces
+        ) as writer:
+            for type_definition in type_definitions:
+                writer.write(type_definition)
+
+    def assert_same_as_json_dump(self, listed: Sequence[CTypeDefinition]) -> None:
+        # The types are given in the order the assembly lists them, the writer gets them sorted
+        namespaces: Sequence[str] = tuple(dict.fromkeys(t.namespace for t in listed))
+        self.write(sorted(listed, key=lambda t: (t.namespace, t.sort_key)), namespaces)
+
+        skeleton, doc = dump_assembly(listed)
+        self.assertEqual(skeleton, self.extract_file.read_text())
+        self.assertEqual(doc, self.doc_file.read_text())
+
+    def test_same_as_json_dump(self) -> None:
+        listed: List[CTypeDefinition] = []
+        for namespace in reversed(self.namespaces):
+            listed.extend(namespace.types.values())
+
+        self.assert_same_as_json_dump(listed * 2)
+
+    def test_nested_namespaces(self) -> None:
+        # Sorted, A.B-X comes between A.B and A.B.C
+        self.assert_same_as_json_dump(
+            (
+                CEnum("C1", "A.B.C", None, ("X",)),
+                CEnum("X1", "A.B-X", None, ("X",)),
+                CEnum("A1", "A", None, ("X",)),
+                CEnum("B1", "A.B", None, ("X",)),
+                CEnum("C2", "A.B.C", None, ("X",)),
+                CEnum("D1", "D", None, ("X",)),
+            )
+        )
+
+    def test_duplicates(self) -> None:
+        # The last copy of a type is kept, at the place of the first
+        self.assert_same_as_json_dump(
+            (
+                CEnum("E", "A", None, ("X",)),
+                CEnum("F", "A", None, ("X",)),
+                CEnum("E", "A", None, ("Y",)),
+                CEnum("E", "A", None, ("Z",)),
+            )
+        )
+
+    def test_empty(self) -> None:
+        self.write(())
+
+        self.assertEqual(
+            {"name": "TestLib", "version": "1.0.0.0", "namespaces": {}},
+            json.loads(self.extract_file.read_text()),
+        )
+        self.assertEqual("{}", self.doc_file.read_text())
+
+    def test_out_of_order(self) -> None:
+        type_definitions: Sequence[CTypeDefinition] = tuple(
+            sorted(self.namespaces, key=by_sort_key)[-1].types.values()
+        )
+
+        with self.assertRaises(ValueError):
+            self.write(tuple(reversed(type_definitions)))
+        self.assertFalse(self.extract_file.exists())
+        self.assertFalse(self.doc_file.exists())
+
+
+def dump_assembly(listed: Sequence[CTypeDefinition]) -> Tuple[str, str]:
+    # The skeleton and doc files as extract_assembly wrote them from all types at once
+    type_lists: Dict[str, List[CTypeDefinition]] = {}
+    for type_definition in listed:
+        type_lists.setdefault(type_definition.namespace, []).append(type_definition)
+    namespaces: Sequence[CNamespace] = tuple(
+        CNamespace(name=namespace, types={str(t): t for t in sorted(type_list, key=by_sort_key)})
+        for namespace, type_list in type_lists.items()
+    )
+
+    skeleton: Dict[str, Any] = {
+        "name": "TestLib",
+        "version": "1.0.0.0",
+        "namespaces": {str(n): n.to_json() for n in sorted(namespaces, key=by_sort_key)},
+    }
+    doc: Dict[str, Any] = {}
+    for namespace in namespaces:
+        curr: Dict[str, Any] = doc
+        for part in namespace.name.split("."):
+            if part not in curr:
+                curr[part] = {"doc": ""}
+            curr = curr[part]
+        for type_definition in namespace.types.values():
+            name, doc_json = type_definition.to_doc_json()
+            curr[name] = doc_json
+
+    return json.dumps(skeleton, indent=2), json.dumps(doc, indent=2)
+
+
+class TestReferenceClosure(unittest.TestCase):
+    def setUp(self) -> None:
+        self.references: Mapping[str, Sequence[str]] = {
+            "App": ("Core", "Ui", "Missing"),
+            "Ui": ("Core", "App"),
+            "Core": ("System",),
+            "System": (),
+            "Tool": ("Core",),
+        }
+        self.loaded: List[str] = []
+
+    def get_references(self, assembly_name: str) -> Optional[Tuple[str, Sequence[str]]]:
+        self.loaded.append(assembly_name)
+        # Paths and names of the same assembly share a key
+        key: str = assembly_name.rsplit("/", 1)[-1]
+        if key not in self.references:
+            return None
+        return key, self.references[key]
+
+    def test_dependency_order(self) -> None:
+        closure: Sequence[str] = reference_closure(("App", "Tool"), self.get_references)
+
+        self.assertEqual(["System", "Core", "Ui", "App", "Tool"], closure)
+        self.assertEqual(len(self.loaded), len(set(self.loaded)))
+
+    def test_same_assembly(self) -> None:
+        closure: Sequence[str] = reference_closure(("bin/Core", "Tool"), self.get_references)
+
+        self.assertEqual(["System", "bin/Core", "Tool"], closure)
+
+    def test_missing_entry(self) -> None:
+        closure: Sequence[str] = reference_closure(("Missing", "Core"), self.get_references)
+
+        self.assertEqual(["Missing", "System", "Core"], closure)
+
+
+class TestRunExtraction(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+        self.output_dir: Path = Path(self.temp_dir.name)
+        self.dll_file: Path = self.output_dir / "Assembly.dll"
+        self.dll_file.write_bytes(b"MZ" + bytes(62))
+        self.extracted: List[str] = []
+        self.located: List[str] = []
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def extract_entry(self, assembly_name: str, output_dir: Path, overwrite: bool) -> ExtractResult:
+        self.extracted.append(assembly_name)
+        (output_dir / "Assembly_1.0.0.0_skeleton.json").write_text("{}")
+        (output_dir / "Assembly_1.0.0.0_doc.json").write_text("{}")
+        return 0, ManifestEntry.from_file(self.dll_file, name="Assembly", version="1.0.0.0")
+
+    def locate(self, assembly_name: str) -> Optional[Path]:
+        self.located.append(assembly_name)
+        return self.dll_file
+
+    def run_extraction(self, options: Mapping[str, Any]) -> None:
+        exit_code: Union[int, str] = run_extraction(
+            self.extract_entry,
+            self.locate,
+            options,
+            ("Assembly",),
+            self.output_dir,
+            False,
+            False,
+            False,
+        )
+        self.assertEqual(0, exit_code)
+
+    def test_unchanged(self) -> None:
+        self.run_extraction({"backend": "metadata"})
+        self.run_extraction({"backend": "metadata"})
+
+        self.assertEqual(["Assembly"], self.extracted)
+        # Nothing is located for an assembly without an entry
+        self.assertEqual(["Assembly"], self.located)
+        self.assertEqual(
+            {"backend": "metadata"}, Manifest(self.output_dir).entries["Assembly"].options
+        )
+
+    def test_other_options(self) -> None:
+        self.run_extraction({"backend": "metadata"})
+        self.run_extraction({"backend": "reflection", "declared_only": False})
+        self.run_extraction({"backend": "reflection", "declared_only": True})
+
+        self.assertEqual(["Assembly"] * 3, self.extracted)
+        self.assertEqual(
+            {"backend": "reflection", "declared_only": True},
+            Manifest(self.output_dir).entries["Assembly"].options,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import dataclasses
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Any
+from typing import Mapping
+from typing import Optional
+
+from stubgen.manifest import Manifest
+from stubgen.manifest import ManifestEntry
+
+OPTIONS: Mapping[str, Any] = {"backend": "metadata"}
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+        self.output_dir: Path = Path(self.temp_dir.name)
+        self.dll_file: Path = self.output_dir / "Assembly.dll"
+        self.dll_file.write_bytes(b"MZ" + bytes(62))
+        (self.output_dir / "Assembly_1.0.0.0_skeleton.json").write_text("{}")
+        (self.output_dir / "Assembly_1.0.0.0_doc.json").write_text("{}")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def make_manifest(self) -> Manifest:
+        manifest: Manifest = Manifest(self.output_dir)
+        manifest.update(
+            "Assembly",
+            dataclasses.replace(
+                ManifestEntry.from_file(self.dll_file, name="Assembly", version="1.0.0.0"),
+                options=OPTIONS,
+            ),
+        )
+        manifest.save()
+        return Manifest(self.output_dir)
+
+    def check(
+        self, manifest: Manifest, path: Optional[Path], options: Mapping[str, Any] = OPTIONS
+    ) -> Optional[ManifestEntry]:
+        return manifest.entries["Assembly"].check(path, self.output_dir, options)
+
+    def test_json(self) -> None:
+        entry: ManifestEntry = ManifestEntry.from_file(
+            self.dll_file, name="Assembly", version="1.0.0.0"
+        )
+
+        self.assertEqual(entry, ManifestEntry.from_json(entry.to_json()))
+        self.assertEqual(64, entry.size)
+        self.assertEqual("Assembly_1.0.0.0_skeleton.json", entry.skeleton_name)
+
+    def test_unchanged(self) -> None:
+        manifest: Manifest = self.make_manifest()
+
+        self.assertIn("Assembly", manifest)
+        self.assertIs(manifest.entries["Assembly"], self.check(manifest, self.dll_file))
+
+    def test_touched(self) -> None:
+        manifest: Manifest = self.make_manifest()
+        mtime: int = manifest.entries["Assembly"].mtime
+        os.utime(self.dll_file, ns=(mtime + 10**9, mtime + 10**9))
+
+        entry: Optional[ManifestEntry] = self.check(manifest, self.dll_file)
+        self.assertIsNotNone(entry)
+        self.assertEqual(mtime + 10**9, entry.mtime)
+        self.assertEqual(OPTIONS, entry.options)
+
+    def test_changed(self) -> None:
+        manifest: Manifest = self.make_manifest()
+        mtime: int = manifest.entries["Assembly"].mtime
+        self.dll_file.write_bytes(b"MZ" + bytes(61) + b"\x01")
+        os.utime(self.dll_file, ns=(mtime + 10**9, mtime + 10**9))
+
+        self.assertIsNone(self.check(manifest, self.dll_file))
+
+    def test_resized(self) -> None:
+        manifest: Manifest = self.make_manifest()
+        self.dll_file.write_bytes(b"MZ")
+
+        self.assertIsNone(self.check(manifest, self.dll_file))
+
+    def test_resolved_elsewhere(self) -> None:
+        manifest: Manifest = self.make_manifest()
+        other_dir: Path = self.output_dir / "other"
+        other_dir.mkdir()
+        other_file: Path = other_dir / "Assembly.dll"
+        other_file.write_bytes(self.dll_file.read_bytes())
+        mtime: int = manifest.entries["Assembly"].mtime
+        os.utime(other_file, ns=(mtime, mtime))
+
+        # The same content found at another path is another file
+        self.assertIsNone(self.check(manifest, other_file))
+        self.assertIsNone(self.check(manifest, None))
+        self.assertIsNotNone(self.check(manifest, self.dll_file))
+
+    def test_missing_output(self) -> None:
+        manifest: Manifest = self.make_manifest()
+        (self.output_dir / "Assembly_1.0.0.0_doc.json").unlink()
+
+        self.assertIsNone(self.check(manifest, self.dll_file))
+
+    def test_stubgen_version(self) -> None:
+        manifest: Manifest = self.make_manifest()
+        manifest.update(
+            "Assembly", dataclasses.replace(manifest.entries["Assembly"], stubgen_version="0.0.0")
+        )
+
+        self.assertIsNone(self.check(manifest, self.dll_file))
+
+    def test_options(self) -> None:
+        manifest: Manifest = self.make_manifest()
+
+        self.assertIsNone(self.check(manifest, self.dll_file, {"backend": "reflection"}))
+        self.assertIsNone(
+            self.check(manifest, self.dll_file, {"backend": "metadata", "declared_only": True})
+        )
+
+    def test_without_options(self) -> None:
+        manifest: Manifest = self.make_manifest()
+        json: Any = manifest.entries["Assembly"].to_json()
+        del json["options"]
+
+        # Written before the options were recorded, the entry matches none
+        self.assertIsNone(
+            ManifestEntry.from_json(json).check(self.dll_file, self.output_dir, OPTIONS)
+        )
+
+    def test_invalid(self) -> None:
+        (self.output_dir / Manifest.file_name).write_text("{")
+
+        manifest: Manifest = Manifest(self.output_dir)
+
+        self.assertDictEqual({}, manifest.entries)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,240 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from stubgen.extract_metadata import AssemblyLoader
+from stubgen.extract_metadata import MetadataAssembly
+from stubgen.extract_metadata import MetaType
+from stubgen.extract_metadata import clear_caches
+from stubgen.extract_metadata import extract_assemblies
+from stubgen.extract_metadata import extract_assembly
+from stubgen.extract_metadata import extract_type_def
+from stubgen.extract_metadata import try_extract_type_def
+from stubgen.metadata import ASSEMBLY_REF
+from stubgen.metadata import TYPE_DEF
+from stubgen.metadata import MetadataError
+from stubgen.metadata import MetadataReader
+from stubgen.metadata import SignatureReader
+from stubgen.model import CClass
+from stubgen.model import CEnum
+from stubgen.model import CTypeDefinition
+from stubgen.util import make_python_name
+
+TEST_DIR: Path = Path(__file__).parent
+TEST_LIB: Path = TEST_DIR / "TestLib.dll"
+TEST_SKELETON: Path = TEST_DIR / "TestLib_1.0.0.0_skeleton.json"
+
+
+def find_runtime() -> Optional[Path]:
+    roots: Sequence[Path] = tuple(
+        Path(p)
+        for p in (
+            os.environ.get("DOTNET_ROOT", ""),
+            Path.home() / ".dotnet",
+            "/usr/share/dotnet",
+            "/usr/lib/dotnet",
+            r"C:\Program Files\dotnet",
+        )
+        if p
+    )
+    for root in roots:
+        runtimes: Sequence[Path] = sorted((root / "shared" / "Microsoft.NETCore.App").glob("*"))
+        if runtimes:
+            return runtimes[-1]
+    return None
+
+
+def to_json(type_definition: CTypeDefinition) -> Dict[str, Any]:
+    # Same containers as a loaded skeleton file
+    return json.loads(json.dumps(type_definition.to_json()))
+
+
+class TestMetadataReader(unittest.TestCase):
+    def setUp(self) -> None:
+        self.reader: MetadataReader = MetadataReader(TEST_LIB)
+
+    def tearDown(self) -> None:
+        self.reader.close()
+
+    def test_tables(self) -> None:
+        names: Sequence[str] = tuple(
+            self.reader.string(row[1]) for row in self.reader.rows(TYPE_DEF)
+        )
+        references: Sequence[str] = tuple(
+            self.reader.string(row[6]) for row in self.reader.rows(ASSEMBLY_REF)
+        )
+
+        self.assertEqual("<Module>", names[0])
+        self.assertIn("ClassWithMethods", names)
+        self.assertIn("System.Runtime", references)
+
+    def test_compressed(self) -> None:
+        reader: SignatureReader = SignatureReader(bytes((0x03, 0x80, 0x80, 0xC0, 0x00, 0x40, 0x00)))
+
+        self.assertEqual(0x03, reader.read_compressed())
+        self.assertEqual(0x80, reader.read_compressed())
+        self.assertEqual(0x4000, reader.read_compressed())
+
+    def test_invalid(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path: Path = Path(temp_dir) / "Invalid.dll"
+            path.write_bytes(b"MZ" + bytes(126))
+
+            with self.assertRaises(MetadataError):
+                MetadataReader(path)
+
+
+class TestExtractMetadata(unittest.TestCase):
+    def setUp(self) -> None:
+        clear_caches()
+        self.loader: AssemblyLoader = AssemblyLoader()
+        self.assembly: MetadataAssembly = self.loader.load(TEST_LIB)
+        with TEST_SKELETON.open("r") as file:
+            self.skeleton: Dict[str, Any] = json.load(file)["namespaces"]["TestLib"]["types"]
+
+    def tearDown(self) -> None:
+        self.loader.close()
+        clear_caches()
+
+    def find_type(self, type_name: str) -> MetaType:
+        for index in range(2, len(self.assembly.types) + 1):
+            info: MetaType = MetaType(self.assembly, index)
+            if not info.is_nested and make_python_name(info.name) == type_name:
+                return info
+        raise NameError(f"Unable to find type named {type_name!r}")
+
+    def get_type(self, type_name: str) -> CTypeDefinition:
+        return extract_type_def(self.find_type(type_name))
+
+    def test_assembly(self) -> None:
+        self.assertEqual("TestLib", self.assembly.name)
+        self.assertEqual("1.0.0.0", self.assembly.version)
+
+    def test_enum(self) -> None:
+        enum: CTypeDefinition = self.get_type("EnumWithFields")
+
+        self.assertIsInstance(enum, CEnum)
+        self.assertEqual(self.skeleton["TestLib.EnumWithFields"], to_json(enum))
+
+    def test_declared_members(self) -> None:
+        # Without the runtime assemblies only members declared in TestLib can be found
+        checked: int = 0
+        for key, expected in self.skeleton.items():
+            type_name: str = make_python_name(key.split(".", 1)[1].split("(")[0])
+            actual: Dict[str, Any] = to_json(self.get_type(type_name))
+            self.assertEqual(expected["type"], actual["type"], key)
+            if expected["type"] in ("enum", "delegate"):
+                self.assertEqual(expected, actual)
+                continue
+            for group in ("fields", "constructors", "properties", "methods", "events"):
+                for name, member in expected.get(group, {}).items():
+                    if not name.startswith("TestLib:"):
+                        continue
+                    self.assertEqual(member, actual[group].get(name), name)
+                    checked += 1
+            if "nested_types" in expected:
+                self.assertEqual(list(expected["nested_types"]), list(actual["nested_types"]))
+
+        self.assertGreater(checked, 200)
+
+    def test_inherited_unresolved(self) -> None:
+        class_type: CTypeDefinition = self.get_type("ClassWithFields")
+
+        self.assertIsInstance(class_type, CClass)
+        self.assertEqual("System:Object", str(class_type.super_class))
+        self.assertNotIn("System:Object.ToString()", class_type.methods)
+
+    def test_type_error_skipped(self) -> None:
+        info: MetaType = self.find_type("ClassWithFields")
+
+        with self.assertLogs("stubgen.extract_metadata", "WARNING") as logs:
+            self.assertIsNone(try_extract_type_def(BrokenType(info.assembly, info.index)))
+        self.assertIn("TestLib.ClassWithFields: broken", logs.output[0])
+
+
+class BrokenType(MetaType):
+    # Fails with an error the metadata reader does not raise itself
+    @property
+    def flags(self) -> int:
+        raise ValueError("broken")
+
+
+@unittest.skipIf(find_runtime() is None, "no .NET runtime found")
+class TestExtractMetadataRuntime(unittest.TestCase):
+    def test_extract_assembly(self) -> None:
+        with TEST_SKELETON.open("r") as file:
+            expected: Dict[str, Any] = json.load(file)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            clear_caches()
+            try:
+                exit_code: int = extract_assembly(
+                    str(TEST_LIB), Path(temp_dir), False, search_paths=(find_runtime(),)
+                )
+            finally:
+                clear_caches()
+            with (Path(temp_dir) / TEST_SKELETON.name).open("r") as file:
+                actual: Dict[str, Any] = json.load(file)
+
+        self.assertEqual(0, exit_code)
+        self.assertEqual(list(expected["namespaces"]), list(actual["namespaces"]))
+        # The attribute types differ between .NET Framework and .NET, System.Attribute no longer
+        # implements _Attribute
+        self.assertEqual(expected["namespaces"]["TestLib"], actual["namespaces"]["TestLib"])
+
+    def test_closure(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            clear_caches()
+            try:
+                exit_code: int = extract_assemblies(
+                    [str(TEST_LIB)],
+                    Path(temp_dir),
+                    False,
+                    False,
+                    search_paths=(find_runtime(),),
+                    closure=True,
+                )
+            finally:
+                clear_caches()
+            skeletons: Sequence[str] = sorted(
+                p.name for p in Path(temp_dir).glob("*_skeleton.json")
+            )
+
+        self.assertEqual(0, exit_code)
+        self.assertIn(TEST_SKELETON.name, skeletons)
+        self.assertIn("System.Private.CoreLib", (s.split("_")[0] for s in skeletons))
+        self.assertIn("System.Runtime", (s.split("_")[0] for s in skeletons))
+
+    def test_type_workers(self) -> None:
+        outputs: List[Tuple[str, str]] = []
+        for type_workers in (None, 3):
+            with tempfile.TemporaryDirectory() as temp_dir:
+                clear_caches()
+                try:
+                    exit_code: int = extract_assembly(
+                        str(TEST_LIB),
+                        Path(temp_dir),
+                        False,
+                        search_paths=(find_runtime(),),
+                        type_workers=type_workers,
+                    )
+                finally:
+                    clear_caches()
+                self.assertEqual(0, exit_code)
+                outputs.append(
+                    (
+                        (Path(temp_dir) / TEST_SKELETON.name).read_text(),
+                        (Path(temp_dir) / "TestLib_1.0.0.0_doc.json").read_text(),
+                    )
+                )
+
+        # The slices are written in order, so the files are the same as from a single process
+        self.assertEqual(outputs[0], outputs[1])
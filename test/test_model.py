@@ -1,5 +1,12 @@
+import dataclasses
+import json
+import pickle
 import random
 import unittest
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import Iterator
 from typing import MutableSequence
 from typing import Sequence
 
@@ -20,6 +27,7 @@ from stubgen.model import CStruct
 from stubgen.model import CType
 from stubgen.model import CTypeDefinition
 from stubgen.model import JsonType
+from stubgen.model import by_sort_key
 
 
 class TestCNamespace(TestBase):
@@ -7568,6 +7576,75 @@ class TestCType(TestBase):
 
         self.assertEqual(c_type, from_json)
 
+    def test_json_inner_nested(self) -> None:
+        c_type: CType = CType(
+            name="Dictionary",
+            namespace="Namespace",
+            inner=(
+                CType(name="String", namespace="System"),
+                CType(
+                    name="List",
+                    namespace="Namespace",
+                    inner=(
+                        CType(
+                            name="KeyValuePair",
+                            namespace="Namespace",
+                            inner=(
+                                CType(name="Int32", namespace="System", nullable=True),
+                                CType(name="T", generic=True),
+                            ),
+                        ),
+                    ),
+                ),
+                CType(name="Int32", namespace="System", reference=True),
+            ),
+        )
+        json: JsonType = c_type.to_json()
+
+        self.assertEqual(
+            "Namespace:Dictionary[System:String, Namespace:List[Namespace:KeyValuePair["
+            "System:Int32?, $T]], System:*Int32]",
+            json,
+        )
+
+        from_json: CType = CType.from_json(json)
+
+        self.assertEqual(c_type, from_json)
+        self.assertEqual(json, from_json.to_json())
+
+    def test_json_invalid(self) -> None:
+        for text in ("", "Namespace:", "Type[Inner", "Type[Inner]Extra", "Type[InnerA,InnerB]"):
+            with self.subTest(json=text):
+                with self.assertRaises(ValueError):
+                    CType.from_json(text)
+
+    def test_json_interned(self) -> None:
+        json: str = "Namespace:Type[Namespace:InnerA, Namespace:InnerA]"
+
+        hits: int = CType.from_json.cache_info().hits
+        type0: CType = CType.from_json(json)
+        type1: CType = CType.from_json(json)
+
+        self.assertIs(type0, type1)
+        self.assertIs(type0.inner[0], type0.inner[1])
+        self.assertLess(hits, CType.from_json.cache_info().hits)
+
+    def test_str_cached(self) -> None:
+        c_type: CType = CType(
+            name="Type", namespace="Namespace", inner=(CType(name="T", generic=True),)
+        )
+
+        self.assertIs(str(c_type), str(c_type))
+        self.assertIs(c_type.simple_name, c_type.simple_name)
+        self.assertEqual("Namespace:Type[$T]", str(c_type))
+        self.assertEqual("Type[T]", c_type.simple_name)
+
+    def test_hash_cached(self) -> None:
+        c_type: CType = CType(name="Type", namespace="Namespace")
+
+        self.assertEqual(hash(c_type), hash(c_type))
+        self.assertEqual(hash(CType(name="Type", namespace="Namespace")), hash(c_type))
+
     def test_compare_name(self) -> None:
         type0: CType = CType(name="A")
         type1: CType = CType(name="B")
@@ -7739,6 +7816,24 @@ class TestCType(TestBase):
         random.shuffle(unordered)
 
         self.assertSequenceEqual(ordered, sorted(unordered))
+        self.assertSequenceEqual(ordered, sorted(unordered, key=by_sort_key))
+
+    def test_sort_key(self) -> None:
+        types: Sequence[CType] = tuple(
+            CType(name=name, namespace=namespace, inner=inner, reference=flag, nullable=flag)
+            for name in ("A", "B")
+            for namespace in (None, "A", "B")
+            for inner in ((), (CType(name="A"),), (CType(name="B"),), (CType(name="A"),) * 2)
+            for flag in (False, True)
+        )
+
+        type0: CType
+        type1: CType
+        for type0 in types:
+            for type1 in types:
+                compare: int = CType.compare(type0, type1)
+                self.assertEqual(compare < 0, type0.sort_key < type1.sort_key, (type0, type1))
+                self.assertEqual(compare == 0, type0.sort_key == type1.sort_key, (type0, type1))
 
 
 class TestCParameter(TestBase):
@@ -8019,6 +8114,15 @@ class TestCField(TestBase):
 
 
 class TestCConstructor(TestBase):
+    def test_doc_key(self) -> None:
+        c_constructor: CConstructor = CConstructor(
+            declaring_type=CType(name="Type", namespace="Namespace"),
+            parameters=(CParameter(name="value", type=CType(name="Int32", namespace="System")),),
+        )
+
+        self.assertEqual("__init__(System:Int32)", c_constructor.doc_key)
+        self.assertEqual(c_constructor.to_doc_json()[0], c_constructor.doc_key)
+
     def test_json(self) -> None:
         c_constructor: CConstructor = CConstructor(
             declaring_type=CType(name="Type", namespace="Namespace"),
@@ -8386,6 +8490,28 @@ class TestCProperty(TestBase):
 
 
 class TestCMethod(TestBase):
+    def test_doc_key(self) -> None:
+        c_method: CMethod = CMethod(
+            name="Method",
+            declaring_type=CType(name="Type", namespace="Namespace"),
+            parameters=(CParameter(name="value", type=CType(name="T", generic=True)),),
+            return_types=(),
+        )
+
+        self.assertEqual("Method($T)", c_method.doc_key)
+        self.assertEqual(c_method.to_doc_json()[0], c_method.doc_key)
+
+    def test_str_cached(self) -> None:
+        c_method: CMethod = CMethod(
+            name="Method",
+            declaring_type=CType(name="Type", namespace="Namespace"),
+            parameters=(CParameter(name="value", type=CType(name="Int32", namespace="System")),),
+            return_types=(),
+        )
+
+        self.assertIs(str(c_method), str(c_method))
+        self.assertEqual("Namespace:Type.Method(System:Int32)", str(c_method))
+
     def test_json(self) -> None:
         c_method: CMethod = CMethod(
             name="Method",
@@ -8709,6 +8835,7 @@ class TestCMethod(TestBase):
         random.shuffle(unordered)
 
         self.assertSequenceEqual(ordered, sorted(unordered))
+        self.assertSequenceEqual(ordered, sorted(unordered, key=by_sort_key))
 
 
 class TestCEvent(TestBase):
@@ -8806,5 +8933,175 @@ class TestCEvent(TestBase):
         self.assertSequenceEqual(ordered, sorted(unordered))
 
 
+class TestFingerprint(TestBase):
+    def get_namespace(self) -> Dict[str, Any]:
+        with (Path(__file__).parent / "TestLib_1.0.0.0_skeleton.json").open("r") as file:
+            return json.load(file)["namespaces"]["TestLib"]
+
+    def test_same_json(self) -> None:
+        namespace1: CNamespace = CNamespace.from_json(self.get_namespace())
+        namespace2: CNamespace = CNamespace.from_json(self.get_namespace())
+
+        self.assertEqual(namespace1.fingerprint, namespace2.fingerprint)
+        for key, type_def in namespace1.types.items():
+            self.assertEqual(type_def.fingerprint, namespace2.types[key].fingerprint)
+        self.assertEqual(namespace1.fingerprint, pickle.loads(pickle.dumps(namespace1)).fingerprint)
+
+    def test_pickled(self) -> None:
+        namespace: CNamespace = CNamespace.from_json(self.get_namespace())
+        type_def: CTypeDefinition = namespace.types["TestLib.ClassWithFields"]
+        CTypeDefinition.fingerprint.preset(type_def, b"loaded")
+
+        # The digest is pickled with the fields instead of being computed again
+        self.assertEqual(b"loaded", pickle.loads(pickle.dumps(type_def)).fingerprint)
+        self.assertEqual(
+            type_def.fingerprint,
+            pickle.loads(pickle.dumps(namespace)).types["TestLib.ClassWithFields"].fingerprint,
+        )
+
+    def test_changed_json(self) -> None:
+        namespace_json: Dict[str, Any] = self.get_namespace()
+        namespace1: CNamespace = CNamespace.from_json(namespace_json)
+        namespace_json["types"]["TestLib.ClassWithFields"]["abstract"] = True
+        namespace2: CNamespace = CNamespace.from_json(namespace_json)
+
+        self.assertNotEqual(namespace1.fingerprint, namespace2.fingerprint)
+        for key, type_def in namespace1.types.items():
+            self.assertEqual(
+                key != "TestLib.ClassWithFields",
+                type_def.fingerprint == namespace2.types[key].fingerprint,
+            )
+
+    def test_changed_member(self) -> None:
+        namespace_json: Dict[str, Any] = self.get_namespace()
+        class1: CTypeDefinition = CTypeDefinition.from_json(
+            namespace_json["types"]["TestLib.ClassWithFields"]
+        )
+        for field_json in namespace_json["types"]["TestLib.ClassWithFields"]["fields"].values():
+            field_json["return_type"] = "System:Object"
+        class2: CTypeDefinition = CTypeDefinition.from_json(
+            namespace_json["types"]["TestLib.ClassWithFields"]
+        )
+
+        # The details of the members are part of the digest, not only their keys
+        self.assertNotEqual(class1.fingerprint, class2.fingerprint)
+        self.assertNotEqual(class1, class2)
+
+    def test_loaded_and_built(self) -> None:
+        namespace: CNamespace = CNamespace.from_json(self.get_namespace())
+        built: CNamespace = CNamespace(
+            name=namespace.name,
+            types={k: dataclasses.replace(v) for k, v in namespace.types.items()},
+        )
+
+        # Digested from the loaded JSON and from to_json() of a new definition
+        for key, type_def in namespace.types.items():
+            self.assertEqual(type_def.fingerprint, built.types[key].fingerprint)
+        self.assertEqual(namespace.fingerprint, built.fingerprint)
+
+
+class TestMemory(TestBase):
+    @staticmethod
+    def make_skeleton(type_count: int, member_count: int) -> Dict[str, Any]:
+        types: Dict[str, Any] = {}
+        for t in range(type_count):
+            declaring_type: str = f"Namespace:Type{t}"
+            fields: Dict[str, Any] = {}
+            methods: Dict[str, Any] = {}
+            for m in range(member_count):
+                fields[f"{declaring_type}.Field{m}"] = {
+                    "name": f"Field{m}",
+                    "declaring_type": declaring_type,
+                    "return_type": "System:Int32",
+                    "static": False,
+                }
+                methods[f"{declaring_type}.Method{m}(System:String)"] = {
+                    "name": f"Method{m}",
+                    "declaring_type": declaring_type,
+                    "parameters": [
+                        {
+                            "name": "value",
+                            "type": "System:String",
+                            "default": False,
+                            "out": False,
+                        }
+                    ],
+                    "return_types": ["System.Collections.Generic:List[System:Int32]"],
+                    "static": False,
+                    "virtual": False,
+                    "abstract": False,
+                    "generic_args": [],
+                }
+            types[declaring_type] = {
+                "type": "class",
+                "name": f"Type{t}",
+                "namespace": "Namespace",
+                "nested": None,
+                "abstract": False,
+                "generic_args": [],
+                "super_class": "System:Object",
+                "interfaces": [],
+                "fields": fields,
+                "constructors": {},
+                "properties": {},
+                "methods": methods,
+                "events": {},
+                "nested_types": {},
+            }
+        return {"name": "Namespace", "types": types}
+
+    @staticmethod
+    def iter_models(namespace: CNamespace) -> Iterator[Any]:
+        yield namespace
+        for type_def in namespace.types.values():
+            yield type_def
+            for method in type_def.methods.values():
+                yield method
+                yield from method.parameters
+                yield from method.return_types
+            yield from type_def.fields.values()
+
+    def test_slots(self) -> None:
+        namespace: CNamespace = CNamespace.from_json(self.make_skeleton(2, 2))
+
+        for model in self.iter_models(namespace):
+            with self.subTest(type=type(model).__name__):
+                self.assertFalse(hasattr(model, "__dict__"))
+
+    def test_frozen(self) -> None:
+        c_type: CType = CType(name="Type", namespace="Namespace")
+
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            c_type.name = "Other"  # noqa
+
+    def test_replace(self) -> None:
+        c_type: CType = CType(name="Type", namespace="Namespace")
+
+        self.assertEqual(
+            CType(name="Type", namespace="Namespace", nullable=True),
+            dataclasses.replace(c_type, nullable=True),
+        )
+
+    def test_pickle(self) -> None:
+        namespace: CNamespace = CNamespace.from_json(self.make_skeleton(2, 2))
+        constructor: CConstructor = CConstructor(
+            declaring_type=CType(name="Type", namespace="Namespace"),
+            parameters=(CParameter(name="value", type=CType(name="Int32", namespace="System")),),
+        )
+
+        self.assertEqual(namespace, pickle.loads(pickle.dumps(namespace)))
+        self.assertEqual(constructor, pickle.loads(pickle.dumps(constructor)))
+
+    def test_pickle_cached(self) -> None:
+        c_type: CType = CType(name="Type", namespace="Namespace")
+        hash(c_type)
+        str(c_type)
+
+        loaded: CType = pickle.loads(pickle.dumps(c_type))
+
+        self.assertEqual(hash(c_type), hash(loaded))
+        self.assertEqual(str(c_type), str(loaded))
+
+
 if __name__ == "__main__":
     unittest.main()
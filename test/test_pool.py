@@ -0,0 +1,87 @@
+import os
+import unittest
+from typing import Any
+from typing import Dict
+from typing import Sequence
+
+from stubgen.pool import WorkerError
+from stubgen.pool import WorkerPool
+
+
+def square(value: int) -> int:
+    return value * value
+
+
+def get_pid(value: int) -> int:
+    return os.getpid()
+
+
+def crash(value: int) -> int:
+    if value == 1:
+        os._exit(3)
+    return value
+
+
+def fail(value: int) -> int:
+    if value == 1:
+        raise ValueError("Value is one")
+    return value
+
+
+class TestWorkerPool(unittest.TestCase):
+    @staticmethod
+    def run_pool(pool: WorkerPool, values: Sequence[int]) -> Dict[int, Any]:
+        return dict(pool.imap_unordered((v,) for v in values))
+
+    def test_results(self) -> None:
+        pool: WorkerPool = WorkerPool(square, worker_count=2)
+
+        results: Dict[int, Any] = self.run_pool(pool, range(6))
+
+        self.assertDictEqual({0: 0, 1: 1, 2: 4, 3: 9, 4: 16, 5: 25}, results)
+        self.assertEqual(2, pool.started)
+
+    def test_recycle(self) -> None:
+        pool: WorkerPool = WorkerPool(get_pid, worker_count=2, max_tasks_per_worker=2)
+
+        results: Dict[int, Any] = self.run_pool(pool, range(6))
+
+        pids: Sequence[int] = tuple(results.values())
+        self.assertEqual(6, len(pids))
+        self.assertLessEqual(3, len(set(pids)))
+        self.assertEqual(len(set(pids)), pool.started)
+        self.assertTrue(all(pids.count(p) <= 2 for p in pids))
+
+    def test_crash(self) -> None:
+        pool: WorkerPool = WorkerPool(crash, worker_count=1)
+
+        results: Dict[int, Any] = self.run_pool(pool, range(4))
+
+        self.assertIsInstance(results[1], WorkerError)
+        self.assertTrue(results[1].crashed)
+        self.assertDictEqual({0: 0, 2: 2, 3: 3}, {k: v for k, v in results.items() if k != 1})
+        self.assertEqual(2, pool.started)
+
+    def test_exception(self) -> None:
+        pool: WorkerPool = WorkerPool(fail, worker_count=1)
+
+        results: Dict[int, Any] = self.run_pool(pool, range(3))
+
+        self.assertIsInstance(results[1], WorkerError)
+        self.assertFalse(results[1].crashed)
+        self.assertIn("Value is one", str(results[1]))
+        self.assertDictEqual({0: 0, 2: 2}, {k: v for k, v in results.items() if k != 1})
+        self.assertEqual(1, pool.started)
+
+    def test_close(self) -> None:
+        pool: WorkerPool = WorkerPool(square, worker_count=2)
+
+        results = pool.imap_unordered((v,) for v in range(6))
+        next(results)
+        results.close()
+
+        self.assertEqual(2, pool.started)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Sequence
+
+from stubgen.scan import ScanCache
+from stubgen.scan import find_dll_references
+from stubgen.scan import parse_script
+from stubgen.scan import read_references
+from stubgen.scan import write_references
+
+
+class TestScan(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+        self.path: Path = Path(self.temp_dir.name)
+        self.scripts: Path = self.path / "scripts"
+        self.dlls: Path = self.path / "dlls"
+        self.cache_file: Path = self.path / ScanCache.file_name
+        (self.scripts / "sub").mkdir(parents=True)
+        self.dlls.mkdir()
+        (self.dlls / "First.dll").write_bytes(b"")
+
+        self.write_script("a.py", 'import clr\nclr.AddReference("First")\nclr.AddReference(name)\n')
+        self.write_script(
+            "sub/b.py", 'from clr import AddReference\nAddReference("Second", "First")\n'
+        )
+        self.write_script("sub/c.txt", 'clr.AddReference("Ignored")\n')
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def write_script(self, name: str, text: str) -> Path:
+        path: Path = self.scripts / name
+        path.write_text(text)
+        return path
+
+    def find(self, process_count: int = 1) -> Sequence[str]:
+        return find_dll_references(
+            (self.scripts,), (self.dlls,), self.cache_file, process_count=process_count
+        )
+
+    def test_parse_script(self) -> None:
+        references, error = parse_script(str(self.scripts / "sub" / "b.py"))
+
+        self.assertEqual(["Second", "First"], references)
+        self.assertIsNone(error)
+
+    def test_parse_invalid(self) -> None:
+        references, error = parse_script(str(self.write_script("bad.py", "def (:\n")))
+
+        self.assertIsNone(references)
+        self.assertIsNotNone(error)
+
+    def test_find(self) -> None:
+        self.assertEqual([str((self.dlls / "First.dll").resolve()), "Second"], list(self.find()))
+
+    def test_processes(self) -> None:
+        self.assertEqual(self.find(1), self.find(2))
+
+    def test_cache(self) -> None:
+        self.find()
+        # Same size and modification time, so the cached references are used
+        path: Path = self.scripts / "a.py"
+        stat: os.stat_result = path.stat()
+        path.write_text(path.read_text().replace("First", "Other"))
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        self.assertNotIn("Other", self.find())
+
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+        self.assertIn("Other", self.find())
+
+    def test_cache_other_roots(self) -> None:
+        other: Path = self.path / "other"
+        other.mkdir()
+        removed: Path = other / "d.py"
+        removed.write_text('import clr\nclr.AddReference("Fourth")\n')
+        find_dll_references((other,), (), self.cache_file, process_count=1)
+        self.find()
+        removed.unlink()
+        path: Path = self.scripts / "a.py"
+        stat: os.stat_result = path.stat()
+        path.write_text(path.read_text().replace("First", "Other"))
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        find_dll_references((other,), (), self.cache_file, process_count=1)
+
+        # The scripts stay cached while the other root is scanned, the removed one is dropped
+        self.assertNotIn("Other", self.find())
+        self.assertNotIn(str(removed), ScanCache(self.cache_file).entries)
+
+    def test_references_file(self) -> None:
+        references_file: Path = self.path / "references.txt"
+        write_references(references_file, self.find())
+        with references_file.open("a") as file:
+            file.write("\n# Added by hand\nThird\n")
+
+        self.assertEqual([*self.find(), "Third"], list(read_references(references_file)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,207 @@
+import gzip
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+from stubgen.extract_stubs import clear_caches
+from stubgen.extract_stubs import extract_assembly
+from stubgen.extract_stubs import use_reflection
+from stubgen.reflection import MemberPartitions
+from stubgen.reflection import Reflection
+from stubgen.snapshot import RecordedError
+from stubgen.snapshot import RecordingReflection
+from stubgen.snapshot import ReplayReflection
+from stubgen.snapshot import SnapshotError
+
+# A few reflection objects in plain Python, enough to run the extractor without a CLR
+
+
+class FakeType:
+    def __init__(self, namespace: str, name: str, base: Optional["FakeType"] = None) -> None:
+        self.Namespace: str = namespace
+        self.Name: str = name
+        self.FullName: str = f"{namespace}.{name}"
+        self.BaseType: Optional[FakeType] = base
+        self.DeclaringType: Optional[FakeType] = None
+        self.IsValueType: bool = False
+        self.IsEnum: bool = False
+        self.IsInterface: bool = False
+        self.IsClass: bool = True
+        self.IsAbstract: bool = False
+        self.IsConstructedGenericType: bool = False
+        self.IsByRef: bool = False
+        self.IsGenericParameter: bool = False
+        self.IsNested: bool = False
+        self.IsArray: bool = False
+        self.members: List[Any] = []
+
+    def GetGenericArguments(self) -> Sequence[Any]:
+        return ()
+
+    def GetInterfaces(self) -> Sequence[Any]:
+        return ()
+
+
+class FakeMember:
+    def __init__(self, kind: str, name: str, declaring_type: FakeType, **attributes: Any) -> None:
+        self.kind: str = kind
+        self.Name: str = name
+        self.DeclaringType: FakeType = declaring_type
+        self.IsStatic: bool = False
+        self.__dict__.update(attributes)
+
+    def GetParameters(self) -> Sequence[Any]:
+        return ()
+
+    def GetBaseDefinition(self) -> "FakeMember":
+        return self
+
+
+class FakeVersion:
+    def ToString(self) -> str:
+        return "1.0.0.0"
+
+
+class FakeAssembly:
+    def __init__(self, types: Sequence[FakeType]) -> None:
+        self.types: Sequence[FakeType] = types
+        self.Name: str = "Fake"
+        self.Version: FakeVersion = FakeVersion()
+
+    def GetName(self) -> "FakeAssembly":
+        return self
+
+
+class FakeReflection(Reflection):
+    def __init__(self) -> None:
+        string: FakeType = FakeType("System", "String")
+        obj: FakeType = FakeType("System", "Object")
+        obj.members.append(FakeMember("Method", "ToString", obj, ReturnType=string))
+        item: FakeType = FakeType("Fake", "Item", obj)
+        item.members.append(FakeMember("Field", "Name", item, FieldType=string))
+        item.members.append(FakeMember("Field", "Count", item, FieldType=obj, IsStatic=True))
+        special: FakeType = FakeType("Fake", "Special", item)
+        special.members.append(FakeMember("Field", "Extra", special, FieldType=string))
+        self.assembly: FakeAssembly = FakeAssembly((item, special))
+
+    def load_assembly(self, assembly_name: str) -> Any:
+        if assembly_name != "Fake":
+            raise FileNotFoundError(assembly_name)
+        return self.assembly
+
+    def get_types(self, assembly: Any) -> Sequence[Any]:
+        return assembly.types
+
+    def get_source(self, assembly: Any) -> Optional[Path]:
+        return None
+
+    def get_members(self, info: Any, static: bool, declared_only: bool) -> MemberPartitions:
+        partitions: Dict[str, List[Any]] = {}
+        while info is not None:
+            for member in info.members:
+                if static or not member.IsStatic:
+                    partitions.setdefault(member.kind, []).append(member)
+            if declared_only:
+                break
+            info = info.BaseType
+            static = False
+        return partitions
+
+    def get_nullable_type(self, info: Any) -> Any:
+        return None
+
+    def is_delegate(self, info: Any) -> bool:
+        return False
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+        self.path: Path = Path(self.temp_dir.name)
+        clear_caches()
+        use_reflection(FakeReflection())
+
+    def tearDown(self) -> None:
+        use_reflection(None)
+        clear_caches()
+        self.temp_dir.cleanup()
+
+    def extract(self, name: str, **kwargs: Any) -> Dict[str, Any]:
+        output_dir: Path = self.path / name
+        output_dir.mkdir()
+        self.assertEqual(
+            0, extract_assembly(kwargs.pop("assembly_name", "Fake"), output_dir, False, **kwargs)
+        )
+        with (output_dir / "Fake_1.0.0.0_skeleton.json").open("r") as file:
+            return json.load(file)
+
+    def test_extract(self) -> None:
+        skeleton: Dict[str, Any] = self.extract("direct")
+        item: Dict[str, Any] = skeleton["namespaces"]["Fake"]["types"]["Fake.Item"]
+
+        self.assertEqual(["Fake:Item.Count", "Fake:Item.Name"], sorted(item["fields"]))
+        self.assertIn("System:Object.ToString()", item["methods"])
+
+    def test_record_replay(self) -> None:
+        expected: Dict[str, Any] = self.extract("direct")
+        recorded: Dict[str, Any] = self.extract("recorded", record_dir=self.path)
+        snapshot: Path = self.path / "Fake_1.0.0.0_snapshot.json.gz"
+
+        # Nothing can be loaded from the backend any more
+        use_reflection(None)
+        replayed: Dict[str, Any] = self.extract(
+            "replayed", assembly_name=str(snapshot), replay=True
+        )
+
+        self.assertEqual(expected, recorded)
+        self.assertEqual(expected, replayed)
+
+    def test_declared_only(self) -> None:
+        expected: Dict[str, Any] = self.extract("all")
+        declared_only: Dict[str, Any] = self.extract("declared_only", declared_only=True)
+        special: Dict[str, Any] = declared_only["namespaces"]["Fake"]["types"]["Fake.Special"]
+
+        # The inherited members are rebuilt from the base types, with their declaring types
+        self.assertEqual(["Fake:Item.Name", "Fake:Special.Extra"], sorted(special["fields"]))
+        self.assertIn("System:Object.ToString()", special["methods"])
+        self.assertEqual(expected, declared_only)
+
+    def test_missing_answer(self) -> None:
+        recorder: RecordingReflection = RecordingReflection(FakeReflection())
+        assembly: Any = recorder.load_assembly("Fake")
+        self.assertEqual("Fake", assembly.Name)
+        recorder.save(self.path / "snapshot.json.gz")
+
+        replayed: Any = ReplayReflection().load_assembly(str(self.path / "snapshot.json.gz"))
+
+        self.assertEqual("Fake", replayed.Name)
+        with self.assertRaises(SnapshotError):
+            replayed.GetName()
+        with self.assertRaises(SnapshotError):
+            ReplayReflection().get_types(replayed)
+
+    def test_recorded_error(self) -> None:
+        recorder: RecordingReflection = RecordingReflection(FakeReflection())
+        with self.assertRaises(FileNotFoundError):
+            recorder.load_assembly("Missing")
+        recorder.save(self.path / "snapshot.json.gz")
+
+        with self.assertRaises(RecordedError):
+            ReplayReflection().load_assembly(str(self.path / "snapshot.json.gz"))
+
+    def test_invalid(self) -> None:
+        with gzip.open(self.path / "snapshot.json.gz", "wt") as file:
+            json.dump({"format": 0}, file)
+
+        with self.assertRaises(SnapshotError):
+            ReplayReflection().load_assembly(str(self.path / "snapshot.json.gz"))
+
+
+if __name__ == "__main__":
+    unittest.main()